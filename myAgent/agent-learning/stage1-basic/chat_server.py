@@ -0,0 +1,399 @@
+"""
+多会话对话服务
+用 asyncio 实现的本地 HTTP 服务，把 MemoryChatAgent 提供给多个用户同时使用：
+- 每个会话有自己的记忆，记忆有Token上限
+- 所有会话共享一个异步客户端（同一个连接池）
+- 支持 SSE 流式返回
+- 空闲超时或会话数超过上限时，淘汰最久未使用的会话
+
+接口：
+  POST   /chat                {"message": "...", "session_id": 可选, "stream": 可选}
+  GET    /sessions/<id>       会话的记忆统计
+  DELETE /sessions/<id>       删除会话
+  GET    /health              服务状态
+
+调用模型失败时，非流式请求返回 502，流式请求发送 error 事件，这一轮不写入记忆。
+
+运行：python chat_server.py --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import time
+from collections import OrderedDict
+
+import dotenv
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from memory_chat import MemoryChatAgent, SlidingWindowMemory
+
+# 加载环境变量
+dotenv.load_dotenv()
+
+# 请求体和请求头的大小上限（字节）
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADER_LINES = 100
+# 读取请求头的超时（秒），防止慢速连接一直占用
+HEADER_TIMEOUT = 30
+
+REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """返回给客户端的错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Session:
+    """一个用户会话"""
+
+    def __init__(self, session_id, agent):
+        self.id = session_id
+        self.agent = agent
+        self.last_active = time.monotonic()
+        # 同一会话同时只处理一个请求，避免记忆交错
+        self.lock = asyncio.Lock()
+
+
+class ChatServer:
+    """多会话对话服务"""
+
+    def __init__(
+        self,
+        window_size=5,
+        max_tokens=4000,
+        max_sessions=1000,
+        idle_timeout=1800,
+        max_connections=20,
+    ):
+        """
+        初始化服务
+        Args:
+            window_size (int): 每个会话的记忆窗口大小
+            max_tokens (int): 每个会话记忆的Token上限
+            max_sessions (int): 最多同时保留的会话数
+            idle_timeout (float): 会话空闲多少秒后被淘汰
+            max_connections (int): 到模型API的连接池大小（即最大并发请求数）
+        """
+        self.window_size = window_size
+        self.max_tokens = max_tokens
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_connections = max_connections
+
+        # 按最近使用排序，最久未使用的在最前面
+        self.sessions = OrderedDict()
+        self.client = None
+        self.requests = 0
+
+    def _create_client(self):
+        """所有会话共享的异步客户端和连接池"""
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+        return AsyncOpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL"),
+            http_client=DefaultAsyncHttpxClient(limits=limits),
+        )
+
+    # ---------- 会话管理 ----------
+
+    def get_session(self, session_id=None):
+        """
+        获取会话，没有 session_id 时新建
+        Raises:
+            HTTPError: 会话不存在，或会话已满且都在使用中
+        """
+        if session_id:
+            session = self.sessions.get(session_id)
+            if session is None:
+                raise HTTPError(404, "会话不存在或已过期")
+            self.sessions.move_to_end(session_id)
+            session.last_active = time.monotonic()
+            return session
+
+        if len(self.sessions) >= self.max_sessions and not self._evict_one():
+            raise HTTPError(503, "会话数已达上限")
+
+        agent = MemoryChatAgent(
+            memory=SlidingWindowMemory(self.window_size, self.max_tokens)
+        )
+        session = Session(secrets.token_hex(16), agent)
+        self.sessions[session.id] = session
+        return session
+
+    def _evict_one(self):
+        """淘汰最久未使用、且不在处理请求的会话"""
+        for session_id, session in self.sessions.items():
+            if not session.lock.locked():
+                del self.sessions[session_id]
+                return True
+        return False
+
+    def evict_idle(self):
+        """淘汰空闲超时的会话"""
+        deadline = time.monotonic() - self.idle_timeout
+        expired = [
+            session_id
+            for session_id, session in self.sessions.items()
+            if session.last_active < deadline and not session.lock.locked()
+        ]
+        for session_id in expired:
+            del self.sessions[session_id]
+        return len(expired)
+
+    async def _evict_loop(self):
+        interval = min(60, max(1, self.idle_timeout / 2))
+        while True:
+            await asyncio.sleep(interval)
+            evicted = self.evict_idle()
+            if evicted:
+                print(f"🧹 淘汰了 {evicted} 个空闲会话，剩余 {len(self.sessions)} 个")
+
+    # ---------- HTTP ----------
+
+    async def serve(self, host="127.0.0.1", port=8000):
+        """启动服务，直到被取消"""
+        self.client = self._create_client()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        evictor = asyncio.create_task(self._evict_loop())
+        print(f"🚀 对话服务已启动: http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+            await self.client.close()
+
+    async def _handle_connection(self, reader, writer):
+        """处理一个连接（支持 keep-alive，流式响应后关闭连接）"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(
+                        self._read_request(reader), HEADER_TIMEOUT
+                    )
+                except HTTPError as e:
+                    await self._send_json(writer, e.status, {"error": e.message})
+                    break
+                if request is None:
+                    break
+                keep_alive = await self._dispatch(writer, *request)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            print(f"❌ 处理请求出错: {e}")
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        """
+        读取一个请求
+        Returns:
+            tuple: (method, path, body)，连接已关闭时返回 None
+        """
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, _ = line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "请求行格式错误")
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HTTPError(400, "请求头过多")
+
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Content-Length 格式错误")
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, "请求体过大")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], body
+
+    async def _dispatch(self, writer, method, path, body):
+        """
+        路由请求
+        Returns:
+            bool: 连接是否可以继续使用
+        """
+        self.requests += 1
+        try:
+            if path == "/chat":
+                if method != "POST":
+                    raise HTTPError(405, "请使用 POST")
+                return await self._chat(writer, self._parse_json(body))
+
+            if path == "/health":
+                await self._send_json(
+                    writer,
+                    200,
+                    {
+                        "sessions": len(self.sessions),
+                        "max_sessions": self.max_sessions,
+                        "requests": self.requests,
+                    },
+                )
+                return True
+
+            if path.startswith("/sessions/"):
+                session_id = path[len("/sessions/") :]
+                if method == "GET":
+                    session = self.get_session(session_id)
+                    stats = session.agent.get_memory_stats()
+                    await self._send_json(
+                        writer, 200, {"session_id": session_id, **stats}
+                    )
+                elif method == "DELETE":
+                    self.get_session(session_id)
+                    del self.sessions[session_id]
+                    await self._send_json(writer, 200, {"deleted": session_id})
+                else:
+                    raise HTTPError(405, "请使用 GET 或 DELETE")
+                return True
+
+            raise HTTPError(404, "接口不存在")
+        except HTTPError as e:
+            await self._send_json(writer, e.status, {"error": e.message})
+            return True
+
+    @staticmethod
+    def _parse_json(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "请求体不是合法的JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "请求体应为JSON对象")
+        return data
+
+    async def _chat(self, writer, data):
+        """
+        处理一次对话：流式时以 SSE 返回，否则返回完整回复
+        调用模型失败时，非流式返回 502，流式发送 error 事件；这一轮不写入记忆
+        """
+        message = str(data.get("message", "")).strip()
+        if not message:
+            raise HTTPError(400, "message 不能为空")
+        session = self.get_session(data.get("session_id"))
+        if session.lock.locked():
+            raise HTTPError(409, "该会话正在处理上一条消息")
+
+        async with session.lock:
+            deltas = session.agent.achat_stream(message, self.client)
+            try:
+                if not data.get("stream"):
+                    try:
+                        reply = "".join([delta async for delta in deltas])
+                    except Exception as e:
+                        raise HTTPError(502, f"模型调用失败：{e}")
+                    await self._send_json(
+                        writer, 200, {"session_id": session.id, "reply": reply}
+                    )
+                    return True
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/event-stream; charset=utf-8\r\n"
+                    b"Cache-Control: no-cache\r\n"
+                    b"Connection: close\r\n\r\n"
+                )
+                await self._send_event(writer, "session", {"session_id": session.id})
+                try:
+                    async for delta in deltas:
+                        # 客户端断开时这里会抛出 ConnectionError，本轮对话被撤销
+                        await self._send_event(writer, "delta", {"delta": delta})
+                except ConnectionError:
+                    raise
+                except Exception as e:
+                    await self._send_event(
+                        writer, "error", {"error": f"模型调用失败：{e}"}
+                    )
+                    return False
+                await self._send_event(writer, "done", {})
+                return False
+            finally:
+                # 提前结束时关闭生成器，释放到模型API的连接
+                await deltas.aclose()
+                session.last_active = time.monotonic()
+
+    @staticmethod
+    async def _send_event(writer, event, data):
+        payload = json.dumps(data, ensure_ascii=False)
+        writer.write(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+        await writer.drain()
+
+    @staticmethod
+    async def _send_json(writer, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+            + body
+        )
+        await writer.drain()
+
+
+def main():
+    """主函数 - 启动服务"""
+    parser = argparse.ArgumentParser(description="多会话对话服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--window-size", type=int, default=5, help="每个会话的记忆轮数")
+    parser.add_argument(
+        "--max-tokens", type=int, default=4000, help="每个会话记忆的Token上限"
+    )
+    parser.add_argument("--max-sessions", type=int, default=1000, help="最多会话数")
+    parser.add_argument(
+        "--idle-timeout", type=float, default=1800, help="空闲会话的淘汰时间（秒）"
+    )
+    parser.add_argument(
+        "--max-connections", type=int, default=20, help="到模型API的最大并发连接数"
+    )
+    args = parser.parse_args()
+
+    server = ChatServer(
+        window_size=args.window_size,
+        max_tokens=args.max_tokens,
+        max_sessions=args.max_sessions,
+        idle_timeout=args.idle_timeout,
+        max_connections=args.max_connections,
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 服务已停止")
+
+
+if __name__ == "__main__":
+    main()
@@ -103,17 +103,17 @@ def demo_window_size_comparison():
         "我住在哪里？",  # 这时小窗口可能忘记地址了
     ]
 
-    # 设定要进行对比测试的不同窗口大小
-    window_sizes = [2, 5]
+    # 设定要进行对比测试的窗口大小，以及是否把窗口外的对话压缩成摘要
+    configs = [(2, False), (5, False), (2, True)]
 
-    # 分别用不同窗口大小进行测试
-    for window_size in window_sizes:
+    # 分别用不同配置进行测试
+    for window_size, summarize in configs:
         # 打印本轮测试窗口大小
-        print(f"\n📏 窗口大小: {window_size}")
+        print(f"\n📏 窗口大小: {window_size}{' + 滚动摘要' if summarize else ''}")
         print("-" * 30)
 
         # 实例化记忆对话代理，传入当前的窗口大小
-        agent = MemoryChatAgent(window_size=window_size)
+        agent = MemoryChatAgent(window_size=window_size, summarize=summarize)
 
         # 循环进行每一步对话
         for i, question in enumerate(long_conversation, 1):
@@ -128,6 +128,11 @@ def demo_window_size_comparison():
             if "名字" in question or "住" in question:
                 stats = agent.get_memory_stats()
                 print(f"   (当前记忆消息数: {stats['total_messages']})")
+
+        # 摘要模式下，被淘汰的对话（包括名字和住址）保留在摘要里
+        if summarize:
+            agent.memory.wait()
+            print(f"   (对话摘要: {agent.memory.digest})")
         # 每种窗口大小后换行分隔
         print()
 
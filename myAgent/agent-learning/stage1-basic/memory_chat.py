@@ -1,31 +1,62 @@
+import logging
 import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import dotenv
 from openai import OpenAI
 
+from simple_chat import print_stream
+
 # 加载环境变量
 dotenv.load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class SlidingWindowMemory:
     """
     滑动窗口记忆管理
     只保留最近N轮对话，避免上下文过长
+
+    对话保存在双端队列（环形缓冲）中，从头部淘汰是O(1)；
+    消息数和Token数用计数器随增删维护，统计不再遍历全部消息。
     """
 
-    def __init__(self, window_size=5):
+    def __init__(self, window_size=5, max_tokens=None):
         """
         初始化记忆管理器
         Args:
             window_size (int): 保留的对话轮数，默认5轮
+            max_tokens (int): 上下文的Token预算（含系统提示），
+                超出时淘汰最早的对话；None表示只按轮数淘汰
         """
         self.window_size = window_size
-        # 初始化上下文，包含系统提示
-        self.context = [
-            {
-                "role": "system",
-                "content": "你是一个有记忆的友好助手，能够记住之前的对话内容。",
-            }
-        ]
+        self.max_tokens = max_tokens
+        # 系统提示单独保存，不参与淘汰
+        self.system_message = {
+            "role": "system",
+            "content": "你是一个有记忆的友好助手，能够记住之前的对话内容。",
+        }
+        self.messages = deque()
+        # 最近一次 update 淘汰的消息，撤销这次 update 时放回窗口
+        self._last_evicted = []
+
+        # 运行计数器
+        self.user_messages = 0
+        self.assistant_messages = 0
+        self.tokens = 0
+
+    @staticmethod
+    def count_tokens(content):
+        """估算Token数（按字符数粗略估算）"""
+        return len(content)
+
+    @property
+    def context(self):
+        """当前上下文（系统提示 + 窗口内的对话）"""
+        return self.get_context()
 
     def update(self, role, content):
         """
@@ -34,58 +65,371 @@ class SlidingWindowMemory:
             role (str): 角色 (user/assistant/system)
             content (str): 消息内容
         """
-        self.context.append({"role": role, "content": content})
+        self._add({"role": role, "content": content})
+        evicted = []
 
         # 超过窗口大小，删除最早的对话对
-        # 系统消息(1) + N轮对话(2*N) = 总共 1 + 2*N 条消息
-        max_messages = self.window_size * 2 + 1
-
-        while len(self.context) > max_messages:
-            # 删除最早的用户消息（索引1，因为索引0是system）
-            if self.context[1]["role"] == "user":
-                self.context.pop(1)
-            # 删除对应的助手回复
-            if self.context[1]["role"] == "assistant":
-                self.context.pop(1)
+        # 窗口内最多 N轮对话(2*N) 条消息
+        max_messages = self.window_size * 2
+        while len(self.messages) > max_messages:
+            evicted.extend(self._evict())
+
+        # 超出Token预算，继续删除最早的对话（至少保留刚加入的消息）
+        if self.max_tokens is not None:
+            budget = self.max_tokens - self._reserved_tokens()
+            while self.tokens > budget and len(self.messages) > 1:
+                evicted.extend(self._evict())
+        self._last_evicted = evicted
+
+    def _reserved_tokens(self):
+        """窗口之外、固定占用上下文的Token数（系统提示）"""
+        return self.count_tokens(self.system_message["content"])
+
+    def _add(self, message):
+        """加入一条消息并更新计数器"""
+        self.messages.append(message)
+        self._count(message, 1)
+
+    def _evict(self):
+        """
+        淘汰最早的一轮对话（用户消息及其后的助手回复）
+        Returns:
+            list: 被淘汰的消息
+        """
+        evicted = [self.messages.popleft()]
+        if (
+            evicted[0]["role"] == "user"
+            and len(self.messages) > 1
+            and self.messages[0]["role"] == "assistant"
+        ):
+            evicted.append(self.messages.popleft())
+        for message in evicted:
+            self._count(message, -1)
+        return evicted
+
+    def _count(self, message, sign):
+        if message["role"] == "user":
+            self.user_messages += sign
+        elif message["role"] == "assistant":
+            self.assistant_messages += sign
+        self.tokens += sign * self.count_tokens(message["content"])
+
+    def discard_last(self):
+        """
+        撤销最近加入的一条消息（流式回复中断时撤销未得到回复的问题）
+        加入它时被淘汰的对话放回窗口，记忆恢复到加入之前的状态
+        """
+        if self.messages:
+            self._count(self.messages.pop(), -1)
+        for message in reversed(self._last_evicted):
+            self.messages.appendleft(message)
+            self._count(message, 1)
+        self._last_evicted = []
 
     def get_context(self):
         """获取当前上下文"""
-        return self.context.copy()
+        return [self.system_message, *self.messages]
 
     def clear(self):
         """清空记忆（保留系统提示）"""
-        self.context = [self.context[0]]  # 只保留系统消息
+        self.messages.clear()
+        self._last_evicted = []
+        self.user_messages = self.assistant_messages = self.tokens = 0
 
     def get_stats(self):
         """获取记忆统计信息"""
-        user_msgs = sum(1 for msg in self.context if msg["role"] == "user")
-        assistant_msgs = sum(1 for msg in self.context if msg["role"] == "assistant")
-        total_tokens = sum(len(msg["content"]) for msg in self.context)
-
         return {
-            "total_messages": len(self.context),
-            "user_messages": user_msgs,
-            "assistant_messages": assistant_msgs,
-            "estimated_tokens": total_tokens,
+            "total_messages": len(self.messages) + 1,  # 含系统消息
+            "user_messages": self.user_messages,
+            "assistant_messages": self.assistant_messages,
+            "estimated_tokens": self.tokens + self._reserved_tokens(),
         }
 
 
+class SummarizingMemory(SlidingWindowMemory):
+    """
+    分层记忆：滑动窗口 + 滚动摘要
+    被淘汰的对话在后台线程中压缩进一段摘要，摘要作为系统消息放在上下文里，
+    上下文大小有上限，而用户姓名等早期信息不会随窗口滑动而丢失
+
+    压缩完成前，被淘汰的消息暂时原样留在上下文中，也计入Token预算；
+    摘要连续失败或跟不上时，最早的待压缩消息会被丢弃，上下文仍然有上限。
+    用户消息淘汰的对话要等这一轮有了回复（下一次 update）才开始压缩，
+    这样 discard_last 撤销问题时还能把它们放回窗口
+    """
+
+    # 摘要连续失败这么多次后，丢弃这一批待压缩的消息
+    MAX_FAILURES = 3
+
+    SUMMARY_PROMPT = (
+        "你负责压缩对话记忆。请把已有摘要和新的对话合并成一份简洁的摘要，"
+        "保留用户的姓名、身份、偏好、提到的事实和未完成的事项，省略寒暄。"
+        "直接输出摘要，不超过{limit}字。"
+    )
+
+    def __init__(
+        self,
+        client,
+        window_size=5,
+        max_tokens=None,
+        digest_tokens=300,
+        max_pending=None,
+    ):
+        """
+        初始化分层记忆
+        Args:
+            client (OpenAI): 用于生成摘要的客户端
+            window_size (int): 原样保留的对话轮数
+            max_tokens (int): 上下文Token预算（含摘要和待压缩的消息），
+                None表示不限制
+            digest_tokens (int): 摘要的长度上限
+            max_pending (int): 待压缩消息的条数上限，默认为窗口的消息数
+        """
+        super().__init__(window_size, max_tokens)
+        self.client = client
+        self.digest_tokens = digest_tokens
+        self.max_pending = max_pending or window_size * 2
+        self.digest = ""
+
+        # 已淘汰、还没压缩进摘要的消息：(编号, 消息)，编号递增
+        self._pending = deque()
+        self._pending_tokens = 0
+        self._seq = 0
+        # 编号不超过它的待压缩消息才能压缩，之后的可能还会被 discard_last 放回
+        self._committed_seq = 0
+        self._failures = 0
+        self._lock = threading.Lock()
+        # clear() 后丢弃仍在进行的摘要结果
+        self._generation = 0
+        # 单个后台线程，保证摘要按淘汰顺序合并
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="memory-digest"
+        )
+
+    def update(self, role, content):
+        # 上一条用户消息已有后续，它淘汰的对话不会再被撤销
+        self._commit_evictions()
+        super().update(role, content)
+        self._trim_pending()
+        if role != "user":
+            self._commit_evictions()
+
+    def _commit_evictions(self):
+        """开始压缩已确定淘汰的消息"""
+        with self._lock:
+            if self._seq == self._committed_seq:
+                return
+            self._committed_seq = self._seq
+        self._executor.submit(self._summarize, self._generation)
+
+    def discard_last(self):
+        """撤销最近加入的一条消息，被它淘汰的对话从待压缩列表回到窗口"""
+        with self._lock:
+            while self._pending and self._pending[-1][0] > self._committed_seq:
+                self._pending_tokens -= self.count_tokens(
+                    self._pending.pop()[1]["content"]
+                )
+            self._seq = self._committed_seq
+        super().discard_last()
+
+    def _evict(self):
+        evicted = super()._evict()
+        with self._lock:
+            for message in evicted:
+                self._seq += 1
+                self._pending.append((self._seq, message))
+                self._pending_tokens += self.count_tokens(message["content"])
+        return evicted
+
+    def _reserved_tokens(self):
+        with self._lock:
+            reserved = self.count_tokens(self.digest) + self._pending_tokens
+        return super()._reserved_tokens() + reserved
+
+    def _trim_pending(self):
+        """待压缩的消息超过条数上限或使上下文超出预算时，丢弃最早的"""
+        dropped = 0
+        with self._lock:
+            while self._pending and (
+                len(self._pending) > self.max_pending or self._over_budget()
+            ):
+                self._drop_pending()
+                dropped += 1
+        if dropped:
+            logger.warning("记忆摘要跟不上，丢弃了 %d 条最早的待压缩消息", dropped)
+
+    def _over_budget(self):
+        """整个上下文是否超出Token预算（调用时需持有锁）"""
+        if self.max_tokens is None:
+            return False
+        used = (
+            super()._reserved_tokens()
+            + self.count_tokens(self.digest)
+            + self._pending_tokens
+            + self.tokens
+        )
+        return used > self.max_tokens
+
+    def _drop_pending(self):
+        """移除最早的一条待压缩消息（调用时需持有锁）"""
+        _, message = self._pending.popleft()
+        self._pending_tokens -= self.count_tokens(message["content"])
+
+    def _drop_through(self, seq):
+        """移除编号不超过 seq 的待压缩消息（调用时需持有锁）"""
+        while self._pending and self._pending[0][0] <= seq:
+            self._drop_pending()
+
+    def _summarize(self, generation):
+        """把待压缩的消息合并进摘要（后台线程）"""
+        with self._lock:
+            batch = [item for item in self._pending if item[0] <= self._committed_seq]
+            digest = self.digest
+        if not batch:
+            return
+        last_seq = batch[-1][0]
+        messages = [message for _, message in batch]
+
+        dialogue = "\n".join(
+            f"{'用户' if m['role'] == 'user' else '助手'}：{m['content']}"
+            for m in messages
+        )
+        try:
+            response = self.client.chat.completions.create(
+                model=os.getenv("MODEL_NAME", "qwen-max"),
+                messages=[
+                    {
+                        "role": "system",
+                        "content": self.SUMMARY_PROMPT.format(limit=self.digest_tokens),
+                    },
+                    {
+                        "role": "user",
+                        "content": f"已有摘要：\n{digest or '（无）'}\n\n"
+                        f"新的对话：\n{dialogue}",
+                    },
+                ],
+                temperature=0.2,
+                max_tokens=self.digest_tokens,
+            )
+            new_digest = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.warning("记忆摘要失败: %s", e)
+            with self._lock:
+                if generation != self._generation:
+                    return
+                # 消息留在待压缩列表中，下次淘汰时一并重试；
+                # 连续失败多次后放弃这一批，避免上下文无限增长
+                self._failures += 1
+                if self._failures < self.MAX_FAILURES:
+                    return
+                self._failures = 0
+                self._drop_through(last_seq)
+            logger.warning(
+                "记忆摘要连续失败 %d 次，丢弃了 %d 条待压缩消息",
+                self.MAX_FAILURES,
+                len(messages),
+            )
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            # 压缩期间可能又有新消息被淘汰，只移除已合并的部分
+            self._drop_through(last_seq)
+            self.digest = new_digest
+            self._failures = 0
+
+    def wait(self):
+        """等待后台摘要完成"""
+        self._executor.submit(lambda: None).result()
+
+    def get_context(self):
+        """获取当前上下文：系统提示、摘要、尚未压缩的消息和窗口内的对话"""
+        with self._lock:
+            digest = self.digest
+            pending = [message for _, message in self._pending]
+
+        context = [self.system_message]
+        if digest:
+            context.append(
+                {"role": "system", "content": f"以下是之前对话的摘要：\n{digest}"}
+            )
+        # 摘要生成完之前，被淘汰的消息暂时原样保留
+        context.extend(pending)
+        context.extend(self.messages)
+        return context
+
+    def clear(self):
+        """清空记忆和摘要（保留系统提示）"""
+        super().clear()
+        with self._lock:
+            self.digest = ""
+            self._pending.clear()
+            self._pending_tokens = 0
+            self._failures = 0
+            self._generation += 1
+
+    def get_stats(self):
+        """获取记忆统计信息（含摘要）"""
+        # estimated_tokens 已包含摘要和待压缩的消息（见 _reserved_tokens）
+        stats = super().get_stats()
+        with self._lock:
+            stats["total_messages"] += len(self._pending) + bool(self.digest)
+            stats["digest_tokens"] = self.count_tokens(self.digest)
+            stats["pending_messages"] = len(self._pending)
+        return stats
+
+
 class MemoryChatAgent:
     """
     带记忆功能的对话助手
     使用滑动窗口策略管理对话历史
     """
 
-    def __init__(self, window_size=5):
+    def __init__(
+        self,
+        window_size=5,
+        max_tokens=None,
+        summarize=False,
+        memory=None,
+        client=None,
+    ):
         """
         初始化记忆对话助手
         Args:
             window_size (int): 记忆窗口大小
+            max_tokens (int): 上下文Token预算，None表示不限制
+            summarize (bool): 是否把窗口外的对话压缩成摘要保留
+            memory: 自定义记忆对象（如 vector_memory.VectorMemory），
+                传入时忽略上面的记忆参数
+            client (OpenAI): 共享的客户端，None表示第一次使用时新建
         """
-        self.client = OpenAI(
-            api_key=os.getenv("OPENAI_API_KEY"), base_url=os.getenv("OPENAI_BASE_URL")
-        )
-        self.memory = SlidingWindowMemory(window_size)
+        self._client = client
+        if memory is not None:
+            self.memory = memory
+        elif summarize:
+            self.memory = SummarizingMemory(self.client, window_size, max_tokens)
+        else:
+            self.memory = SlidingWindowMemory(window_size, max_tokens)
+
+    @property
+    def client(self):
+        """OpenAI客户端（延迟创建）"""
+        if self._client is None:
+            self._client = OpenAI(
+                api_key=os.getenv("OPENAI_API_KEY"),
+                base_url=os.getenv("OPENAI_BASE_URL"),
+            )
+        return self._client
+
+    def request_args(self):
+        """调用模型的参数（含当前上下文）"""
+        return {
+            "model": os.getenv("MODEL_NAME", "qwen-max"),
+            "messages": self.memory.get_context(),
+            "temperature": 0.3,
+            "max_tokens": 500,
+        }
 
     def chat(self, message):
         """
@@ -100,13 +444,7 @@ class MemoryChatAgent:
             self.memory.update("user", message)
 
             # 2. 获取完整上下文并调用模型
-            context = self.memory.get_context()
-            response = self.client.chat.completions.create(
-                model=os.getenv("MODEL_NAME", "qwen-max"),
-                messages=context,
-                temperature=0.3,
-                max_tokens=500,
-            )
+            response = self.client.chat.completions.create(**self.request_args())
 
             # 3. 将助手回复添加到记忆中
             assistant_msg = response.choices[0].message.content
@@ -117,6 +455,67 @@ class MemoryChatAgent:
         except Exception as e:
             return f"抱歉，出错了：{str(e)}"
 
+    def chat_stream(self, message):
+        """
+        流式对话，边生成边返回
+        完整回复生成后才写入记忆；出错或被中断（break、Ctrl-C）时撤销本轮的用户消息
+        Args:
+            message (str): 用户消息
+        Yields:
+            str: 回复的增量文本
+        """
+        self.memory.update("user", message)
+        parts = []
+        completed = False
+        try:
+            with self.client.chat.completions.create(
+                **self.request_args(), stream=True
+            ) as stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield parts[-1]
+            completed = True
+        except Exception as e:
+            yield f"抱歉，出错了：{str(e)}"
+        finally:
+            if completed:
+                self.memory.update("assistant", "".join(parts))
+            else:
+                self.memory.discard_last()
+
+    async def achat_stream(self, message, client):
+        """
+        异步流式对话（供 chat_server.py 使用），记忆的处理与 chat_stream 相同
+        与 chat_stream 不同，出错时不返回道歉文本，而是把异常抛给调用方，
+        以便服务端返回错误状态；本轮的用户消息同样会被撤销
+        Args:
+            message (str): 用户消息
+            client (AsyncOpenAI): 共享的异步客户端
+        Yields:
+            str: 回复的增量文本
+        Raises:
+            Exception: 调用模型失败（网络错误、API错误等）
+        """
+        self.memory.update("user", message)
+        parts = []
+        completed = False
+        try:
+            stream = await client.chat.completions.create(
+                **self.request_args(), stream=True
+            )
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        parts.append(chunk.choices[0].delta.content)
+                        yield parts[-1]
+            completed = True
+        finally:
+            if completed:
+                self.memory.update("assistant", "".join(parts))
+            else:
+                self.memory.discard_last()
+
     def get_memory_stats(self):
         """获取记忆统计信息"""
         return self.memory.get_stats()
@@ -164,9 +563,7 @@ def main():
                 print("请输入一些内容...")
                 continue
 
-            print("助手正在思考...")
-            response = agent.chat(user_input)
-            print(f"助手: {response}")
+            print_stream(agent.chat_stream(user_input))
 
         except KeyboardInterrupt:
             print("\n\n👋 再见！")
@@ -27,19 +27,58 @@ class SimpleChatAgent:
             str: 助手回复
         """
         try:
-            response = self.client.chat.completions.create(
-                model=os.getenv("MODEL_NAME", "qwen-max"),  # 默认使用qwen-max
-                messages=[
-                    {"role": "system", "content": "你是一个友好的助手"},
-                    {"role": "user", "content": message},
-                ],
-                temperature=0.3,  # 降低随机性，让回复更稳定
-                max_tokens=500,  # 限制回复长度
-            )
+            response = self._create(message)
             return response.choices[0].message.content
         except Exception as e:
             return f"抱歉，出错了：{str(e)}"
 
+    def chat_stream(self, message):
+        """
+        流式对话，边生成边返回
+        Args:
+            message (str): 用户消息
+        Yields:
+            str: 回复的增量文本
+        """
+        try:
+            # 提前结束（break 或 Ctrl-C）时关闭流，释放连接
+            with self._create(message, stream=True) as stream:
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield f"抱歉，出错了：{str(e)}"
+
+    def _create(self, message, stream=False):
+        """调用模型"""
+        return self.client.chat.completions.create(
+            model=os.getenv("MODEL_NAME", "qwen-max"),  # 默认使用qwen-max
+            messages=[
+                {"role": "system", "content": "你是一个友好的助手"},
+                {"role": "user", "content": message},
+            ],
+            temperature=0.3,  # 降低随机性，让回复更稳定
+            max_tokens=500,  # 限制回复长度
+            stream=stream,
+        )
+
+
+def print_stream(deltas):
+    """
+    边收边打印流式回复；生成过程中按 Ctrl-C 只中断本次回复
+    Args:
+        deltas: chat_stream() 返回的生成器
+    """
+    print("助手: ", end="", flush=True)
+    try:
+        for delta in deltas:
+            print(delta, end="", flush=True)
+        print()
+    except KeyboardInterrupt:
+        print("\n⏹ 已中断本次回复")
+    finally:
+        deltas.close()
+
 
 def main():
     """主函数 - 交互式对话"""
@@ -60,9 +99,7 @@ def main():
                 print("请输入一些内容...")
                 continue
 
-            print("助手正在思考...")
-            response = agent.chat(user_input)
-            print(f"助手: {response}")
+            print_stream(agent.chat_stream(user_input))
 
         except KeyboardInterrupt:
             print("\n\n👋 再见！")
@@ -0,0 +1,368 @@
+import json
+import os
+import re
+import zlib
+
+import numpy as np
+
+from memory_chat import SlidingWindowMemory
+
+
+def hash_embedding(texts, dim=512):
+    """
+    本地哈希向量化（无需模型和网络）
+    把英文单词、中文单字和相邻两字哈希到固定维度，得到归一化的稀疏特征向量
+    Args:
+        texts (list[str]): 文本列表
+        dim (int): 向量维度
+    Returns:
+        np.ndarray: 形状为 (len(texts), dim) 的float32矩阵
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        text = text.lower()
+        features = re.findall(r"[a-z0-9]+", text)
+        for run in re.findall(r"[一-鿿]+", text):
+            features.extend(run)
+            features.extend(run[i : i + 2] for i in range(len(run) - 1))
+        for feature in features:
+            # crc32 在不同进程间结果一致（内置hash()每次启动都会变），持久化后仍可用
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dim] += 1.0 if h & 0x80000000 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def sentence_transformer_embedding(model_name="BAAI/bge-small-zh-v1.5"):
+    """
+    使用本地 sentence-transformers 模型的向量化函数（需要 pip install sentence-transformers）
+    Args:
+        model_name (str): 模型名称或本地路径
+    Returns:
+        callable: 可传给 VectorMemory(embed_fn=...) 的函数
+    """
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_name)
+
+    def embed(texts):
+        return model.encode(
+            texts, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+    return embed
+
+
+class VectorIndex:
+    """
+    向量索引（内积 = 余弦相似度，向量需归一化）
+    - flat: NumPy暴力检索，结果精确，几千到几万条时已足够快
+    - ivf:  倒排索引，k-means把向量分成若干簇，只在最近的 nprobe 个簇中检索
+    - hnsw: 近似最近邻图（需要 pip install hnswlib）
+    向量始终保存在NumPy矩阵中，ivf/hnsw 只是在其上加速检索
+    """
+
+    MODES = ("flat", "ivf", "hnsw")
+
+    def __init__(self, dim, mode="flat", nprobe=8, ivf_min_size=2048):
+        """
+        初始化索引
+        Args:
+            dim (int): 向量维度
+            mode (str): flat / ivf / hnsw
+            nprobe (int): ivf 模式下检索的簇数
+            ivf_min_size (int): ivf 模式下，向量数达到该值才训练聚类（之前用暴力检索）
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"未知的索引模式: {mode}（可选 {', '.join(self.MODES)}）")
+        self.dim = dim
+        self.mode = mode
+        self.nprobe = nprobe
+        self.ivf_min_size = ivf_min_size
+
+        # 按容量倍增的矩阵，追加是均摊O(1)
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self.size = 0
+
+        # ivf: 簇中心和每个向量所属的簇；向量数翻倍时重新聚类
+        self._centroids = None
+        self._assign = np.zeros(64, dtype=np.int32)
+        self._trained_size = 0
+
+        self._hnsw = None
+        if mode == "hnsw":
+            import hnswlib
+
+            self._hnsw = hnswlib.Index(space="ip", dim=dim)
+            self._hnsw.init_index(max_elements=1024, ef_construction=200, M=16)
+
+    @property
+    def vectors(self):
+        """已加入的向量（视图，不复制）"""
+        return self._vectors[: self.size]
+
+    def add(self, vectors):
+        """
+        批量加入向量
+        Args:
+            vectors (np.ndarray): 形状为 (n, dim) 的矩阵
+        """
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        start, end = self.size, self.size + len(vectors)
+        if end > len(self._vectors):
+            grown = np.zeros((max(end, 2 * len(self._vectors)), self.dim), np.float32)
+            grown[:start] = self._vectors[:start]
+            self._vectors = grown
+            self._assign = np.resize(self._assign, len(grown))
+        self._vectors[start:end] = vectors
+        self.size = end
+
+        if self._hnsw is not None:
+            if end > self._hnsw.get_max_elements():
+                self._hnsw.resize_index(max(end, 2 * self._hnsw.get_max_elements()))
+            self._hnsw.add_items(vectors, np.arange(start, end))
+        elif self.mode == "ivf":
+            if self.size >= max(self.ivf_min_size, 2 * self._trained_size):
+                self._train()
+            elif self._centroids is not None:
+                self._assign[start:end] = np.argmax(vectors @ self._centroids.T, axis=1)
+
+    def _train(self, iterations=10):
+        """用球面k-means把全部向量分成约 sqrt(n) 个簇"""
+        data = self.vectors
+        nlist = max(1, int(np.sqrt(len(data))))
+        rng = np.random.default_rng(0)
+        centroids = data[rng.choice(len(data), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = data[assign == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / max(np.linalg.norm(centroid), 1e-12)
+        self._assign[: len(data)] = np.argmax(data @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._trained_size = len(data)
+
+    def search(self, query, k, limit=None):
+        """
+        检索与 query 最相似的 k 个向量
+        Args:
+            query (np.ndarray): 查询向量 (dim,)
+            k (int): 返回数量
+            limit (int): 只检索编号小于 limit 的向量（None表示全部）
+        Returns:
+            list[tuple[int, float]]: (编号, 相似度)，按相似度从高到低
+        """
+        limit = self.size if limit is None else min(limit, self.size)
+        if k <= 0 or limit <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32).reshape(self.dim)
+
+        if self._hnsw is not None:
+            # 多取一些，再过滤掉 limit 之后的编号
+            count = min(self.size, k + self.size - limit)
+            self._hnsw.set_ef(max(50, count))
+            labels, distances = self._hnsw.knn_query(query, k=count)
+            # ip 空间的距离是 1 - 内积
+            hits = [
+                (int(i), 1.0 - float(d))
+                for i, d in zip(labels[0], distances[0])
+                if i < limit
+            ]
+            return hits[:k]
+
+        if self._centroids is not None:
+            # 只比较簇编号（每个向量一个整数），再计算候选向量的相似度
+            nearest = np.argsort(-(self._centroids @ query))[: self.nprobe]
+            ids = np.flatnonzero(np.isin(self._assign[:limit], nearest))
+            scores = self._vectors[ids] @ query
+        else:
+            ids = np.arange(limit)
+            scores = self._vectors[:limit] @ query
+
+        if len(ids) == 0:
+            return []
+        k = min(k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
+
+
+class VectorMemory(SlidingWindowMemory):
+    """
+    向量检索长期记忆
+    每轮对话（用户消息 + 助手回复）都向量化后存入本地索引；
+    每次提问时只检索与问题最相关的 top_k 轮历史放进上下文，再加上最近几轮对话。
+    上下文大小与对话总轮数无关，能否想起某件事也不取决于它是多久以前说的。
+    """
+
+    def __init__(
+        self,
+        window_size=2,
+        max_tokens=None,
+        top_k=4,
+        min_score=0.2,
+        embed_fn=None,
+        index="flat",
+        path=None,
+    ):
+        """
+        初始化向量记忆
+        Args:
+            window_size (int): 原样保留的最近对话轮数
+            max_tokens (int): 最近对话的Token预算，None表示不限制
+            top_k (int): 每次检索的历史轮数
+            min_score (float): 相似度低于该值的历史不放入上下文
+            embed_fn (callable): 向量化函数 list[str] -> np.ndarray，默认 hash_embedding
+            index (str): 索引模式 flat / ivf / hnsw
+            path (str): 持久化目录，None表示只保存在内存中
+        """
+        super().__init__(window_size, max_tokens)
+        self.top_k = top_k
+        self.min_score = min_score
+        self.embed_fn = embed_fn or hash_embedding
+        self.index_mode = index
+        self.path = path
+
+        self.turns = []  # 每轮对话的文本，编号与索引中的向量一致
+        self.index = None  # 第一次向量化后才知道维度
+        self.retrieved = []  # 最近一次检索到的 (编号, 相似度)
+        self._question = None  # 还没有得到回复的用户消息
+
+        if path:
+            self._load()
+
+    def _turns_file(self):
+        return os.path.join(self.path, "turns.jsonl")
+
+    def _vectors_file(self):
+        return os.path.join(self.path, "vectors.f32")
+
+    def _load(self):
+        """从持久化目录恢复历史对话和向量"""
+        os.makedirs(self.path, exist_ok=True)
+        if not os.path.exists(self._turns_file()):
+            return
+        with open(self._turns_file(), "r", encoding="utf-8") as f:
+            self.turns = [json.loads(line)["text"] for line in f if line.strip()]
+        if not self.turns:
+            return
+
+        vectors = np.zeros(0, dtype=np.float32)
+        if os.path.exists(self._vectors_file()):
+            vectors = np.fromfile(self._vectors_file(), dtype=np.float32)
+        dim = self.embed_fn([self.turns[0]]).shape[1]
+        saved = len(vectors) // dim if len(vectors) % dim == 0 else 0
+
+        if saved and saved <= len(self.turns):
+            vectors = vectors.reshape(-1, dim)
+        else:
+            # 向量文件缺失或与当前向量化函数不匹配：全部重新计算
+            saved = 0
+            vectors = np.zeros((0, dim), dtype=np.float32)
+            open(self._vectors_file(), "wb").close()
+
+        self.index = VectorIndex(dim, self.index_mode)
+        self.index.add(vectors)
+        if saved < len(self.turns):
+            # 上次写入向量前中断的轮次，补算后追加
+            self._add_vectors(self.embed_fn(self.turns[saved:]))
+
+    def _add_vectors(self, vectors):
+        if self.index is None:
+            self.index = VectorIndex(vectors.shape[1], self.index_mode)
+        self.index.add(vectors)
+        if self.path:
+            with open(self._vectors_file(), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+
+    def update(self, role, content):
+        """
+        更新对话上下文
+        用户消息作为下一次检索的问题；收到助手回复后，整轮对话存入向量索引
+        """
+        super().update(role, content)
+        if role == "user":
+            self._question = content
+        elif role == "assistant" and self._question is not None:
+            self._remember(f"用户：{self._question}\n助手：{content}")
+            self._question = None
+
+    def discard_last(self):
+        """撤销最近加入的一条消息；撤销的是问题时，不再用它检索"""
+        if self.messages and self.messages[-1]["role"] == "user":
+            self._question = None
+        super().discard_last()
+
+    def _remember(self, text):
+        """把一轮对话存入索引（并追加到持久化文件）"""
+        self.turns.append(text)
+        if self.path:
+            with open(self._turns_file(), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"text": text}, ensure_ascii=False) + "\n")
+        self._add_vectors(self.embed_fn([text]))
+
+    def search(self, query, k=None):
+        """
+        检索与 query 相关的历史对话
+        Args:
+            query (str): 查询文本
+            k (int): 返回数量，默认 top_k
+        Returns:
+            list[tuple[str, float]]: (对话文本, 相似度)
+        """
+        if self.index is None:
+            return []
+        hits = self.index.search(self.embed_fn([query])[0], k or self.top_k)
+        return [(self.turns[i], score) for i, score in hits]
+
+    def get_context(self):
+        """获取当前上下文：系统提示、相关的历史对话和最近几轮对话"""
+        context = [self.system_message]
+        self.retrieved = []
+        if self._question and self.index is not None:
+            # 最近几轮已经在窗口里，不重复检索
+            recent = sum(1 for m in self.messages if m["role"] == "assistant")
+            hits = self.index.search(
+                self.embed_fn([self._question])[0],
+                self.top_k,
+                limit=len(self.turns) - recent,
+            )
+            self.retrieved = [(i, s) for i, s in hits if s >= self.min_score]
+
+        if self.retrieved:
+            history = "\n\n".join(self.turns[i] for i, _ in sorted(self.retrieved))
+            context.append(
+                {
+                    "role": "system",
+                    "content": f"以下是与当前问题相关的历史对话：\n{history}",
+                }
+            )
+        context.extend(self.messages)
+        return context
+
+    def clear(self):
+        """清空记忆，包括长期记忆和持久化文件（保留系统提示）"""
+        super().clear()
+        self.turns = []
+        self.index = None
+        self.retrieved = []
+        self._question = None
+        if self.path:
+            for file in (self._turns_file(), self._vectors_file()):
+                if os.path.exists(file):
+                    os.remove(file)
+
+    def get_stats(self):
+        """获取记忆统计信息（含长期记忆）"""
+        stats = super().get_stats()
+        if self.retrieved:
+            stats["total_messages"] += 1
+            stats["estimated_tokens"] += sum(
+                self.count_tokens(self.turns[i]) for i, _ in self.retrieved
+            )
+        stats["stored_turns"] = len(self.turns)
+        stats["retrieved_turns"] = len(self.retrieved)
+        stats["index"] = self.index_mode
+        return stats
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Synthetic subtitle corpus generator for benchmarks.
+
+Writes deterministic SRT/WebVTT files of a target size (1 KB to 50 MB and
+beyond) with a mix of English and Chinese lines, markup, sound annotations
+and, optionally, rolling auto-caption duplicates, so parsing,
+normalization and chunking see realistic input.
+
+Usage:
+    python benchmarks/corpus.py OUT_DIR [--sizes 1KB,1MB,50MB] [--formats srt,vtt]
+"""
+
+import argparse
+import random
+from pathlib import Path
+from typing import Iterator, List
+
+DEFAULT_SIZES = "1KB,16KB,256KB,1MB,10MB,50MB"
+
+_WORDS = (
+    "model data function cache request token latency memory parser stream "
+    "thread queue vector index summary lecture example result network"
+).split()
+_CJK = "我们今天讨论这个模型的数据结构以及缓存请求延迟内存解析线程队列向量索引总结"
+_ANNOTATIONS = ["[Music]", "[音乐]", "(笑)", "[Applause]"]
+
+_UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3}
+
+
+def parse_size(value: str) -> int:
+    """Parse ``1KB`` / ``50MB`` / ``512`` into bytes."""
+    value = value.strip().upper()
+    for unit in sorted(_UNITS, key=len, reverse=True):
+        if value.endswith(unit):
+            return int(float(value[: -len(unit)]) * _UNITS[unit])
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    for unit in ("GB", "MB", "KB"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return f"{size}B"
+
+
+def _sentence(rng: random.Random) -> str:
+    if rng.random() < 0.4:
+        start = rng.randrange(len(_CJK) - 12)
+        return _CJK[start : start + rng.randint(6, 12)] + "。"
+    words = rng.choices(_WORDS, k=rng.randint(5, 12))
+    return " ".join(words).capitalize() + "."
+
+
+def _lines(rng: random.Random, rolling: bool) -> Iterator[str]:
+    """Cue texts; rolling captions repeat the tail of the previous cue."""
+    previous = ""
+    while True:
+        roll = rng.random()
+        if roll < 0.03:
+            text = rng.choice(_ANNOTATIONS)
+        elif roll < 0.08:
+            text = f"<i>{_sentence(rng)}</i>"
+        else:
+            text = _sentence(rng)
+        if rolling and previous:
+            text = f"{previous}\n{text}"
+        previous = text.split("\n")[-1]
+        yield text
+
+
+def _timestamp(seconds: float, separator: str) -> str:
+    ms = int(round(seconds * 1000))
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d}{separator}{ms:03d}"
+
+
+def generate(
+    path: Path, size: int, fmt: str = "srt", seed: int = 0, rolling: bool = False
+) -> Path:
+    """
+    Write a subtitle file of about ``size`` bytes (never more than one cue
+    over) and return its path.
+    """
+    rng = random.Random(f"{seed}:{size}:{fmt}")
+    separator = "," if fmt == "srt" else "."
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    written = 0
+    start = 0.0
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        if fmt == "vtt":
+            written += f.write("WEBVTT\n\n")
+        for index, text in enumerate(_lines(rng, rolling), 1):
+            if written >= size:
+                break
+            end = start + rng.uniform(1.0, 4.0)
+            cue = f"{_timestamp(start, separator)} --> {_timestamp(end, separator)}"
+            block = f"{cue}\n{text}\n\n"
+            if fmt == "srt":
+                block = f"{index}\n{block}"
+            # Byte count of the text as written (CJK is 3 bytes in UTF-8)
+            written += len(block.encode("utf-8"))
+            f.write(block)
+            start = end
+    return path
+
+
+def generate_corpus(
+    out_dir: Path,
+    sizes: List[int],
+    formats: List[str],
+    files_per_size: int = 1,
+    rolling: bool = False,
+) -> List[Path]:
+    """Generate ``files_per_size`` files per size and format."""
+    paths = []
+    for size in sizes:
+        for fmt in formats:
+            for n in range(files_per_size):
+                name = f"bench_{format_size(size)}_{n:03d}.{fmt}"
+                paths.append(generate(out_dir / name, size, fmt, n, rolling))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Comma-separated")
+    parser.add_argument("--formats", default="srt,vtt", help="srt and/or vtt")
+    parser.add_argument("--files", type=int, default=1, help="Files per size")
+    parser.add_argument(
+        "--rolling", action="store_true", help="Rolling auto-caption duplicates"
+    )
+    args = parser.parse_args()
+
+    paths = generate_corpus(
+        args.out_dir,
+        [parse_size(s) for s in args.sizes.split(",")],
+        args.formats.split(","),
+        args.files,
+        args.rolling,
+    )
+    for path in paths:
+        print(f"{path.stat().st_size:>12,}  {path}")
+
+
+if __name__ == "__main__":
+    main()
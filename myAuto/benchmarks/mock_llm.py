@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Local OpenAI-compatible stub server for offline benchmarks.
+
+Serves ``POST /v1/chat/completions`` (streamed and non-streamed) with
+configurable latency, generation speed and rate limiting, so throughput
+can be measured without spending API money:
+
+- latency:    seconds before the first byte of every answer
+- tps:        generated tokens per second (0 = instant)
+- tokens:     completion tokens per answer
+- error-rate: fraction of requests answered with 429 at random
+- max-inflight: requests above this many in flight get a 429 (0 = off)
+- retry-after: Retry-After seconds sent with every 429
+
+Usage:
+    python benchmarks/mock_llm.py [--port 8000] [--latency 0.2] [--tps 100]
+
+then point ``api_base_url`` at ``http://127.0.0.1:8000/v1``.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict
+
+# Tokens per streamed chunk
+CHUNK_TOKENS = 4
+
+
+class MockLLMServer:
+    """Stub chat completions server running on a background thread."""
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.2,
+        tps: float = 100,
+        tokens: int = 200,
+        error_rate: float = 0.0,
+        max_inflight: int = 0,
+        retry_after: float = 1.0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.tps = tps
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.max_inflight = max_inflight
+        self.retry_after = retry_after
+        self._random = random.Random(seed)
+
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="mock-llm", daemon=True
+        )
+
+    @property
+    def url(self) -> str:
+        """Base URL to configure as ``api_base_url``."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = self.rate_limited = self.peak_in_flight = 0
+
+    def _admit(self) -> bool:
+        """Count a request; False if it must be rejected with a 429."""
+        with self._lock:
+            self.requests += 1
+            if self._random.random() < self.error_rate or (
+                self.max_inflight and self.in_flight >= self.max_inflight
+            ):
+                self.rate_limited += 1
+                return False
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def _done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+
+                if not server._admit():
+                    self._send_json(
+                        429,
+                        {"error": {"message": "Rate limit exceeded", "type": "rate"}},
+                        {"Retry-After": f"{server.retry_after:g}"},
+                    )
+                    return
+                try:
+                    time.sleep(server.latency)
+                    if body.get("stream"):
+                        self._stream(body)
+                    else:
+                        self._complete(body)
+                finally:
+                    server._done()
+
+            def _answer(self, body: Dict[str, Any]) -> list:
+                """Completion as a list of tokens, capped by max_tokens."""
+                count = min(server.tokens, body.get("max_tokens") or server.tokens)
+                return ["## 要点\n"] + [f"- point {i}\n" for i in range(count - 1)]
+
+            def _usage(self, body: Dict[str, Any], completion: int) -> dict:
+                prompt = sum(len(m.get("content", "")) for m in body["messages"])
+                prompt_tokens = max(1, prompt // 2)
+                return {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion,
+                    "total_tokens": prompt_tokens + completion,
+                }
+
+            def _generate(self, tokens: int):
+                if server.tps:
+                    time.sleep(tokens / server.tps)
+
+            def _complete(self, body: Dict[str, Any]):
+                answer = self._answer(body)
+                self._generate(len(answer))
+                self._send_json(
+                    200,
+                    {
+                        "id": "mock",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model", "mock"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {
+                                    "role": "assistant",
+                                    "content": "".join(answer),
+                                },
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": self._usage(body, len(answer)),
+                    },
+                )
+
+            def _stream(self, body: Dict[str, Any]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(data: str):
+                    payload = f"data: {data}\n\n".encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(payload), payload))
+                    self.wfile.flush()
+
+                def chunk(choices: list, usage: dict = None) -> str:
+                    return json.dumps(
+                        {
+                            "id": "mock",
+                            "object": "chat.completion.chunk",
+                            "created": int(time.time()),
+                            "model": body.get("model", "mock"),
+                            "choices": choices,
+                            "usage": usage,
+                        }
+                    )
+
+                answer = self._answer(body)
+                for i in range(0, len(answer), CHUNK_TOKENS):
+                    part = answer[i : i + CHUNK_TOKENS]
+                    self._generate(len(part))
+                    event(
+                        chunk(
+                            [
+                                {
+                                    "index": 0,
+                                    "delta": {"content": "".join(part)},
+                                    "finish_reason": None,
+                                }
+                            ]
+                        )
+                    )
+                event(chunk([], self._usage(body, len(answer))))
+                event("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_json(self, status: int, data: dict, headers: dict = None):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+
+def add_server_arguments(parser: argparse.ArgumentParser):
+    """Options shared by this script and the pipeline benchmark."""
+    parser.add_argument(
+        "--latency", type=float, default=0.2, help="Seconds to first byte"
+    )
+    parser.add_argument(
+        "--tps", type=float, default=100, help="Generated tokens/sec (0 = instant)"
+    )
+    parser.add_argument(
+        "--tokens", type=int, default=200, help="Completion tokens per answer"
+    )
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0, help="Fraction of random 429s"
+    )
+    parser.add_argument(
+        "--max-inflight",
+        type=int,
+        default=0,
+        help="429 for requests above this many in flight (0 = off)",
+    )
+    parser.add_argument(
+        "--retry-after", type=float, default=1.0, help="Retry-After of 429s"
+    )
+
+
+def server_from_args(args: argparse.Namespace, port: int = 0) -> MockLLMServer:
+    return MockLLMServer(
+        port=port,
+        latency=args.latency,
+        tps=args.tps,
+        tokens=args.tokens,
+        error_rate=args.error_rate,
+        max_inflight=args.max_inflight,
+        retry_after=args.retry_after,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--port", type=int, default=8000)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.port).start()
+    print(f"Mock LLM listening on {server.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(5)
+            print(server.stats())
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
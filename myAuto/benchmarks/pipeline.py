@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the summarizer pipeline.
+
+Starts the mock LLM server (benchmarks/mock_llm.py), generates a
+synthetic corpus (benchmarks/corpus.py) and runs, against a throwaway
+data directory:
+
+- single: ``AISummarizer.summarize_file`` on each file, one at a time
+- batch:  ``AISummarizer.summarize_many`` over all files, cold cache
+- warm:   the same batch again, served from the cache
+
+For each run it reports files/sec, p50/p95 per-file latency, API
+requests and 429s seen by the server, cache hits, peak RSS and where the
+time went by stage.
+
+Usage:
+    python benchmarks/pipeline.py [--sizes 1KB,256KB,1MB] [--files 4]
+        [--latency 0.05 --tps 2000 --error-rate 0.05] [--stream]
+"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.corpus import format_size, generate_corpus, parse_size
+from benchmarks.mock_llm import add_server_arguments, server_from_args
+from src.config.settings import Settings
+from src.summarizer.ai_summarizer import AISummarizer
+from src.utils.logger import get_logger
+from src.utils.metrics import format_stages, get_metrics
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (0 if unknown)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def percentile(values: List[float], p: float) -> float:
+    """Nearest-rank percentile."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+def make_settings(args: argparse.Namespace, base_url: str, data_dir: Path) -> Settings:
+    """Settings isolated from the user's config, cache and output."""
+    settings = Settings()
+    settings.data_dir = data_dir
+    settings.output_dir = data_dir / "summaries"
+    settings.api_key = "benchmark"
+    settings.api_base_url = base_url
+    settings.model = "deepseek-chat"
+    settings.set("chunk_size", args.chunk_size)
+    settings.set("max_concurrency", args.concurrency)
+    settings.set("file_concurrency", args.file_concurrency)
+    settings.set("stream", args.stream)
+    settings.set("cache_cross_model", False)
+    return settings
+
+
+def run(name: str, summarize, files: List[Path], server) -> Dict[str, Any]:
+    """Run one scenario and collect its measurements."""
+    server.reset_stats()
+    get_metrics().reset()
+    start = time.perf_counter()
+    results = summarize(files)
+    elapsed = time.perf_counter() - start
+
+    latencies = [r["metrics"]["elapsed"] for r in results if "metrics" in r]
+    return {
+        "name": name,
+        "files": len(files),
+        "failed": sum(1 for r in results if not r["success"]),
+        "elapsed": elapsed,
+        "files_per_sec": len(files) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "cache_hits": sum(
+            r["metrics"]["cache_hits"] for r in results if "metrics" in r
+        ),
+        "server": server.stats(),
+        "rss": peak_rss_mb(),
+        "stages": get_metrics().stage_seconds(),
+    }
+
+
+def report(row: Dict[str, Any]):
+    server = row["server"]
+    print(
+        f"{row['name']:<8} {row['files']:>5} {row['failed']:>6} "
+        f"{row['elapsed']:>8.2f}s {row['files_per_sec']:>9.2f} "
+        f"{row['p50']:>8.3f}s {row['p95']:>8.3f}s {server['requests']:>6} "
+        f"{server['rate_limited']:>5} {row['cache_hits']:>6} {row['rss']:>8.1f}MB"
+    )
+    if row["stages"]:
+        print(f"{'':<8} {format_stages(row['stages'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", default="1KB,64KB,1MB", help="Comma-separated")
+    parser.add_argument("--formats", default="srt,vtt")
+    parser.add_argument("--files", type=int, default=2, help="Files per size/format")
+    parser.add_argument("--rolling", action="store_true")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--file-concurrency", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="Stream answers")
+    parser.add_argument(
+        "--corpus", type=Path, help="Reuse/keep the corpus in this directory"
+    )
+    add_server_arguments(parser)
+    parser.set_defaults(latency=0.05, tps=2000)
+    args = parser.parse_args()
+
+    # Keep the benchmark output readable (retries are counted as 429s)
+    get_logger().setLevel(logging.ERROR)
+
+    server = server_from_args(args).start()
+    with tempfile.TemporaryDirectory(prefix="summarizer-bench-") as tmp:
+        corpus_dir = args.corpus or Path(tmp) / "corpus"
+        sizes = [parse_size(s) for s in args.sizes.split(",")]
+        start = time.perf_counter()
+        files = generate_corpus(
+            corpus_dir, sizes, args.formats.split(","), args.files, args.rolling
+        )
+        total = sum(f.stat().st_size for f in files)
+        print(
+            f"Corpus: {len(files)} files, {total / 1024**2:.1f} MB "
+            f"({', '.join(format_size(s) for s in sizes)}) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+        print(
+            f"Mock LLM: latency {args.latency}s, {args.tps:g} tok/s, "
+            f"{args.error_rate:.0%} random 429s, max in flight "
+            f"{args.max_inflight or '-'}\n"
+        )
+
+        summarizer = AISummarizer(make_settings(args, server.url, Path(tmp) / "data"))
+        print(
+            f"{'run':<8} {'files':>5} {'failed':>6} {'wall':>9} {'files/s':>9} "
+            f"{'p50':>9} {'p95':>9} {'reqs':>6} {'429s':>5} {'hits':>6} "
+            f"{'peak RSS':>10}"
+        )
+        try:
+            report(
+                run(
+                    "single",
+                    lambda fs: [summarizer.summarize_file(f) for f in fs],
+                    files,
+                    server,
+                )
+            )
+            summarizer.async_summarizer.cache.clear()
+            report(run("batch", summarizer.summarize_many, files, server))
+            report(run("warm", summarizer.summarize_many, files, server))
+        finally:
+            cache = summarizer.cache_stats()
+            summarizer.close()
+            server.stop()
+
+        print(
+            f"\nCache: {cache['entries']} entries, {cache['bytes'] / 1024:.0f} KB, "
+            f"hit ratio {cache['hit_ratio']:.0%}, {cache['evictions']} evictions"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for main.py.
+
+Measures the wall time of a fresh interpreter reaching "ready" in each
+startup mode, and checks which heavy modules were imported on the way:
+
+- headless: parse ``batch`` args and import the batch runner
+- gui:      import the GUI module (skipped if customtkinter is missing)
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--importtime]
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported until they are actually needed
+HEAVY_MODULES = ["openai", "httpx", "customtkinter", "tkinter"]
+
+_PROBE = """
+import sys, time, json
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+{body}
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "elapsed": elapsed,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+MODES = {
+    "headless": (
+        "import main\n"
+        "main.parse_args(['batch', 'inputs'])\n"
+        "from src.cli.batch import BatchRunner\n"
+        "from src.config.settings import Settings\n"
+        "Settings()"
+    ),
+    "gui": (
+        "import main\n"
+        "main.parse_args([])\n"
+        "from src.gui.app import App"
+    ),
+}
+
+
+def probe(mode: str, importtime: bool = False) -> dict:
+    """Run one fresh interpreter for ``mode`` and return its measurements."""
+    code = _PROBE.format(
+        root=str(PROJECT_ROOT), body=MODES[mode], heavy=HEAVY_MODULES
+    )
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    proc = subprocess.run(
+        cmd + ["-c", code], capture_output=True, text=True, cwd=PROJECT_ROOT
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["importtime"] = proc.stderr if importtime else ""
+    return result
+
+
+def top_imports(importtime_log: str, count: int = 10) -> list:
+    """Slowest cumulative imports from a ``-X importtime`` log."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=10, help="Runs per mode")
+    parser.add_argument(
+        "--importtime", action="store_true", help="Show the slowest imports"
+    )
+    args = parser.parse_args()
+
+    header = f"{'mode':<10} {'median':>9} {'min':>9} {'max':>9}"
+    print(f"{header}  heavy modules loaded")
+    for mode in MODES:
+        try:
+            runs = [probe(mode) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{mode:<10} skipped: {e}")
+            continue
+
+        times = [r["elapsed"] * 1000 for r in runs]
+        loaded = ", ".join(runs[-1]["loaded"]) or "-"
+        print(
+            f"{mode:<10} {statistics.median(times):>7.1f}ms {min(times):>7.1f}ms "
+            f"{max(times):>7.1f}ms  {loaded}"
+        )
+
+        if args.importtime:
+            for cumulative, name in top_imports(probe(mode, True)["importtime"]):
+                print(f"{'':<10} {cumulative / 1000:>7.1f}ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,15 @@ A minimal, modern application for:
 - Generating AI-powered summaries using DeepSeek API
 - Saving structured Markdown notes
 
+Usage:
+    python main.py                      # Launch the GUI
+    python main.py batch DIR|GLOB ...   # Headless batch run (see --help)
+
 Author: OpenCode Assistant
 Version: 2.0.0
 """
 
+import argparse
 import sys
 from pathlib import Path
 
@@ -18,12 +23,30 @@ from pathlib import Path
 project_root = Path(__file__).parent
 sys.path.insert(0, str(project_root))
 
-from src.gui.app import App
+from src.cli import add_batch_parser, run_batch
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command-line arguments (no sub-command means GUI)."""
+    parser = argparse.ArgumentParser(
+        description="AI-powered video subtitle summarization tool"
+    )
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("gui", help="Launch the GUI (default)")
+    add_batch_parser(subparsers)
+    return parser.parse_args(argv)
 
 
 def main():
     """Application entry point."""
+    args = parse_args()
+
+    if args.command == "batch":
+        sys.exit(run_batch(args))
+
     try:
+        from src.gui.app import App
+
         app = App()
         app.run()
     except Exception as e:
@@ -0,0 +1,3 @@
+from .batch import add_batch_parser, run_batch
+
+__all__ = ["add_batch_parser", "run_batch"]
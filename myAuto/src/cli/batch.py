@@ -0,0 +1,282 @@
+"""
+Headless batch runner.
+Summarizes subtitle files from directories and glob patterns without the
+GUI, reusing Settings and AsyncAISummarizer, and can keep watching the
+inputs to summarize new files as they land. Batches are journaled in the
+job queue, so ``--resume`` finishes one that was interrupted, and the
+journal's done jobs tell which inputs already have an up-to-date summary.
+"""
+
+import argparse
+import asyncio
+import glob
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Set
+
+from src.config.settings import Settings
+from src.summarizer.async_summarizer import AsyncAISummarizer
+from src.summarizer.jobs import file_digest
+from src.utils.logger import setup_logger
+from src.utils.metrics import format_stages, get_metrics
+
+SUBTITLE_EXTENSIONS = {".srt", ".vtt", ".ass", ".ssa", ".txt"}
+
+
+def add_batch_parser(subparsers) -> argparse.ArgumentParser:
+    """Register the ``batch`` sub-command."""
+    parser = subparsers.add_parser(
+        "batch", help="Summarize subtitle files without the GUI"
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Subtitle files, directories (searched recursively) or glob patterns",
+    )
+    parser.add_argument(
+        "--recursive",
+        dest="recursive",
+        action="store_true",
+        default=True,
+        help="Search directories and ** patterns recursively (default)",
+    )
+    parser.add_argument(
+        "--no-recursive",
+        dest="recursive",
+        action="store_false",
+        help="Only take files directly inside directories; ** matches one level",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="First finish the files of interrupted batches (GUI or batch)",
+    )
+    parser.add_argument(
+        "-o", "--output", help="Output directory (default: configured output_dir)"
+    )
+    parser.add_argument(
+        "-j", "--concurrency", type=int, help="Files processed in parallel"
+    )
+    parser.add_argument("--model", help="Override the configured model")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Summarize inputs even if a summary already exists",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and summarize new subtitle files as they appear",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="Write performance metrics when done: Prometheus text for "
+        ".prom, otherwise a JSON line appended",
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=5.0,
+        help="Seconds between scans in --watch mode (default: 5)",
+    )
+    return parser
+
+
+def collect_files(inputs: Iterable[str], recursive: bool = True) -> List[Path]:
+    """
+    Expand files, directories and glob patterns into subtitle files.
+
+    Directories are searched recursively and ``**`` matches any number of
+    levels unless ``recursive`` is False.
+    """
+    files: Dict[Path, None] = {}
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            found = path.rglob("*") if recursive else path.glob("*")
+            candidates = (p for p in found if p.is_file())
+        elif glob.has_magic(item):
+            candidates = (Path(p) for p in glob.glob(item, recursive=recursive))
+        else:
+            candidates = [path]
+
+        for candidate in candidates:
+            if candidate.suffix.lower() in SUBTITLE_EXTENSIONS and candidate.is_file():
+                files[candidate.resolve()] = None
+    return list(files)
+
+
+def _is_current(file_path: Path, digests: Set[str]) -> bool:
+    """Whether the file's content is one of the summarized ``digests``."""
+    try:
+        return file_digest(file_path) in digests
+    except OSError:
+        return False
+
+
+class BatchRunner:
+    """Runs (and optionally watches) a headless summarization batch."""
+
+    def __init__(self, settings: Settings, output_dir: Path, force: bool = False):
+        self.settings = settings
+        self.output_dir = output_dir
+        self.force = force
+        self.logger = setup_logger(settings.logs_dir)
+        self.summarizer = AsyncAISummarizer(settings)
+        self.succeeded = 0
+        self.failed = 0
+
+    async def _pending(self, files: List[Path]) -> List[Path]:
+        """
+        Drop files that already have a summary (unless forced).
+
+        A file counts as summarized when the journal has a done job for
+        this very path and content whose summary is still in the output
+        directory; a changed file, or one whose last job failed, is
+        summarized again.
+        """
+        if self.force:
+            return list(files)
+        done = self.summarizer.jobs.summarized(files, self.output_dir)
+        loop = asyncio.get_running_loop()
+        pending = []
+        for f in files:
+            if f not in done or not await loop.run_in_executor(
+                None, _is_current, f, done[f]
+            ):
+                pending.append(f)
+        skipped = len(files) - len(pending)
+        if skipped:
+            self.logger.info(f"Skipping {skipped} already summarized file(s)")
+        return pending
+
+    def _on_done(self, file_path: Path, result: Dict[str, Any]):
+        if result["success"]:
+            self.succeeded += 1
+            self.logger.info(f"✓ {file_path.name} → {result['output_path']}")
+        else:
+            self.failed += 1
+            self.logger.error(f"✗ {file_path.name}: {result['error']}")
+
+    async def run(self, files: List[Path]):
+        """Summarize all pending files concurrently."""
+        pending = await self._pending(files)
+        if not pending:
+            return
+        self.logger.info(
+            f"Processing {len(pending)} file(s) "
+            f"(concurrency: {self.settings.file_concurrency})"
+        )
+        await self.summarizer.summarize_many(
+            pending, self.output_dir, on_done=self._on_done
+        )
+
+    async def resume(self):
+        """Finish the unfinished jobs of interrupted batches."""
+        await self.summarizer.resume(on_done=self._on_done)
+
+    async def watch(
+        self,
+        inputs: List[str],
+        interval: float,
+        known: Iterable[Path] = (),
+        recursive: bool = True,
+    ):
+        """
+        Poll the inputs and summarize new files once their size is stable
+        across two consecutive scans (i.e. they have finished copying).
+
+        Files in ``known`` (already handled by the initial run) are ignored;
+        ``recursive`` is as for ``collect_files``.
+        """
+        seen: Set[Path] = set(known)
+        sizes: Dict[Path, int] = {}
+        tasks: Set[asyncio.Task] = set()
+        self.logger.info(f"Watching {', '.join(inputs)} (every {interval:g}s)")
+
+        while True:
+            ready = []
+            for file_path in collect_files(inputs, recursive):
+                if file_path in seen:
+                    continue
+                try:
+                    size = file_path.stat().st_size
+                except OSError:
+                    continue
+                if sizes.get(file_path) == size:
+                    seen.add(file_path)
+                    sizes.pop(file_path)
+                    ready.append(file_path)
+                else:
+                    sizes[file_path] = size
+
+            if ready:
+                task = asyncio.ensure_future(self.run(ready))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+            await asyncio.sleep(interval)
+
+    async def close(self):
+        await self.summarizer.close()
+
+
+async def _run_batch(args: argparse.Namespace, settings: Settings) -> int:
+    output_dir = Path(args.output) if args.output else settings.output_dir
+    runner = BatchRunner(settings, output_dir, force=args.force)
+
+    errors = settings.validate()
+    if errors:
+        for error in errors:
+            runner.logger.error(error)
+        return 2
+
+    if not args.inputs and not args.resume:
+        runner.logger.error("No inputs given (pass files/directories or --resume)")
+        return 2
+
+    start = time.time()
+    try:
+        if args.resume:
+            await runner.resume()
+
+        files = collect_files(args.inputs, args.recursive)
+        if args.inputs and not files and not args.watch:
+            runner.logger.error("No subtitle files found")
+            return 1
+
+        await runner.run(files)
+        if args.watch:
+            await runner.watch(
+                args.inputs, args.interval, known=files, recursive=args.recursive
+            )
+    finally:
+        await runner.close()
+
+    runner.logger.info(
+        f"Done: {runner.succeeded} succeeded, {runner.failed} failed "
+        f"in {time.time() - start:.1f}s"
+    )
+    stages = get_metrics().stage_seconds()
+    if stages:
+        runner.logger.info(f"Time by stage: {format_stages(stages)}")
+    if args.metrics:
+        get_metrics().export(Path(args.metrics))
+        runner.logger.info(f"Metrics written to {args.metrics}")
+    return 1 if runner.failed else 0
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Entry point for ``main.py batch``; returns the process exit code."""
+    settings = Settings()
+    if args.concurrency:
+        settings.set("file_concurrency", args.concurrency)
+    if args.model:
+        settings.model = args.model
+
+    try:
+        return asyncio.run(_run_batch(args, settings))
+    except KeyboardInterrupt:
+        print("Interrupted")
+        return 130
@@ -23,9 +23,8 @@ class Settings:
         self.output_dir = self.data_dir / "summaries"
         self.config_file = self.data_dir / "config.json"
 
-        # Ensure directories exist
-        for d in [self.data_dir, self.logs_dir, self.output_dir]:
-            d.mkdir(parents=True, exist_ok=True)
+        # Directories are created on first write (logger, cache, summaries,
+        # save()) rather than here, keeping startup free of disk writes
 
         # Default configuration
         self._config = {
@@ -35,6 +34,18 @@ class Settings:
             "temperature": 0.3,
             "language": "zh-CN",
             "chunk_size": 10000,  # Large chunks to minimize API calls
+            "max_concurrency": 4,  # Max in-flight API requests
+            "max_retries": 5,  # Retries for 429/5xx/connection errors
+            "rate_limit_rpm": 0,  # Requests per minute, 0 = unlimited
+            "rate_limit_tpm": 0,  # Tokens per minute, 0 = unlimited
+            "file_concurrency": 3,  # Files processed in parallel per batch
+            "stream": True,  # Stream notes to disk/GUI as they are generated
+            "cache_max_entries": 5000,  # 0 = unlimited
+            "cache_max_mb": 200,  # Total summary size cap, 0 = unlimited
+            "cache_ttl_days": 0,  # Expire entries after N days, 0 = never
+            "cache_cross_model": False,  # Reuse summaries made by other models
+            "normalize_subtitles": True,  # Dedupe rolling captions/fillers
+            "context_window": 0,  # Model context tokens, 0 = detect from model
             "output_dir": str(self.output_dir),  # Custom output directory
         }
 
@@ -72,6 +83,7 @@ class Settings:
     def save(self):
         """Save config to file."""
         try:
+            self.config_file.parent.mkdir(parents=True, exist_ok=True)
             with open(self.config_file, "w", encoding="utf-8") as f:
                 json.dump(self._config, f, indent=2, ensure_ascii=False)
         except Exception as e:
@@ -121,11 +133,22 @@ class Settings:
     def chunk_size(self) -> int:
         return self._config.get("chunk_size", 10000)
 
+    @property
+    def max_concurrency(self) -> int:
+        return max(1, int(self._config.get("max_concurrency", 4)))
+
+    @property
+    def file_concurrency(self) -> int:
+        return max(1, int(self._config.get("file_concurrency", 3)))
+
+    @property
+    def stream(self) -> bool:
+        return bool(self._config.get("stream", True))
+
     def set_output_dir(self, path: str):
         """Set custom output directory."""
         self.output_dir = Path(path)
         self._config["output_dir"] = str(path)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def validate(self) -> list:
         """Validate required settings."""
@@ -134,17 +157,8 @@ class Settings:
             errors.append("API密钥未配置，请在设置中配置。")
         return errors
 
-    def get_summary_prompt(self) -> str:
-        """Get the AI summary prompt template."""
-        return """请将以下视频字幕/转录文本总结成一篇详细的学习笔记。
-
-要求：
-1. 只提取有价值的学习内容、知识点、技术要点
-2. 忽略闲聊、广告、无关内容
-3. 使用Markdown格式，结构清晰
-4. 对重要知识点包含"Q&A"帮助理解
-
-格式：
+    # Markdown layout shared by the single-pass and merge prompts
+    NOTE_FORMAT = """格式：
 
 # 📚 [主题标题]
 
@@ -168,9 +182,68 @@ class Settings:
 
 ## 📝 总结
 [核心收获要点]
+"""
+
+    def get_summary_prompt(self) -> str:
+        """Get the AI summary prompt template."""
+        return (
+            """请将以下视频字幕/转录文本总结成一篇详细的学习笔记。
+
+要求：
+1. 只提取有价值的学习内容、知识点、技术要点
+2. 忽略闲聊、广告、无关内容
+3. 使用Markdown格式，结构清晰
+4. 对重要知识点包含"Q&A"帮助理解
+
+"""
+            + self.NOTE_FORMAT
+            + """
+---
+
+文本内容：
+{text}
+"""
+        )
+
+    def get_chunk_prompt(self) -> str:
+        """
+        Get the prompt template for one chunk of a long transcript (map step).
+
+        It deliberately omits the chunk's position so a chunk's cached
+        partial note stays valid when other chunks are added or removed.
+        """
+        return """以下是一段长视频字幕/转录文本中的一个连续片段。
+
+请提取这一部分中有价值的学习内容，输出简洁的要点笔记：
+1. 列出知识点、技术要点及其关键解释
+2. 保留重要的例子、数据和结论
+3. 忽略闲聊、广告、无关内容
+4. 使用Markdown列表，不要输出开场白或总结性套话
 
 ---
 
 文本内容：
 {text}
 """
+
+    def get_merge_prompt(self) -> str:
+        """Get the prompt template that merges chunk notes (reduce step)."""
+        return (
+            """以下是同一视频字幕按顺序分段提取的要点笔记。
+请将它们合并成一篇完整、去重、连贯的详细学习笔记。
+
+要求：
+1. 按主题重新组织知识点，合并各部分之间重复的内容
+2. 保留所有有价值的学习内容、技术要点和例子
+3. 使用Markdown格式，结构清晰
+4. 对重要知识点包含"Q&A"帮助理解
+
+"""
+            + self.NOTE_FORMAT
+            + """
+---
+
+分段笔记：
+{text}
+"""
+        )
@@ -7,15 +7,24 @@ import os
 import sys
 import threading
 import subprocess
+from collections import deque
+from functools import partial
 from pathlib import Path
+from typing import Callable, Optional
 from tkinter import filedialog, messagebox
 import customtkinter as ctk
 
 from src.config.settings import Settings
 from src.summarizer.ai_summarizer import AISummarizer
 from src.utils.logger import get_logger, setup_logger
+from src.utils.metrics import format_stages, get_metrics
 
 
+# 日志框刷新间隔（毫秒，约每帧一次）：后台线程只入队，主线程定时合并插入
+LOG_FLUSH_MS = 16
+# 日志框最多保留的行数，超出后删除最早的行
+LOG_MAX_LINES = 5000
+
 # 设置窗口背景色
 ctk.set_appearance_mode("light")
 ctk.set_default_color_theme("blue")
@@ -42,10 +51,26 @@ class App(ctk.CTk):
         self.selected_files: list[Path] = []
         self.is_processing = False
 
+        # 待写入日志框的文本（任意线程追加，主线程取出），每项为完整的行；
+        # 积压超过日志框可保留的行数时丢弃最早的，反正插入后也会被裁剪
+        self._log_pending: deque[str] = deque(maxlen=LOG_MAX_LINES)
+        # 待在主线程执行的界面更新（进度、状态等），随日志一起刷新
+        self._ui_pending: deque[Callable[[], None]] = deque()
+
+        # 流式预览：同一时间只预览一个文件
+        self._stream_lock = threading.Lock()
+        self._stream_owner: Optional[Path] = None
+        # 流式增量中尚未凑成整行的部分（_stream_lock 保护）
+        self._stream_partial = ""
+
         # 构建界面
         self._create_ui()
 
         self.logger.info("应用程序已启动")
+        self.after(LOG_FLUSH_MS, self._flush_log)
+
+        # 上次中断的批处理可以继续
+        self.after(200, self._check_unfinished_jobs)
 
     def _create_ui(self):
         """创建用户界面"""
@@ -234,9 +259,77 @@ class App(ctk.CTk):
         self._update_api_status()
 
     def _log(self, message: str):
-        """添加日志消息"""
-        self.log_text.insert("end", f"{message}\n")
-        self.log_text.see("end")
+        """添加日志消息（可在任意线程中调用）"""
+        with self._stream_lock:
+            self._flush_partial()
+            self._log_pending.append(f"{message}\n")
+
+    def _call_in_ui(self, func: Callable, *args):
+        """安排 func(*args) 在主线程执行（可在任意线程中调用）"""
+        self._ui_pending.append(partial(func, *args))
+
+    def _flush_log(self):
+        """刷新日志框并执行待处理的界面更新（主线程定时执行）"""
+        try:
+            self._insert_pending_log()
+            # 在日志之后执行，完成提示弹出时日志已全部显示
+            while self._ui_pending:
+                self._ui_pending.popleft()()
+        finally:
+            self.after(LOG_FLUSH_MS, self._flush_log)
+
+    def _insert_pending_log(self):
+        """将积压的日志一次性插入日志框并裁剪旧行"""
+        with self._stream_lock:
+            # 让正在生成的行也能实时显示
+            self._flush_partial()
+        chunks = []
+        try:
+            while True:
+                chunks.append(self._log_pending.popleft())
+        except IndexError:
+            pass
+
+        if chunks:
+            # 用户向上翻看时不强制滚动到底部
+            at_bottom = self.log_text.yview()[1] >= 0.999
+            self.log_text.insert("end", "".join(chunks))
+
+            lines = int(self.log_text.index("end-1c").split(".")[0])
+            if lines > LOG_MAX_LINES:
+                self.log_text.delete("1.0", f"{lines - LOG_MAX_LINES + 1}.0")
+            if at_bottom:
+                self.log_text.see("end")
+
+    def _on_stream_delta(self, file_path: Path, delta: str):
+        """接收流式增量（在后台线程中调用），随日志一起按帧刷新"""
+        with self._stream_lock:
+            if self._stream_owner is None:
+                self._stream_owner = file_path
+                self._stream_text(f"\n--- {file_path.name} ---\n")
+            if self._stream_owner == file_path:
+                self._stream_text(delta)
+
+    def _end_stream(self, file_path: Path):
+        """文件完成后释放流式预览"""
+        with self._stream_lock:
+            if self._stream_owner == file_path:
+                self._stream_owner = None
+                self._stream_text("\n")
+
+    def _stream_text(self, text: str):
+        """将增量拼成整行后加入待写日志（需持有 _stream_lock）"""
+        self._stream_partial += text
+        cut = self._stream_partial.rfind("\n") + 1
+        if cut:
+            self._log_pending.append(self._stream_partial[:cut])
+            self._stream_partial = self._stream_partial[cut:]
+
+    def _flush_partial(self):
+        """将未完成的行加入待写日志（需持有 _stream_lock）"""
+        if self._stream_partial:
+            self._log_pending.append(self._stream_partial)
+            self._stream_partial = ""
 
     def _update_status(self, text: str):
         """更新状态栏"""
@@ -289,6 +382,38 @@ class App(ctk.CTk):
             self._open_settings()
             return
 
+        self._start_processing(list(self.selected_files))
+
+    def _check_unfinished_jobs(self):
+        """启动时检查上次中断的任务，询问是否继续"""
+        try:
+            jobs = self.summarizer.jobs.unfinished()
+        except Exception as e:
+            self.logger.warning(f"读取任务队列失败: {e}")
+            return
+        if not jobs:
+            return
+
+        names = ", ".join(job.path.name for job in jobs[:3])
+        if len(jobs) > 3:
+            names += f" ... (还有{len(jobs) - 3}个)"
+        if not messagebox.askyesno(
+            "继续未完成的任务",
+            f"上次有 {len(jobs)} 个文件未处理完成：\n{names}\n\n"
+            "是否继续？已完成的部分不会重复请求 API。",
+        ):
+            self.summarizer.jobs.discard()
+            return
+
+        errors = self.settings.validate()
+        if errors:
+            messagebox.showerror("配置错误", "\n".join(errors))
+            return
+
+        self._start_processing([job.path for job in jobs], resume=True)
+
+    def _start_processing(self, files: list, resume: bool = False):
+        """在后台线程中处理文件（resume 为 True 时继续任务队列中的任务）"""
         if self.is_processing:
             return
 
@@ -297,35 +422,73 @@ class App(ctk.CTk):
         self.progress.set(0)
 
         # 在后台线程中运行
-        thread = threading.Thread(target=self._process_files, daemon=True)
+        thread = threading.Thread(
+            target=self._process_files, args=(files, resume), daemon=True
+        )
         thread.start()
 
-    def _process_files(self):
-        """后台处理文件"""
-        total = len(self.selected_files)
-        success = 0
+    def _process_files(self, files: list, resume: bool = False):
+        """后台并发处理文件"""
+        total = len(files)
+        state = {"done": 0, "success": 0}
+        # 统计是进程级累计的，只报告本批次新增的耗时
+        stages_before = get_metrics().stage_seconds()
 
-        for i, file_path in enumerate(self.selected_files):
-            self._log(f"\n[{i + 1}/{total}] 正在处理: {file_path.name}")
-            self._update_status(f"处理中 {i + 1}/{total}...")
+        self._log(
+            f"\n{'继续' if resume else '开始'}处理 {total} 个文件 (并发数: "
+            f"{min(self.settings.file_concurrency, total)})"
+        )
+
+        def on_start(file_path: Path):
+            self._log(f"正在处理: {file_path.name}")
 
-            result = self.summarizer.summarize_file(file_path)
+        # 回调在总结器的事件循环线程中按完成顺序执行
+        def on_done(file_path: Path, result: dict):
+            self._end_stream(file_path)
+            state["done"] += 1
+            done = state["done"]
 
             if result["success"]:
-                success += 1
-                self._log(f"✓ 总结已保存: {result['output_path'].name}")
+                state["success"] += 1
+                saved = result.get("normalize", {}).get("tokens_saved", 0)
+                self._log(
+                    f"[{done}/{total}] ✓ {file_path.name} → "
+                    f"{result['output_path'].name}"
+                    + (f" (去重节省约 {saved} tokens)" if saved > 0 else "")
+                )
             else:
-                self._log(f"✗ 错误: {result['error']}")
+                self._log(f"[{done}/{total}] ✗ {file_path.name}: {result['error']}")
 
             # 更新进度
-            progress = (i + 1) / total
-            self.after(0, lambda p=progress: self.progress.set(p))
+            progress = done / total
+            self._call_in_ui(self.progress.set, progress)
+            self._call_in_ui(self._update_status, f"处理中 {done}/{total}...")
+
+        callbacks = dict(
+            on_start=on_start,
+            on_done=on_done,
+            on_delta=self._on_stream_delta if self.settings.stream else None,
+        )
+        try:
+            if resume:
+                self.summarizer.resume(**callbacks)
+            else:
+                self.summarizer.summarize_many(files, **callbacks)
+        except Exception as e:
+            self._log(f"✗ 批处理失败: {e}")
 
         # 完成
         self._log(f"\n{'=' * 50}")
-        self._log(f"处理完成: {success}/{total} 个文件成功")
+        self._log(f"处理完成: {state['success']}/{total} 个文件成功")
+        stats = self.summarizer.cache_stats()
+        self._log(
+            f"缓存: {stats['entries']} 条, 命中 {stats['hits']} / 未命中 {stats['misses']}"
+        )
+        stages = get_metrics().stage_seconds(since=stages_before)
+        if stages:
+            self._log(f"耗时分布: {format_stages(stages)}")
 
-        self.after(0, self._on_process_complete)
+        self._call_in_ui(self._on_process_complete)
 
     def _on_process_complete(self):
         """处理完成回调"""
@@ -360,7 +523,9 @@ class App(ctk.CTk):
 
     def _open_settings(self):
         """打开设置对话框"""
-        SettingsDialog(self, self.settings, self._on_settings_saved)
+        SettingsDialog(
+            self, self.settings, self.summarizer, self._on_settings_saved
+        )
 
     def _on_settings_saved(self):
         """设置保存回调"""
@@ -375,10 +540,17 @@ class App(ctk.CTk):
 class SettingsDialog(ctk.CTkToplevel):
     """设置对话框"""
 
-    def __init__(self, parent, settings: Settings, on_save_callback=None):
+    def __init__(
+        self,
+        parent,
+        settings: Settings,
+        summarizer: AISummarizer,
+        on_save_callback=None,
+    ):
         super().__init__(parent)
 
         self.settings = settings
+        self.summarizer = summarizer
         self.on_save_callback = on_save_callback
 
         self.title("设置")
@@ -532,14 +704,12 @@ class SettingsDialog(ctk.CTkToplevel):
 
     def _test_connection(self):
         """测试API连接"""
-        # 临时更新设置
-        self.settings.api_key = self.api_key_entry.get().strip()
-        self.settings.api_base_url = self.api_url_entry.get().strip()
-        self.settings.model = self.model_entry.get().strip()
-
-        summarizer = AISummarizer(self.settings)
-
-        if summarizer.test_connection():
+        # 只测试输入框中的配置，不修改共享的设置，也不替换正在处理的任务所用的连接
+        if self.summarizer.test_connection(
+            api_key=self.api_key_entry.get().strip(),
+            base_url=self.api_url_entry.get().strip(),
+            model=self.model_entry.get().strip(),
+        ):
             messagebox.showinfo("成功", "API连接成功！")
         else:
             messagebox.showerror("失败", "API连接失败，请检查设置。")
@@ -0,0 +1,16 @@
+from .normalize import NormalizeStats, normalize_cues
+from .parser import Cue, iter_cues, parse_ass, parse_srt, parse_text, parse_vtt
+from .reader import detect_encoding, iter_lines
+
+__all__ = [
+    "Cue",
+    "NormalizeStats",
+    "detect_encoding",
+    "iter_cues",
+    "iter_lines",
+    "normalize_cues",
+    "parse_ass",
+    "parse_srt",
+    "parse_text",
+    "parse_vtt",
+]
@@ -0,0 +1,188 @@
+"""
+Subtitle normalization module.
+Cleans parsed cues before they reach the LLM: merges rolling
+(auto-generated) captions, drops filler tokens and exact/near-duplicate
+lines, and collapses whitespace, while counting what was saved.
+"""
+
+import re
+from collections import deque
+from difflib import SequenceMatcher
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from src.utils.tokens import estimate_tokens
+
+from .parser import Cue
+
+_WHITESPACE = re.compile(r"\s+")
+# [Music], [音乐], (笑), （掌声）, ♪ ... ♪ sound annotations. Only known sound
+# words in a bracket that does not follow a word character count, so code
+# and math such as f(x), a[0] or print(hello) are kept.
+_SOUNDS = (
+    "音乐|背景音乐|音效|掌声|鼓掌|笑声|笑|大笑|欢呼|叹气|咳嗽|静音|听不清|噪音"
+    "|music|applause|laughter|laughs|laughing|cheering|cheers|silence"
+    "|inaudible|noise|sighs|coughs|coughing"
+)
+_ANNOTATION = re.compile(
+    rf"(?i)(?<!\w)[\[【(（]\s*(?:{_SOUNDS})(?:\s+\w+){{0,2}}\s*[\]】)）]|[♪♫]+"
+)
+# Interjections that carry no content, as whole words / standalone CJK fillers
+_FILLER = re.compile(
+    r"(?i)\b(?:um+|uh+|erm+|hmm+|ah+)\b[,.]?"
+    r"|(?:^|(?<=[\s，。！？、,]))(?:嗯+|呃+|额+|唔+|啊+)(?=[\s，。！？、,]|$)[，、,]?"
+)
+# A line must keep at least one word character to be worth sending
+_CONTENT = re.compile(r"\w")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+class NormalizeStats:
+    """Counters describing what normalization removed from one file."""
+
+    def __init__(self):
+        self.cues_in = 0
+        self.cues_out = 0
+        self.chars_in = 0
+        self.chars_out = 0
+        self.tokens_in = 0
+        self.tokens_out = 0
+
+    @property
+    def chars_saved(self) -> int:
+        return self.chars_in - self.chars_out
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_in - self.tokens_out
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cues_in": self.cues_in,
+            "cues_out": self.cues_out,
+            "chars_in": self.chars_in,
+            "chars_out": self.chars_out,
+            "chars_saved": self.chars_saved,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def clean_line(line: str) -> str:
+    """Remove annotations and fillers, collapse whitespace."""
+    line = _ANNOTATION.sub(" ", line)
+    line = _FILLER.sub(" ", line)
+    return _WHITESPACE.sub(" ", line).strip(" ，、,")
+
+
+def _dedupe_key(line: str) -> str:
+    """Comparison form of a line: case-folded, punctuation/spaces removed."""
+    return _NON_WORD.sub("", line).casefold()
+
+
+def _is_cjk(char: str) -> bool:
+    return "\u3400" <= char <= "\u9fff" or "\uf900" <= char <= "\ufaff"
+
+
+def _overlap(previous: str, line: str, min_overlap: int) -> int:
+    """
+    Length of the longest suffix of ``previous`` that prefixes ``line``.
+
+    The overlap must be at least ``min_overlap`` characters and lie on word
+    boundaries in both lines, so a short cue that is merely a character
+    prefix of the next one ("So" / "Sorry") is not cut out of it. Without
+    spaces to go by, CJK text only counts when the whole previous line is
+    repeated.
+    """
+    for size in range(min(len(previous), len(line)), min_overlap - 1, -1):
+        if not previous.endswith(line[:size]):
+            continue
+        whole = size == len(previous)
+        if not whole and previous[-size - 1].isalnum():
+            continue
+        if size < len(line) and line[size].isalnum():
+            # Mid-word in ``line``: only a repeated CJK line may end there
+            if not (whole and _is_cjk(line[size - 1]) and _is_cjk(line[size])):
+                continue
+        return size
+    return 0
+
+
+def normalize_cues(
+    cues: Iterable[Cue],
+    stats: Optional[NormalizeStats] = None,
+    window: int = 3,
+    similarity: float = 0.95,
+    min_overlap: int = 8,
+    min_similar: int = 10,
+) -> Iterator[Cue]:
+    """
+    Normalize a cue stream lazily.
+
+    Args:
+        cues: Parsed cues (e.g. from ``iter_cues``)
+        stats: Optional counters updated as cues are consumed
+        window: Number of recently emitted lines checked for duplicates
+        similarity: SequenceMatcher ratio at or above which a line counts
+            as a near-duplicate
+        min_overlap: Minimum characters of suffix/prefix overlap treated as
+            a rolling caption continuation
+        min_similar: Minimum length (of the compared forms) below which
+            only exact repeats count as duplicates
+
+    Yields:
+        Cues with cleaned text; cues left empty are dropped
+    """
+    recent_keys: deque = deque(maxlen=window)
+    # Last line as displayed (before trimming): rolling captions repeat it
+    previous = ""
+
+    for cue in cues:
+        if stats:
+            stats.cues_in += 1
+            stats.chars_in += len(cue.text)
+            stats.tokens_in += estimate_tokens(cue.text)
+
+        kept = []
+        for raw in cue.text.split("\n"):
+            line = clean_line(raw)
+            if not _CONTENT.search(line):
+                continue
+
+            shown, previous = previous, line
+            if shown:
+                # Rolling caption: the line repeats the tail of the last one
+                overlap = _overlap(shown, line, min_overlap)
+                if overlap:
+                    line = line[overlap:].strip(" ，、,")
+                    if not _CONTENT.search(line):
+                        continue
+
+            key = _dedupe_key(line)
+            duplicate = False
+            for seen in recent_keys:
+                if key == seen:
+                    duplicate = True
+                    break
+                if min(len(key), len(seen)) < min_similar:
+                    continue
+                matcher = SequenceMatcher(None, seen, key, autojunk=False)
+                if (
+                    matcher.quick_ratio() >= similarity
+                    and matcher.ratio() >= similarity
+                ):
+                    duplicate = True
+                    break
+            if duplicate:
+                continue
+
+            kept.append(line)
+            recent_keys.append(key)
+
+        if not kept:
+            continue
+
+        text = "\n".join(kept)
+        if stats:
+            stats.cues_out += 1
+            stats.chars_out += len(text)
+            stats.tokens_out += estimate_tokens(text)
+        yield Cue(cue.start, cue.end, text)
@@ -0,0 +1,207 @@
+"""
+Subtitle parser module.
+Single-pass, generator-based parsers for SRT, WebVTT and ASS/SSA.
+
+Each parser consumes an iterable of lines (e.g. an open file) and yields
+Cue objects one at a time, so memory use does not grow with file length.
+``iter_cues`` feeds them from ``reader.iter_lines``, which detects the
+file's encoding.
+"""
+
+import re
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple, Optional
+
+from .reader import iter_lines
+
+
+class Cue(NamedTuple):
+    """One subtitle cue; times are in seconds (None for plain text)."""
+
+    start: Optional[float]
+    end: Optional[float]
+    text: str
+
+
+# 00:00:01,000 (SRT), 00:01.000 / 00:00:01.000 (VTT), 0:00:01.00 (ASS)
+_TIMESTAMP = re.compile(r"(?:(\d+):)?(\d{1,2}):(\d{1,2})(?:[,.](\d{1,3}))?")
+_ARROW = "-->"
+
+# <i>, </font>, <c.yellow>, <v Speaker>, <00:00:01.000> inline timings; only
+# known tags, so text such as "a < b > c" survives
+_HTML_TAG = re.compile(
+    r"</?(?:[ibus]|font|c|v|lang|ruby|rt)(?:[.\s][^<>]*)?>"
+    r"|<\d+(?::\d+)+(?:\.\d+)?>",
+    re.IGNORECASE,
+)
+# {\an8}, {\b1}, {\pos(10,20)} ASS override blocks (also seen in SRT)
+_ASS_OVERRIDE = re.compile(r"\{\\[^}]*\}")
+
+
+def parse_timestamp(value: str) -> Optional[float]:
+    """Parse an SRT/VTT/ASS timestamp into seconds."""
+    match = _TIMESTAMP.match(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    total = int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+    if fraction:
+        total += int(fraction) / 10 ** len(fraction)
+    return total
+
+
+def _clean(text: str) -> str:
+    """Strip markup tags and override blocks from cue text."""
+    text = _ASS_OVERRIDE.sub("", _HTML_TAG.sub("", text))
+    return text.replace("&nbsp;", " ").replace("&amp;", "&").strip()
+
+
+def _parse_timing(line: str):
+    """Parse a ``start --> end [settings]`` line into (start, end)."""
+    start, _, rest = line.partition(_ARROW)
+    end = rest.strip().split(" ", 1)[0]
+    return parse_timestamp(start), parse_timestamp(end)
+
+
+def _iter_timed(lines: Iterable[str]) -> Iterator[Cue]:
+    """
+    Stream SRT/VTT cues, one at a time.
+
+    A cue starts at its timing line and runs to the next blank line or the
+    next timing line, so files without blank separators still split per
+    cue. A bare number right before a timing line is that cue's index and
+    is dropped; text before the first timing line of a block (VTT header,
+    NOTE/STYLE blocks, cue identifiers) is ignored.
+    """
+    timing = None
+    text = []
+    # A bare number is held back until we know whether a timing line follows
+    held = None
+
+    def cue():
+        start, end = _parse_timing(timing)
+        cleaned = "\n".join(t for t in (_clean(x) for x in text) if t)
+        return Cue(start, end, cleaned) if cleaned else None
+
+    for raw in lines:
+        line = raw.rstrip("\r\n").strip("\ufeff")
+        if _ARROW in line:
+            if timing is not None:
+                result = cue()
+                if result:
+                    yield result
+            timing, text, held = line, [], None
+            continue
+        if timing is None:
+            continue
+        if held is not None:
+            text.append(held)
+            held = None
+        if not line.strip():
+            result = cue()
+            if result:
+                yield result
+            timing, text = None, []
+        elif line.strip().isdigit():
+            held = line
+        else:
+            text.append(line)
+
+    if timing is not None:
+        if held is not None:
+            text.append(held)
+        result = cue()
+        if result:
+            yield result
+
+
+def parse_srt(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse SubRip (.srt) lines into cues."""
+    return _iter_timed(lines)
+
+
+def parse_vtt(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse WebVTT (.vtt) lines into cues, skipping header/NOTE/STYLE."""
+    return _iter_timed(lines)
+
+
+def parse_ass(lines: Iterable[str]) -> Iterator[Cue]:
+    """Parse Advanced SubStation Alpha (.ass/.ssa) Dialogue lines into cues."""
+    in_events = False
+    # Default V4+ event fields, overridden by the section's Format: line
+    fields = [
+        "layer",
+        "start",
+        "end",
+        "style",
+        "name",
+        "marginl",
+        "marginr",
+        "marginv",
+        "effect",
+        "text",
+    ]
+
+    for raw in lines:
+        line = raw.strip().strip("\ufeff")
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events:
+            continue
+
+        key, _, value = line.partition(":")
+        key = key.strip().lower()
+        if key == "format":
+            fields = [f.strip().lower() for f in value.split(",")]
+        elif key == "dialogue":
+            # Text is always last and may itself contain commas
+            values = value.split(",", len(fields) - 1)
+            if len(values) < len(fields):
+                continue
+            row = dict(zip(fields, values))
+            text = row.get("text", "")
+            text = text.replace("\\N", "\n").replace("\\n", "\n").replace("\\h", " ")
+            text = "\n".join(t for t in (_clean(x) for x in text.split("\n")) if t)
+            if text:
+                yield Cue(
+                    parse_timestamp(row.get("start", "")),
+                    parse_timestamp(row.get("end", "")),
+                    text,
+                )
+
+
+def parse_text(lines: Iterable[str]) -> Iterator[Cue]:
+    """Treat each non-empty line of a plain-text transcript as a cue."""
+    for raw in lines:
+        line = raw.strip().strip("\ufeff")
+        if line:
+            yield Cue(None, None, line)
+
+
+PARSERS = {
+    ".srt": parse_srt,
+    ".vtt": parse_vtt,
+    ".ass": parse_ass,
+    ".ssa": parse_ass,
+}
+
+
+def iter_cues(
+    file_path: Path,
+    wrap_lines: Optional[Callable[[Iterable[str]], Iterable[str]]] = None,
+    encoding: Optional[str] = None,
+) -> Iterator[Cue]:
+    """
+    Stream cues from a subtitle file, choosing the parser by extension.
+
+    Unknown extensions are read as plain text. ``wrap_lines`` may wrap the
+    raw line iterator (e.g. to time reading separately from parsing). The
+    encoding is detected from the file unless ``encoding`` is given.
+    """
+    parser = PARSERS.get(file_path.suffix.lower(), parse_text)
+    lines = iter_lines(file_path, encoding)
+    try:
+        yield from parser(wrap_lines(lines) if wrap_lines else lines)
+    finally:
+        lines.close()
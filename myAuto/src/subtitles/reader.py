@@ -0,0 +1,170 @@
+"""
+Subtitle file reader module.
+Streams decoded lines from subtitle files of any size and encoding.
+
+The encoding is sniffed from a prefix of the file: a byte order mark
+(UTF-8/16/32), BOM-less UTF-16 (NUL byte pattern), UTF-8, then GB18030
+(a superset of GBK/GB2312, common for Chinese subtitles). Large files
+are memory-mapped and decoded incrementally in chunks, so memory use
+stays bounded by the chunk size rather than the file size.
+
+A sniffed UTF-8 or GB18030 guess is decoded strictly: if a later part of
+the file does not decode (e.g. a GBK file whose first 64KB are ASCII),
+reading restarts with the other encoding and skips the lines already
+produced. Only when neither fits are bad bytes replaced with U+FFFD.
+"""
+
+import codecs
+import io
+import mmap
+from pathlib import Path
+from typing import Iterator, Optional
+
+# Bytes inspected to detect the encoding
+SNIFF_BYTES = 64 * 1024
+# Bytes decoded per step
+CHUNK_BYTES = 1024 * 1024
+# Files at least this large are memory-mapped instead of read
+MMAP_THRESHOLD = 8 * 1024 * 1024
+
+# Guesses tried in turn when the sniffed one fails later in the file
+_FALLBACKS = ("utf-8", "gb18030")
+
+# Longest BOMs first: the UTF-32-LE BOM starts with the UTF-16-LE one
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def _decodes(prefix: bytes, encoding: str) -> bool:
+    """Whether ``prefix`` is valid ``encoding`` (a cut-off last char is ok)."""
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(prefix, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(prefix: bytes) -> str:
+    """
+    Guess the encoding of a subtitle file from its first bytes.
+
+    Args:
+        prefix: The first bytes of the file (``SNIFF_BYTES`` is plenty)
+
+    Returns:
+        A codec name; ``utf-8`` when nothing fits better
+    """
+    for bom, encoding in _BOMS:
+        if prefix.startswith(bom):
+            return encoding
+
+    # Timestamps and digits are ASCII, so BOM-less UTF-16 has a NUL in
+    # every other byte of most characters
+    sample = prefix[:4096]
+    if len(sample) >= 4:
+        even = sample[0::2].count(0) / (len(sample) // 2)
+        odd = sample[1::2].count(0) / (len(sample) // 2)
+        if odd > 0.3 and even < 0.05:
+            return "utf-16-le"
+        if even > 0.3 and odd < 0.05:
+            return "utf-16-be"
+
+    if _decodes(prefix, "utf-8"):
+        return "utf-8"
+    if _decodes(prefix, "gb18030"):
+        return "gb18030"
+    return "utf-8"
+
+
+def _decode_lines(
+    chunks: Iterator, encoding: str, errors: str = "replace"
+) -> Iterator[str]:
+    """
+    Decode byte chunks into lines ending in ``\\n``.
+
+    Like text-mode ``open``, ``\\r\\n`` and ``\\r`` are translated to
+    ``\\n`` (also across chunk boundaries); undecodable bytes become U+FFFD,
+    or raise UnicodeDecodeError with ``errors="strict"``.
+    """
+    decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(encoding)(errors=errors), translate=True
+    )
+    pending = ""
+    for chunk in chunks:
+        text = pending + decoder.decode(chunk)
+        cut = text.rfind("\n") + 1
+        pending = text[cut:]
+        # Splitting in C is noticeably faster than str.split + concat
+        yield from io.StringIO(text[:cut], newline="\n")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def _mapped_chunks(f, size: int) -> Iterator[memoryview]:
+    """Zero-copy chunks of a memory-mapped file."""
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mapped) as view:
+            for offset in range(0, size, CHUNK_BYTES):
+                # Views must be released before the map can be closed
+                with view[offset : offset + CHUNK_BYTES] as chunk:
+                    yield chunk
+
+
+def _read_chunks(f) -> Iterator[bytes]:
+    while True:
+        chunk = f.read(CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_lines(file_path: Path, encoding: Optional[str] = None) -> Iterator[str]:
+    """
+    Stream the decoded lines of a text file.
+
+    Args:
+        file_path: File to read
+        encoding: Codec to use; detected from the file's prefix if None
+            (with fallback to the other guess, see the module docstring)
+
+    Yields:
+        Lines with ``\\n`` endings (the last one may have none)
+    """
+    with open(file_path, "rb") as f:
+        attempts = []
+        if encoding is None:
+            encoding = detect_encoding(f.read(SNIFF_BYTES))
+            if encoding in _FALLBACKS:
+                others = [e for e in _FALLBACKS if e != encoding]
+                attempts = [(e, "strict") for e in (encoding, *others)]
+        # Last resort: replace whatever does not decode
+        attempts.append((encoding, "replace"))
+
+        size = f.seek(0, io.SEEK_END)
+        produced = 0
+        for codec, errors in attempts:
+            f.seek(0)
+            if size >= MMAP_THRESHOLD:
+                chunks = _mapped_chunks(f, size)
+            else:
+                chunks = _read_chunks(f)
+            try:
+                for index, line in enumerate(_decode_lines(chunks, codec, errors)):
+                    # After a restart, skip what the failed attempt produced
+                    if index >= produced:
+                        produced += 1
+                        yield line
+                return
+            except UnicodeDecodeError:
+                continue
+            finally:
+                # Unmap now even if the caller stopped early
+                chunks.close()
@@ -1,3 +1,5 @@
 from .ai_summarizer import AISummarizer
+from .async_summarizer import AsyncAISummarizer
+from .jobs import Job, JobQueue
 
-__all__ = ["AISummarizer"]
+__all__ = ["AISummarizer", "AsyncAISummarizer", "Job", "JobQueue"]
@@ -2,17 +2,39 @@
 AI Summarizer module.
 Handles subtitle text summarization using DeepSeek API.
 Optimized for minimal token usage with caching and efficient chunking.
+
+AISummarizer is a thin blocking wrapper over AsyncAISummarizer: every call
+is scheduled on one shared background event loop, so all callers share the
+pooled API clients and the rate limiter that live on that loop.
 """
 
-import time
-import hashlib
-import json
+import asyncio
+import queue
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
-from openai import OpenAI
+from typing import Optional, Dict, Any, List, Iterable, Callable, Iterator
 
 from src.utils.logger import get_logger
 from src.config.settings import Settings
+from src.summarizer.async_summarizer import AsyncAISummarizer
+from src.summarizer.jobs import JobQueue
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared background event loop, starting it on first use."""
+    global _loop
+
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(
+                target=_loop.run_forever, name="summarizer-loop", daemon=True
+            )
+            thread.start()
+    return _loop
 
 
 class AISummarizer:
@@ -20,140 +42,66 @@ class AISummarizer:
 
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.client: Optional[OpenAI] = None
-        self._cache_dir = settings.data_dir / "cache"
-        self._cache_dir.mkdir(parents=True, exist_ok=True)
         self.logger = get_logger()
+        self.async_summarizer = AsyncAISummarizer(settings)
 
-    def _init_client(self) -> bool:
-        """Initialize OpenAI client."""
-        if not self.settings.api_key:
-            self.logger.error("API key not configured")
-            return False
+    def _run(self, coro):
+        """Run a coroutine on the shared loop and block for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, _get_loop()).result()
 
-        try:
-            self.client = OpenAI(
-                api_key=self.settings.api_key,
-                base_url=self.settings.api_base_url,
-            )
-            return True
-        except Exception as e:
-            self.logger.error(f"Failed to initialize API client: {e}")
-            return False
-
-    def _get_cache_key(self, text: str) -> str:
-        """Generate cache key from text content."""
-        return hashlib.md5(text.encode()).hexdigest()
-
-    def _get_cached(self, cache_key: str) -> Optional[str]:
-        """Get cached summary if exists."""
-        cache_file = self._cache_dir / f"{cache_key}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    self.logger.info("Using cached summary")
-                    return data.get("summary")
-            except Exception:
-                pass
-        return None
-
-    def _save_cache(self, cache_key: str, summary: str):
-        """Save summary to cache."""
-        cache_file = self._cache_dir / f"{cache_key}.json"
-        try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump({"summary": summary, "timestamp": time.time()}, f)
-        except Exception:
-            pass
-
-    def summarize(self, text: str, title: str = "") -> Dict[str, Any]:
+    def summarize(
+        self,
+        text: str,
+        title: str = "",
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
         """
         Summarize text content.
 
         Args:
             text: The subtitle/transcript text to summarize
             title: Optional title for context
+            on_delta: Optional callback receiving each streamed text delta
+                (called on the background loop thread)
 
         Returns:
             Dict with success status, summary, and metadata
         """
-        result = {
-            "success": False,
-            "summary": "",
-            "error": None,
-            "tokens_used": 0,
-            "cached": False,
-            "processing_time": 0,
-        }
-
-        start_time = time.time()
+        return self._run(self.async_summarizer.summarize(text, title, on_delta))
 
-        # Check cache first (token optimization)
-        cache_key = self._get_cache_key(text)
-        cached = self._get_cached(cache_key)
-        if cached:
-            result["success"] = True
-            result["summary"] = cached
-            result["cached"] = True
-            result["processing_time"] = time.time() - start_time
-            return result
+    def stream(self, text: str, title: str = "") -> Iterator[str]:
+        """
+        Summarize text, yielding the note as text deltas as they arrive.
 
-        # Initialize client
-        if not self.client and not self._init_client():
-            result["error"] = "Failed to initialize API client"
-            return result
+        Raises:
+            RuntimeError: If summarization fails (after any partial output)
+        """
+        deltas: queue.Queue = queue.Queue()
+        future = asyncio.run_coroutine_threadsafe(
+            self.async_summarizer.summarize(text, title, on_delta=deltas.put),
+            _get_loop(),
+        )
+        future.add_done_callback(lambda _: deltas.put(None))
 
         try:
-            # Prepare prompt with text
-            prompt = self.settings.get_summary_prompt().format(text=text)
-
-            # Add title context if provided
-            if title:
-                prompt = f"视频标题: {title}\n\n{prompt}"
-
-            self.logger.info(f"Sending request to API (text length: {len(text)} chars)")
-
-            # Make API call with optimized parameters
-            response = self.client.chat.completions.create(
-                model=self.settings.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是一个专业的学习笔记生成助手，能够将视频字幕转换为结构化的学习笔记。请直接输出笔记内容，不要有多余的开场白。",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=4000,
-                temperature=self.settings.temperature,
-            )
-
-            if response.choices:
-                summary = response.choices[0].message.content.strip()
-                result["success"] = True
-                result["summary"] = summary
-                result["tokens_used"] = (
-                    response.usage.total_tokens if response.usage else 0
-                )
-
-                # Cache the result
-                self._save_cache(cache_key, summary)
-
-                self.logger.info(
-                    f"Summary generated successfully (tokens: {result['tokens_used']})"
-                )
-            else:
-                result["error"] = "Empty response from API"
-
-        except Exception as e:
-            result["error"] = str(e)
-            self.logger.error(f"API call failed: {e}")
-
-        result["processing_time"] = time.time() - start_time
-        return result
+            while True:
+                delta = deltas.get()
+                if delta is None:
+                    break
+                yield delta
+        finally:
+            if not future.done():
+                future.cancel()
+
+        result = future.result()
+        if not result["success"]:
+            raise RuntimeError(result["error"])
 
     def summarize_file(
-        self, file_path: Path, output_dir: Path = None
+        self,
+        file_path: Path,
+        output_dir: Path = None,
+        on_delta: Optional[Callable[[str], None]] = None,
     ) -> Dict[str, Any]:
         """
         Summarize a subtitle file and save the result.
@@ -161,114 +109,78 @@ class AISummarizer:
         Args:
             file_path: Path to the subtitle file (.srt, .txt, etc.)
             output_dir: Directory to save the summary (default: settings.output_dir)
+            on_delta: Optional callback receiving each streamed text delta
 
         Returns:
             Dict with success status and output path
         """
-        result = {
-            "success": False,
-            "output_path": None,
-            "error": None,
-        }
-
-        if not file_path.exists():
-            result["error"] = f"File not found: {file_path}"
-            return result
-
-        # Read file content
-        try:
-            text = self._read_subtitle_file(file_path)
-        except Exception as e:
-            result["error"] = f"Failed to read file: {e}"
-            return result
-
-        if not text.strip():
-            result["error"] = "File is empty"
-            return result
-
-        # Get title from filename
-        title = file_path.stem
-
-        # Summarize
-        summary_result = self.summarize(text, title)
-
-        if not summary_result["success"]:
-            result["error"] = summary_result["error"]
-            return result
-
-        # Save summary
-        output_dir = output_dir or self.settings.output_dir
-        output_dir.mkdir(parents=True, exist_ok=True)
-
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        output_file = output_dir / f"{title}_summary_{timestamp}.md"
-
-        try:
-            with open(output_file, "w", encoding="utf-8") as f:
-                f.write(summary_result["summary"])
-
-            result["success"] = True
-            result["output_path"] = output_file
-            self.logger.info(f"Summary saved to: {output_file}")
-
-        except Exception as e:
-            result["error"] = f"Failed to save summary: {e}"
-
-        return result
-
-    def _read_subtitle_file(self, file_path: Path) -> str:
-        """Read and clean subtitle file content."""
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-
-        # If it's an SRT file, extract just the text
-        if file_path.suffix.lower() == ".srt":
-            return self._parse_srt(content)
-
-        return content
-
-    def _parse_srt(self, content: str) -> str:
-        """Parse SRT format and extract text only."""
-        lines = content.strip().split("\n")
-        text_lines = []
-
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # Skip sequence numbers
-            if line.isdigit():
-                i += 1
-                continue
-
-            # Skip timestamp lines
-            if "-->" in line:
-                i += 1
-                continue
-
-            # Skip empty lines
-            if not line:
-                i += 1
-                continue
-
-            # This is actual subtitle text
-            text_lines.append(line)
-            i += 1
-
-        return "\n".join(text_lines)
+        return self._run(
+            self.async_summarizer.summarize_file(file_path, output_dir, on_delta)
+        )
+
+    def summarize_many(
+        self,
+        file_paths: Iterable[Path],
+        output_dir: Path = None,
+        on_start: Optional[Callable[[Path], None]] = None,
+        on_done: Optional[Callable[[Path, Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[[Path, str], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Summarize many files concurrently and block until all are done.
 
-    def test_connection(self) -> bool:
-        """Test API connection."""
-        if not self._init_client():
-            return False
+        Callbacks run on the background loop thread; GUI callers must
+        marshal them back to the UI thread themselves.
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.settings.model,
-                messages=[{"role": "user", "content": "Hi"}],
-                max_tokens=5,
+        Returns:
+            List of summarize_file results, in input order
+        """
+        return self._run(
+            self.async_summarizer.summarize_many(
+                file_paths,
+                output_dir,
+                on_start=on_start,
+                on_done=on_done,
+                on_delta=on_delta,
+            )
+        )
+
+    def resume(
+        self,
+        on_start: Optional[Callable[[Path], None]] = None,
+        on_done: Optional[Callable[[Path, Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[[Path, str], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Finish the unfinished jobs of interrupted batches and block until
+        they are done (callbacks as for ``summarize_many``).
+        """
+        return self._run(
+            self.async_summarizer.resume(
+                on_start=on_start, on_done=on_done, on_delta=on_delta
             )
-            return bool(response.choices)
-        except Exception as e:
-            self.logger.error(f"Connection test failed: {e}")
-            return False
+        )
+
+    @property
+    def jobs(self) -> JobQueue:
+        """Persistent job queue of summarization batches."""
+        return self.async_summarizer.jobs
+
+    def test_connection(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> bool:
+        """Test an API connection (default: the configured one)."""
+        return self._run(
+            self.async_summarizer.test_connection(api_key, base_url, model)
+        )
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get summary cache statistics."""
+        return self.async_summarizer.cache_stats()
+
+    def close(self):
+        """Close the underlying HTTP connection pool."""
+        self._run(self.async_summarizer.close())
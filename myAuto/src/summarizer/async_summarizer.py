@@ -0,0 +1,1170 @@
+"""
+Async AI Summarizer module.
+asyncio counterpart of AISummarizer built on AsyncOpenAI: summarizers
+share pooled clients per endpoint and key (see clients.py), with a fan-out
+bounded by semaphores and the shared rate limiter (see ratelimit.py), so
+hundreds of files can share a single event loop.
+
+Batches run through a persistent job queue (see jobs.py): every file and
+every map/reduce request is journaled, so an interrupted batch can be
+resumed without paying again for requests that already finished.
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+import hashlib
+import itertools
+import json
+import threading
+from contextvars import ContextVar
+from functools import partial
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Dict,
+    Any,
+    List,
+    Tuple,
+    Iterable,
+    Callable,
+    AsyncIterator,
+)
+
+from src.utils import metrics
+from src.utils.logger import get_logger, log_event
+from src.utils.metrics import FileMetrics, StageClock, get_metrics
+from src.utils.tokens import MESSAGE_OVERHEAD, context_window, count_tokens
+from src.config.settings import Settings
+from src.summarizer import clients
+from src.summarizer.cache import SummaryCache
+from src.summarizer.chunker import split_text
+from src.summarizer.jobs import Job, JobQueue, file_digest
+from src.summarizer.ratelimit import RateLimiter, shared_limiter
+from src.subtitles import NormalizeStats, iter_cues, normalize_cues
+
+if TYPE_CHECKING:
+    # The openai SDK is slow to import; it is loaded on the first API call
+    from openai import AsyncOpenAI
+
+SYSTEM_PROMPT = "你是一个专业的学习笔记生成助手，能够将视频字幕转换为结构化的学习笔记。请直接输出笔记内容，不要有多余的开场白。"
+
+# Output budget for the final note and for each partial chunk note
+MAX_TOKENS = 4000
+CHUNK_MAX_TOKENS = 1500
+
+# Requests that would leave less room than this for the answer are refused
+MIN_OUTPUT_TOKENS = 256
+
+# Bump whenever the cache key derivation changes
+CACHE_KEY_VERSION = 2
+
+# Finished jobs are kept in the journal this long
+JOB_RETENTION_DAYS = 7
+
+# Journal job of the file being summarized by the current task (None
+# outside batches); asyncio copies it into the chunk tasks it spawns
+_current_job: ContextVar[Optional[int]] = ContextVar("current_job", default=None)
+
+
+class AsyncAISummarizer:
+    """Asyncio AI-powered text summarizer with token optimization."""
+
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.client: Optional["AsyncOpenAI"] = None
+        self._client_key: Optional[Tuple[str, str]] = None
+        # Summaries using ``client`` right now (on the loop thread); it is
+        # only swapped after a settings change once none are in flight
+        self._client_users = 0
+        self.logger = get_logger()
+        self._cache_dir = settings.data_dir / "cache"
+        self._cache: Optional[SummaryCache] = None
+        self._jobs: Optional[JobQueue] = None
+        # The GUI thread and the loop thread may both open them first
+        self._open_lock = threading.Lock()
+        # Created lazily so it binds to the loop that actually runs it
+        self._file_slots: Optional[asyncio.Semaphore] = None
+
+    @property
+    def cache(self) -> SummaryCache:
+        """
+        Summary cache, opened (and legacy files migrated) on first use.
+
+        Opening may take a while (legacy import), so coroutines go through
+        ``_open_cache`` instead of touching this first on the loop thread.
+        """
+        if self._cache is None:
+            with self._open_lock:
+                if self._cache is None:
+                    settings = self.settings
+                    cache = SummaryCache(
+                        self._cache_dir / "summaries.db",
+                        max_entries=int(settings.get("cache_max_entries", 0)),
+                        max_bytes=int(settings.get("cache_max_mb", 0)) * 1024 * 1024,
+                        ttl_seconds=float(settings.get("cache_ttl_days", 0)) * 86400,
+                    )
+                    cache.import_legacy(self._cache_dir)
+                    self._cache = cache
+        return self._cache
+
+    async def _open_cache(self):
+        """Open the cache in an executor so the event loop keeps running."""
+        if self._cache is None:
+            loop = asyncio.get_running_loop()
+            try:
+                await loop.run_in_executor(None, lambda: self.cache)
+            except Exception as e:
+                self.logger.warning(f"Failed to open summary cache: {e}")
+
+    @property
+    def jobs(self) -> JobQueue:
+        """Persistent job queue, opened on first use."""
+        if self._jobs is None:
+            with self._open_lock:
+                if self._jobs is None:
+                    jobs = JobQueue(self.settings.data_dir / "jobs.db")
+                    jobs.prune(JOB_RETENTION_DAYS * 86400)
+                    self._jobs = jobs
+        return self._jobs
+
+    def _init_client(self) -> bool:
+        """
+        Attach the shared client for the current API settings.
+
+        Cheap when the settings are unchanged; after a change the client
+        of the old endpoint/key is released (and closed if unused), but
+        only once no summary is using it, so a running batch keeps its
+        pool until it finishes.
+        """
+        if not self.settings.api_key:
+            self.logger.error("API key not configured")
+            return False
+
+        key = (self.settings.api_base_url, self.settings.api_key)
+        if self.client is not None and (self._client_key == key or self._client_users):
+            return True
+
+        try:
+            client = clients.acquire(*key, self.settings.max_concurrency)
+        except Exception as e:
+            self.logger.error(f"Failed to initialize API client: {e}")
+            return False
+
+        self._release_client()
+        self.client, self._client_key = client, key
+        return True
+
+    def _release_client(self):
+        if self.client is not None:
+            clients.release(self.client)
+            self.client, self._client_key = None, None
+
+    def _limiter(self) -> RateLimiter:
+        """
+        Rate limiter shared by all summarizers using this endpoint; bounds
+        in-flight requests (max_concurrency) and schedules retries.
+        """
+        return shared_limiter(
+            self.settings.api_base_url,
+            self.settings.max_concurrency,
+            rpm=float(self.settings.get("rate_limit_rpm", 0)),
+            tpm=float(self.settings.get("rate_limit_tpm", 0)),
+            max_retries=int(self.settings.get("max_retries", 5)),
+        )
+
+    def _files(self) -> asyncio.Semaphore:
+        """Semaphore bounding files open at once (file_concurrency)."""
+        if self._file_slots is None:
+            self._file_slots = asyncio.Semaphore(self.settings.file_concurrency)
+        return self._file_slots
+
+    def _get_cache_key(self, text: str, title: str = "") -> Dict[str, str]:
+        """
+        Derive versioned cache keys covering every input to the request.
+
+        Returns:
+            Dict with ``key`` (exact key: prompt setup, model, temperature
+            and text), ``content_key`` (MD5 of the text, the pre-v2 key) and
+            ``prompt_hash`` (prompt setup without model and temperature)
+        """
+        prompt_setup = json.dumps(
+            {
+                "version": CACHE_KEY_VERSION,
+                "system": SYSTEM_PROMPT,
+                "summary_prompt": self.settings.get_summary_prompt(),
+                "chunk_prompt": self.settings.get_chunk_prompt(),
+                "merge_prompt": self.settings.get_merge_prompt(),
+                "chunk_size": self.settings.chunk_size,
+                "max_tokens": [MAX_TOKENS, CHUNK_MAX_TOKENS],
+                "title": title,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        prompt_hash = hashlib.sha256(prompt_setup.encode()).hexdigest()
+
+        key = hashlib.sha256()
+        key.update(
+            json.dumps(
+                [prompt_hash, self.settings.model, self.settings.temperature]
+            ).encode()
+        )
+        key.update(text.encode())
+
+        return {
+            "key": key.hexdigest(),
+            "content_key": hashlib.md5(text.encode()).hexdigest(),
+            "prompt_hash": prompt_hash,
+        }
+
+    def _get_cached(self, cache_key: Dict[str, str]) -> Optional[str]:
+        """Get cached summary if exists."""
+        try:
+            with metrics.stage("cache"):
+                if self.settings.get("cache_cross_model", False):
+                    summary = self.cache.get(
+                        cache_key["key"],
+                        content_key=cache_key["content_key"],
+                        prompt_hash=cache_key["prompt_hash"],
+                    )
+                else:
+                    summary = self.cache.get(cache_key["key"])
+        except Exception as e:
+            self.logger.warning(f"Cache lookup failed: {e}")
+            return None
+        self._count_lookup(bool(summary))
+        if summary:
+            self.logger.info("Using cached summary")
+        return summary
+
+    @staticmethod
+    def _count_lookup(hit: bool):
+        file_metrics = metrics.current()
+        if file_metrics is not None:
+            file_metrics.cache_lookup(hit)
+
+    def _save_cache(self, cache_key: Dict[str, str], summary: str):
+        """Save summary to cache."""
+        try:
+            self.cache.put(
+                cache_key["key"],
+                summary,
+                content_key=cache_key["content_key"],
+                prompt_hash=cache_key["prompt_hash"],
+                model=self.settings.model,
+            )
+        except Exception as e:
+            self.logger.warning(f"Cache write failed: {e}")
+
+    async def summarize(
+        self,
+        text: str,
+        title: str = "",
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Summarize text content.
+
+        Args:
+            text: The subtitle/transcript text to summarize
+            title: Optional title for context
+            on_delta: If given, the final note is streamed and this is
+                called with each text delta as it arrives (a cached
+                summary is delivered as a single delta)
+
+        Returns:
+            Dict with success status, summary, and metadata (``metrics``
+            holds stage timings and token/cache counters)
+        """
+        if metrics.current() is not None:
+            # Part of summarize_file, which records the file's metrics
+            return await self._summarize(text, title, on_delta)
+
+        with metrics.collecting(FileMetrics()) as file_metrics:
+            result = await self._summarize(text, title, on_delta)
+        result["metrics"] = file_metrics.to_dict()
+        get_metrics().record_file(file_metrics, result["success"])
+        log_event(
+            "text_summarized",
+            title=title,
+            success=result["success"],
+            error=result["error"],
+            **result["metrics"],
+        )
+        return result
+
+    async def _summarize(
+        self,
+        text: str,
+        title: str,
+        on_delta: Optional[Callable[[str], None]],
+    ) -> Dict[str, Any]:
+        """Summarize text (see summarize) with metrics collection in place."""
+        result = {
+            "success": False,
+            "summary": "",
+            "error": None,
+            "tokens_used": 0,
+            "cached": False,
+            "processing_time": 0,
+        }
+
+        start_time = time.time()
+
+        # Check cache first (token optimization)
+        await self._open_cache()
+        cache_key = self._get_cache_key(text, title)
+        cached = self._get_cached(cache_key)
+        if cached:
+            if on_delta:
+                on_delta(cached)
+            result["success"] = True
+            result["summary"] = cached
+            result["cached"] = True
+            result["processing_time"] = time.time() - start_time
+            return result
+
+        # Initialize client (or switch it after a settings change)
+        if not self._init_client():
+            result["error"] = "Failed to initialize API client"
+            return result
+
+        self._client_users += 1
+        try:
+            prompt = self._with_title(
+                self.settings.get_summary_prompt().format(text=text), title
+            )
+
+            if len(text) <= self.settings.chunk_size and self._fits(prompt, MAX_TOKENS):
+                chunks = [text]
+            else:
+                chunks = split_text(
+                    text,
+                    self.settings.chunk_size,
+                    token_limit=self._chunk_token_limit(title),
+                    count_tokens=self._count,
+                )
+
+            if len(chunks) == 1:
+                self.logger.info(
+                    f"Sending request to API (text length: {len(text)} chars, "
+                    f"~{self._prompt_tokens(prompt)} prompt tokens)"
+                )
+                summary, tokens = await self._complete(prompt, on_delta=on_delta)
+            else:
+                summary, tokens = await self._map_reduce(chunks, title, on_delta)
+
+            if summary:
+                result["success"] = True
+                result["summary"] = summary
+                result["tokens_used"] = tokens
+
+                # Cache the result
+                self._save_cache(cache_key, summary)
+
+                self.logger.info(
+                    f"Summary generated successfully (tokens: {result['tokens_used']})"
+                )
+            else:
+                result["error"] = "Empty response from API"
+
+        except Exception as e:
+            result["error"] = str(e)
+            self.logger.error(f"API call failed: {e}")
+        finally:
+            self._client_users -= 1
+
+        result["processing_time"] = time.time() - start_time
+        return result
+
+    def _with_title(self, prompt: str, title: str) -> str:
+        """Prefix the prompt with the video title for context."""
+        if title:
+            return f"视频标题: {title}\n\n{prompt}"
+        return prompt
+
+    def _count(self, text: str) -> int:
+        """Count tokens for the configured model."""
+        return count_tokens(text, self.settings.model)
+
+    def _context_window(self) -> int:
+        """Context window of the configured model (setting overrides)."""
+        return context_window(self.settings.model, self.settings.get("context_window"))
+
+    def _prompt_tokens(self, prompt: str) -> int:
+        """Tokens the system + user messages occupy in the context window."""
+        return self._count(SYSTEM_PROMPT) + self._count(prompt) + 2 * MESSAGE_OVERHEAD
+
+    def _fits(self, prompt: str, max_tokens: int) -> bool:
+        """Whether the prompt leaves room for the full output budget."""
+        return self._prompt_tokens(prompt) + max_tokens <= self._context_window()
+
+    def _output_budget(self, prompt: str, max_tokens: int) -> int:
+        """
+        Size ``max_tokens`` from the room left in the context window.
+
+        Raises:
+            ValueError: If the prompt leaves too little room to answer, so
+                the request is refused before paying for it
+        """
+        prompt_tokens = self._prompt_tokens(prompt)
+        available = self._context_window() - prompt_tokens
+        if available < min(max_tokens, MIN_OUTPUT_TOKENS):
+            raise ValueError(
+                f"Prompt too large: ~{prompt_tokens} tokens for a "
+                f"{self._context_window()}-token context window"
+            )
+        return min(max_tokens, available)
+
+    def _template_limit(self, template: str, title: str, max_tokens: int) -> int:
+        """Tokens of text that fit into ``template`` with room for the output."""
+        empty = self._with_title(template.format(text=""), title)
+        overhead = self._prompt_tokens(empty)
+        return self._context_window() - overhead - max_tokens
+
+    def _chunk_token_limit(self, title: str) -> int:
+        """Maximum tokens of transcript text per chunk."""
+        limit = self._template_limit(
+            self.settings.get_chunk_prompt(), title, CHUNK_MAX_TOKENS
+        )
+        return max(limit, MIN_OUTPUT_TOKENS)
+
+    async def _complete(
+        self,
+        prompt: str,
+        max_tokens: int = MAX_TOKENS,
+        on_delta: Optional[Callable[[str], None]] = None,
+        kind: str = "summary",
+    ) -> Tuple[str, int]:
+        """
+        Send one chat completion request through the rate limiter.
+
+        With ``on_delta`` the request is streamed and each content delta is
+        passed to it as soon as it arrives. Rate limits, server errors and
+        connection failures are retried with backoff until a response (or
+        the first streamed chunk) arrives. Timings and token usage are
+        recorded as an ``api_request`` event (``kind`` labels the step).
+
+        Returns:
+            Tuple of (stripped content, total tokens used); content is empty
+            if the API returned no choices.
+        """
+        request = dict(
+            model=self.settings.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            max_tokens=self._output_budget(prompt, max_tokens),
+            temperature=self.settings.temperature,
+        )
+
+        if on_delta is not None:
+            request.update(stream=True, stream_options={"include_usage": True})
+
+        limiter = self._limiter()
+        reserved = self._prompt_tokens(prompt) + request["max_tokens"]
+        clock: Dict[str, float] = {}
+
+        async def send():
+            # Only the successful attempt's clock is kept, so backoff is
+            # not counted as time to first byte
+            with metrics.request_clock() as attempt:
+                response = await self.client.chat.completions.create(**request)
+            clock.update(attempt)
+            return response
+
+        async with limiter.request(send, reserved) as response:
+            if on_delta is not None:
+                content, usage = await self._read_stream(response, on_delta, clock)
+            else:
+                usage = response.usage
+                content = (
+                    response.choices[0].message.content or ""
+                    if response.choices
+                    else ""
+                )
+
+        tokens = usage.total_tokens if usage else 0
+        limiter.settle(reserved, tokens)
+        self._record_request(kind, clock, usage, streamed=on_delta is not None)
+        return content.strip(), tokens
+
+    async def _read_stream(
+        self, stream, on_delta: Callable[[str], None], clock: Dict[str, float]
+    ) -> Tuple[str, Any]:
+        """
+        Read a streamed response, forwarding deltas to ``on_delta``.
+
+        Returns:
+            Tuple of (content, usage or None)
+        """
+        parts = []
+        usage = None
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                if not parts:
+                    # First token, rather than the (immediate) headers
+                    clock["first_byte"] = time.perf_counter()
+                delta = chunk.choices[0].delta.content
+                parts.append(delta)
+                on_delta(delta)
+
+        return "".join(parts), usage
+
+    def _record_request(
+        self, kind: str, clock: Dict[str, float], usage: Any, streamed: bool
+    ):
+        """Add one finished request to the current metrics and log it."""
+        end = time.perf_counter()
+        first_byte = clock.get("first_byte", end)
+        ttfb = first_byte - clock.get("sent", first_byte)
+        generate = end - first_byte
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+
+        file_metrics = metrics.current()
+        if file_metrics is not None:
+            file_metrics.requests += 1
+            file_metrics.add_time("ttfb", ttfb)
+            file_metrics.add_time("generate", generate)
+            file_metrics.prompt_tokens += prompt_tokens
+            file_metrics.completion_tokens += completion_tokens
+
+        log_event(
+            "api_request",
+            kind=kind,
+            model=self.settings.model,
+            streamed=streamed,
+            ttfb=round(ttfb, 4),
+            generate=round(generate, 4),
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+        )
+
+    async def stream(self, text: str, title: str = "") -> AsyncIterator[str]:
+        """
+        Summarize text, yielding the note as text deltas as they arrive.
+
+        Raises:
+            RuntimeError: If summarization fails (after any partial output)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        task = asyncio.ensure_future(
+            self.summarize(text, title, on_delta=queue.put_nowait)
+        )
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+
+        try:
+            while True:
+                delta = await queue.get()
+                if delta is None:
+                    break
+                yield delta
+        finally:
+            if not task.done():
+                task.cancel()
+
+        result = task.result()
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+    async def _map_reduce(
+        self,
+        chunks: List[str],
+        title: str,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, int]:
+        """
+        Summarize chunks concurrently, then merge the partial notes.
+
+        Wall time is bounded by the slowest chunk plus one merge request,
+        instead of growing with the number of chunks. Only the merge
+        request is streamed to ``on_delta``.
+        """
+        total = len(chunks)
+        self.logger.info(
+            f"Text split into {total} chunks "
+            f"(chunk size: {self.settings.chunk_size} chars)"
+        )
+        chunk_prompt = self.settings.get_chunk_prompt()
+        prompts = [
+            self._with_title(chunk_prompt.format(text=chunk), title)
+            for chunk in chunks
+        ]
+
+        job = _current_job.get()
+        if job is not None:
+            self.jobs.add_steps(
+                job,
+                "chunk",
+                (self._step_key("chunk", p, CHUNK_MAX_TOKENS) for p in prompts),
+            )
+
+        partials = await asyncio.gather(
+            *(
+                self._cached_complete("chunk", prompt, CHUNK_MAX_TOKENS)
+                for prompt in prompts
+            )
+        )
+
+        tokens = sum(t for _, t, _ in partials)
+        if not all(note for note, _, _ in partials):
+            return "", tokens
+
+        reused = sum(1 for _, _, cached in partials if cached)
+        if reused:
+            self.logger.info(f"Reused {reused}/{total} cached chunk notes")
+
+        summary, merge_tokens = await self._reduce(
+            [note for note, _, _ in partials], title, on_delta
+        )
+        return summary, tokens + merge_tokens
+
+    def _join_notes(self, notes: List[str]) -> str:
+        """Number partial notes in order for the merge prompt."""
+        return "\n\n".join(f"## 第 {i + 1} 部分\n\n{note}" for i, note in enumerate(notes))
+
+    async def _reduce(
+        self,
+        notes: List[str],
+        title: str,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, int]:
+        """
+        Merge partial notes into the final note.
+
+        If all notes do not fit into one merge request, adjacent groups
+        that do fit are merged first, repeating until one request suffices.
+        """
+        merge_prompt = self.settings.get_merge_prompt()
+        tokens = 0
+
+        while True:
+            prompt = self._with_title(
+                merge_prompt.format(text=self._join_notes(notes)), title
+            )
+            if len(notes) == 1 or self._fits(prompt, MAX_TOKENS):
+                break
+
+            limit = self._template_limit(merge_prompt, title, CHUNK_MAX_TOKENS)
+            groups = self._group_notes(notes, limit)
+            if len(groups) == 1:
+                # Grouping would not shrink the input: merge with a
+                # reduced output budget instead
+                break
+            if len(groups) == len(notes):
+                raise ValueError(
+                    "Partial notes are too large to merge within the context window"
+                )
+
+            self.logger.info(
+                f"Merging {len(notes)} partial notes in {len(groups)} groups"
+            )
+            merged = await asyncio.gather(
+                *(
+                    self._cached_complete(
+                        "merge",
+                        self._with_title(
+                            merge_prompt.format(text=self._join_notes(group)), title
+                        ),
+                        CHUNK_MAX_TOKENS,
+                    )
+                    for group in groups
+                )
+            )
+            tokens += sum(t for _, t, _ in merged)
+            if not all(note for note, _, _ in merged):
+                return "", tokens
+            notes = [note for note, _, _ in merged]
+
+        self.logger.info(f"Merging {len(notes)} partial notes")
+        summary, merge_tokens, _ = await self._cached_complete(
+            "merge", prompt, on_delta=on_delta
+        )
+        return summary, tokens + merge_tokens
+
+    def _group_notes(self, notes: List[str], token_limit: int) -> List[List[str]]:
+        """Greedily pack adjacent notes into groups of at most ``token_limit``."""
+        groups: List[List[str]] = []
+        group_tokens = 0
+        for note in notes:
+            note_tokens = self._count(note) + 8  # numbered heading
+            if groups and group_tokens + note_tokens <= token_limit:
+                groups[-1].append(note)
+                group_tokens += note_tokens
+            else:
+                groups.append([note])
+                group_tokens = note_tokens
+        return groups
+
+    async def _cached_complete(
+        self,
+        kind: str,
+        prompt: str,
+        max_tokens: int = MAX_TOKENS,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Tuple[str, int, bool]:
+        """
+        Complete a map/reduce step through the content-addressed cache.
+
+        The key covers the step kind, the full prompt (template, title and
+        chunk text), the model, the temperature and the output budget, so a
+        re-run only pays for steps whose input actually changed. Each step
+        is cached as soon as it finishes, so a failed run keeps the steps
+        that did succeed. Inside a journaled job the step is also recorded
+        in the job queue, which keeps its note until the job is done.
+
+        Returns:
+            Tuple of (content, tokens used, whether it came from cache or
+            an earlier attempt of the job)
+        """
+        key = self._step_key(kind, prompt, max_tokens)
+        job = _current_job.get()
+
+        if job is not None:
+            note = self.jobs.step_note(job, key)
+            if note:
+                if on_delta:
+                    on_delta(note)
+                return note, 0, True
+
+        try:
+            with metrics.stage("cache"):
+                cached = self.cache.get(key)
+        except Exception as e:
+            self.logger.warning(f"Cache lookup failed: {e}")
+            cached = None
+        self._count_lookup(bool(cached))
+        if cached:
+            if job is not None:
+                self.jobs.step_done(job, key, kind, cached)
+            if on_delta:
+                on_delta(cached)
+            return cached, 0, True
+
+        if job is not None:
+            self.jobs.step_started(job, key, kind)
+        content, tokens = await self._complete(prompt, max_tokens, on_delta, kind)
+        if content:
+            if job is not None:
+                self.jobs.step_done(job, key, kind, content)
+            try:
+                self.cache.put(key, content, model=self.settings.model)
+            except Exception as e:
+                self.logger.warning(f"Cache write failed: {e}")
+        return content, tokens, False
+
+    def _step_key(self, kind: str, prompt: str, max_tokens: int) -> str:
+        """Cache/journal key of one map/reduce step."""
+        key = hashlib.sha256(
+            json.dumps(
+                [
+                    CACHE_KEY_VERSION,
+                    kind,
+                    SYSTEM_PROMPT,
+                    self.settings.model,
+                    self.settings.temperature,
+                    max_tokens,
+                ]
+            ).encode()
+            + prompt.encode()
+        ).hexdigest()
+        return f"{kind}:{key}"
+
+    async def summarize_file(
+        self,
+        file_path: Path,
+        output_dir: Path = None,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Summarize a subtitle file and save the result.
+
+        In streaming mode (``settings.stream`` or ``on_delta`` given) the
+        Markdown file is written progressively as deltas arrive (to a
+        ``<name>.md.<random>.part`` file until complete), so an interrupted
+        run still leaves the partial note on disk.
+
+        Args:
+            file_path: Path to the subtitle file (.srt, .txt, etc.)
+            output_dir: Directory to save the summary (default: settings.output_dir)
+            on_delta: Optional callback receiving each streamed text delta
+
+        Returns:
+            Dict with success status and output path
+        """
+        output_file = self._output_file(file_path, output_dir)
+        return await self._summarize_file(file_path, output_file, on_delta)
+
+    def _output_file(self, file_path: Path, output_dir: Path = None) -> Path:
+        """
+        Reserve a new timestamped Markdown path for the summary of ``file_path``.
+
+        The name is claimed by exclusively creating an empty file, with a
+        counter appended on collision, so summaries of same-stem files
+        started in the same second never share (and overwrite) a path. The
+        finished summary replaces the placeholder; a failed run removes it.
+        """
+        output_dir = output_dir or self.settings.output_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+        base = f"{file_path.stem}_summary_{time.strftime('%Y%m%d_%H%M%S')}"
+        for attempt in itertools.count(1):
+            suffix = f"_{attempt}" if attempt > 1 else ""
+            output_file = output_dir / f"{base}{suffix}.md"
+            try:
+                output_file.touch(exist_ok=False)
+            except FileExistsError:
+                continue
+            return output_file
+
+    async def _summarize_file(
+        self,
+        file_path: Path,
+        output_file: Path,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """Summarize a subtitle file into ``output_file`` (see summarize_file)."""
+        with metrics.collecting(FileMetrics()) as file_metrics:
+            result = await self._summarize_file_measured(
+                file_path, output_file, on_delta, file_metrics
+            )
+        if not result["success"]:
+            self._discard_placeholder(output_file)
+        result["metrics"] = file_metrics.to_dict()
+        get_metrics().record_file(file_metrics, result["success"])
+        log_event(
+            "file_summarized",
+            file=str(file_path),
+            success=result["success"],
+            error=result["error"],
+            **result["metrics"],
+        )
+        return result
+
+    @staticmethod
+    def _discard_placeholder(output_file: Path):
+        """Remove the (still empty) file reserved for a summary that failed."""
+        try:
+            if output_file.stat().st_size == 0:
+                output_file.unlink()
+        except OSError:
+            pass
+
+    async def _summarize_file_measured(
+        self,
+        file_path: Path,
+        output_file: Path,
+        on_delta: Optional[Callable[[str], None]],
+        file_metrics: FileMetrics,
+    ) -> Dict[str, Any]:
+        result = {
+            "success": False,
+            "output_path": None,
+            "error": None,
+            "normalize": {},
+        }
+
+        if not file_path.exists():
+            result["error"] = f"File not found: {file_path}"
+            return result
+
+        loop = asyncio.get_running_loop()
+
+        # Read file content (off the event loop)
+        try:
+            text, result["normalize"] = await loop.run_in_executor(
+                None, self._read_subtitle_file, file_path, file_metrics
+            )
+        except Exception as e:
+            result["error"] = f"Failed to read file: {e}"
+            return result
+
+        if not text.strip():
+            result["error"] = "File is empty"
+            return result
+
+        # Get title from filename
+        title = file_path.stem
+
+        if on_delta is None and not self.settings.stream:
+            summary_result = await self.summarize(text, title)
+            if not summary_result["success"]:
+                result["error"] = summary_result["error"]
+                return result
+
+            # Save summary
+            try:
+                with file_metrics.stage("write"):
+                    output_file.parent.mkdir(parents=True, exist_ok=True)
+                    await loop.run_in_executor(
+                        None, output_file.write_text, summary_result["summary"], "utf-8"
+                    )
+                file_metrics.bytes_out += len(summary_result["summary"].encode())
+            except Exception as e:
+                result["error"] = f"Failed to save summary: {e}"
+                return result
+        else:
+            try:
+                summary_result = await self._summarize_to_file(
+                    text, title, output_file, on_delta
+                )
+            except Exception as e:
+                result["error"] = f"Failed to save summary: {e}"
+                return result
+
+            if not summary_result["success"]:
+                result["error"] = summary_result["error"]
+                partial_file = summary_result.get("partial_path")
+                if partial_file:
+                    result["output_path"] = partial_file
+                    self.logger.warning(f"Partial summary kept at: {partial_file}")
+                return result
+
+        result["success"] = True
+        result["output_path"] = output_file
+        self.logger.info(f"Summary saved to: {output_file}")
+
+        return result
+
+    async def _summarize_to_file(
+        self,
+        text: str,
+        title: str,
+        output_file: Path,
+        on_delta: Optional[Callable[[str], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Stream the summary into a ``.part`` file, flushing every delta.
+
+        Each call gets its own uniquely named partial file next to
+        ``output_file``, so concurrent jobs never write to (or rename) each
+        other's. It is renamed to ``output_file`` only once the summary is
+        complete, so a finished ``.md`` is never a truncated note; otherwise
+        the result's ``partial_path`` points at it.
+        """
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        file_metrics = metrics.current() or FileMetrics()
+        partial_file: Optional[Path] = None
+        sink = None
+
+        def write(delta: str):
+            nonlocal partial_file, sink
+            with file_metrics.stage("write"):
+                # Opened on the first delta so failed requests leave no empty file
+                if sink is None:
+                    fd, name = tempfile.mkstemp(
+                        suffix=".part",
+                        prefix=output_file.name + ".",
+                        dir=output_file.parent,
+                    )
+                    partial_file = Path(name)
+                    sink = os.fdopen(fd, "w", encoding="utf-8")
+                sink.write(delta)
+                sink.flush()
+            file_metrics.bytes_out += len(delta.encode())
+            if on_delta:
+                on_delta(delta)
+
+        try:
+            result = await self.summarize(text, title, on_delta=write)
+        finally:
+            if sink is not None:
+                sink.close()
+
+        if result["success"]:
+            partial_file.replace(output_file)
+        elif partial_file is not None:
+            result["partial_path"] = partial_file
+        return result
+
+    async def summarize_many(
+        self,
+        file_paths: Iterable[Path],
+        output_dir: Path = None,
+        on_start: Optional[Callable[[Path], None]] = None,
+        on_done: Optional[Callable[[Path, Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[[Path, str], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Summarize many files concurrently on the current event loop.
+
+        At most ``file_concurrency`` files are being processed and at most
+        ``max_concurrency`` API requests are in flight at any moment. The
+        files are added to the job queue first, so if the batch is
+        interrupted the rest of it can be finished with ``resume``.
+
+        Args:
+            file_paths: Subtitle files to summarize
+            output_dir: Directory to save the summaries
+            on_start: Called with the path when a file starts processing
+            on_done: Called with (path, result) as each file completes,
+                in completion order
+            on_delta: Called with (path, delta) for each streamed delta
+
+        Returns:
+            List of summarize_file results, in input order
+        """
+        jobs = self.jobs.enqueue([Path(p) for p in file_paths], output_dir)
+        return await self._run_jobs(jobs, on_start, on_done, on_delta)
+
+    async def resume(
+        self,
+        on_start: Optional[Callable[[Path], None]] = None,
+        on_done: Optional[Callable[[Path, Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[[Path, str], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Finish the unfinished jobs of interrupted batches.
+
+        Each job writes to the summary file it was writing before and
+        reuses every step that had already finished (a leftover ``.part``
+        of the interrupted attempt is left alone); callbacks are as for
+        ``summarize_many``.
+
+        Returns:
+            List of summarize_file results, in job order
+        """
+        jobs = self.jobs.adopt()
+        if jobs:
+            self.logger.info(f"Resuming {len(jobs)} unfinished job(s)")
+        return await self._run_jobs(jobs, on_start, on_done, on_delta)
+
+    async def _run_jobs(
+        self,
+        jobs: List[Job],
+        on_start: Optional[Callable[[Path], None]] = None,
+        on_done: Optional[Callable[[Path, Dict[str, Any]], None]] = None,
+        on_delta: Optional[Callable[[Path, str], None]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Run journaled jobs concurrently (see summarize_many)."""
+
+        loop = asyncio.get_running_loop()
+
+        async def run_one(job: Job) -> Dict[str, Any]:
+            file_path = job.path
+            async with self._files():
+                if on_start:
+                    on_start(file_path)
+                output_file = job.output_path or self._output_file(
+                    file_path, job.output_dir
+                )
+                try:
+                    digest = await loop.run_in_executor(None, file_digest, file_path)
+                except OSError:
+                    digest = None
+                self.jobs.start(job.id, output_file, digest)
+                _current_job.set(job.id)
+                file_delta = partial(on_delta, file_path) if on_delta else None
+                try:
+                    result = await self._summarize_file(
+                        file_path, output_file, on_delta=file_delta
+                    )
+                except Exception as e:
+                    result = {"success": False, "output_path": None, "error": str(e)}
+                self.jobs.finish(job.id, result["success"], result["error"])
+            if on_done:
+                on_done(file_path, result)
+            return result
+
+        return await asyncio.gather(*(run_one(job) for job in jobs))
+
+    def _read_subtitle_file(
+        self, file_path: Path, file_metrics: Optional[FileMetrics] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Read subtitle file and extract the cue text (timing/markup removed).
+
+        With ``file_metrics`` the read, parse and normalize stages of the
+        streaming pipeline are timed separately, and the bytes read counted.
+
+        Returns:
+            Tuple of (text, normalization stats dict; empty if disabled)
+        """
+        file_metrics = file_metrics or FileMetrics()
+        file_metrics.bytes_in += file_path.stat().st_size
+        clock = StageClock(file_metrics.add_time)
+
+        cues = clock.wrap(
+            iter_cues(file_path, wrap_lines=lambda f: clock.wrap(f, "read")), "parse"
+        )
+        if not self.settings.get("normalize_subtitles", True):
+            text = "\n".join(cue.text for cue in cues)
+            clock.flush()
+            return text, {}
+
+        stats = NormalizeStats()
+        text = "\n".join(
+            cue.text for cue in clock.wrap(normalize_cues(cues, stats), "normalize")
+        )
+        clock.flush()
+        if stats.chars_saved:
+            self.logger.info(
+                f"Normalized {file_path.name}: saved {stats.chars_saved} chars "
+                f"(~{stats.tokens_saved} tokens, "
+                f"{stats.chars_saved / stats.chars_in:.0%})"
+            )
+        return text, stats.to_dict()
+
+    async def test_connection(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+    ) -> bool:
+        """
+        Test an API connection without touching the summarizer's client.
+
+        The test holds its own reference to the registry client of the
+        given endpoint/key (sharing the pool when it is the one in use)
+        and releases it afterwards, so a running batch is never affected.
+
+        Args:
+            api_key: Key to test (default: the configured one)
+            base_url: Endpoint to test (default: the configured one)
+            model: Model to test (default: the configured one)
+        """
+        api_key = self.settings.api_key if api_key is None else api_key
+        base_url = self.settings.api_base_url if base_url is None else base_url
+        if not api_key:
+            self.logger.error("API key not configured")
+            return False
+
+        try:
+            client = clients.acquire(base_url, api_key, 1)
+        except Exception as e:
+            self.logger.error(f"Failed to initialize API client: {e}")
+            return False
+        try:
+            response = await client.chat.completions.create(
+                model=model or self.settings.model,
+                messages=[{"role": "user", "content": "Hi"}],
+                max_tokens=5,
+            )
+            return bool(response.choices)
+        except Exception as e:
+            self.logger.error(f"Connection test failed: {e}")
+            return False
+        finally:
+            clients.release(client)
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get summary cache statistics."""
+        return self.cache.stats()
+
+    async def close(self):
+        """
+        Release the shared client (closing its pool if no one else uses it)
+        and the job journal, whose unfinished jobs become resumable.
+        """
+        self._release_client()
+        await clients.wait_closed()
+        with self._open_lock:
+            if self._jobs is not None:
+                self._jobs.close()
+                self._jobs = None
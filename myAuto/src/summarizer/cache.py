@@ -0,0 +1,326 @@
+"""
+Summary cache module.
+Indexed SQLite cache for generated summaries, replacing the flat
+one-JSON-file-per-hash directory. Lookups go through the primary key
+index, so they stay O(1)-ish regardless of how many entries exist.
+Supports entry/byte caps with LRU eviction, optional TTL expiry and
+hit/miss counters.
+
+Besides its exact key, each entry records the hash of its source text
+(``content_key``), the hash of its prompt setup (``prompt_hash``) and the
+model, so results can optionally be reused across models.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Dict, Any
+
+from src.utils.logger import get_logger
+
+
+class SummaryCache:
+    """SQLite-backed summary cache with LRU/TTL eviction."""
+
+    SCHEMA_VERSION = 2
+
+    def __init__(
+        self,
+        db_path: Path,
+        max_entries: int = 0,
+        max_bytes: int = 0,
+        ttl_seconds: float = 0,
+    ):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: SQLite database file
+            max_entries: Maximum number of entries (0 = unlimited)
+            max_bytes: Maximum total summary size in bytes (0 = unlimited)
+            ttl_seconds: Entries older than this are expired (0 = never)
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.logger = get_logger()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        # One connection shared by all threads, serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+        # Running totals so cap checks never scan the table
+        self._recount()
+
+    def _recount(self):
+        """Reload the running totals from the table."""
+        self._entries, self._bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+
+    def _migrate(self):
+        """Create or upgrade the schema, tracked by PRAGMA user_version."""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+        if version < 1:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_last_access "
+                "ON entries(last_access)"
+            )
+
+        if version < 2:
+            for column in ("content_key", "prompt_hash", "model"):
+                self._conn.execute(f"ALTER TABLE entries ADD COLUMN {column} TEXT")
+            # v1 keys were the MD5 of the text alone: keep those rows as
+            # content-only entries (unknown model/prompt). Their keys can
+            # never equal a v2 key, so only cross-model lookups see them.
+            self._conn.execute(
+                "UPDATE entries SET content_key = key WHERE content_key IS NULL"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_entries_content_key "
+                "ON entries(content_key)"
+            )
+
+        if version < self.SCHEMA_VERSION:
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def get(
+        self,
+        key: str,
+        content_key: str = None,
+        prompt_hash: str = None,
+    ) -> Optional[str]:
+        """
+        Get a cached summary, refreshing its LRU position.
+
+        Args:
+            key: Exact cache key (covers every request input)
+            content_key: If given, fall back to the most recently used entry
+                for the same text and prompt setup generated by any model,
+                including pre-v2 entries whose prompt setup is unknown
+            prompt_hash: Prompt setup hash for the cross-model fallback
+        """
+        now = time.time()
+        with self._lock:
+            row = self._lookup("key = ?", (key,), now)
+
+            if row is None and content_key:
+                row = self._lookup(
+                    "content_key = ? AND (prompt_hash = ? OR prompt_hash IS NULL)",
+                    (content_key, prompt_hash),
+                    now,
+                )
+                if row is not None:
+                    self.logger.debug(
+                        f"Cross-model cache hit (model: {row[2] or 'unknown'})"
+                    )
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (now, row[0])
+            )
+            self.hits += 1
+            return row[1]
+
+    def _lookup(self, where: str, params: tuple, now: float) -> Optional[tuple]:
+        """Find the freshest live entry matching ``where`` (lock held)."""
+        rows = self._conn.execute(
+            f"SELECT key, summary, model, size, created FROM entries WHERE {where} "
+            "ORDER BY last_access DESC",
+            params,
+        ).fetchall()
+
+        for row in rows:
+            if self.ttl_seconds and now - row[4] > self.ttl_seconds:
+                self._delete(row[0], row[3])
+                self.evictions += 1
+                continue
+            return row
+        return None
+
+    def put(
+        self,
+        key: str,
+        summary: str,
+        created: float = None,
+        content_key: str = None,
+        prompt_hash: str = None,
+        model: str = None,
+    ):
+        """Store a summary and evict entries beyond the configured caps."""
+        now = time.time()
+        size = len(summary.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, summary, size, created, "
+                "last_access, content_key, prompt_hash, model) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    summary,
+                    size,
+                    created or now,
+                    now,
+                    content_key,
+                    prompt_hash,
+                    model,
+                ),
+            )
+            if old:
+                self._bytes -= old[0]
+            else:
+                self._entries += 1
+            self._bytes += size
+            self._evict()
+
+    def _delete(self, key: str, size: int):
+        """Delete one entry and update running totals (lock held)."""
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._entries -= 1
+        self._bytes -= size
+
+    def _over_cap(self) -> bool:
+        return (self.max_entries and self._entries > self.max_entries) or (
+            self.max_bytes and self._bytes > self.max_bytes
+        )
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones (lock held)."""
+        if self.ttl_seconds:
+            cutoff = time.time() - self.ttl_seconds
+            expired = self._conn.execute(
+                "SELECT key, size FROM entries WHERE created < ?", (cutoff,)
+            ).fetchall()
+            for key, size in expired:
+                self._delete(key, size)
+            self.evictions += len(expired)
+
+        while self._over_cap():
+            batch = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not batch:
+                break
+            for key, size in batch:
+                if not self._over_cap():
+                    break
+                self._delete(key, size)
+                self.evictions += 1
+
+    def import_legacy(self, cache_dir: Path) -> int:
+        """
+        Migrate old ``<md5>.json`` cache files into the database.
+
+        Their keys are the MD5 of the text alone, so they are stored as
+        content-only entries. All files are inserted in one transaction and
+        deleted once it commits. Returns the number of entries imported.
+        """
+        rows, done = [], []
+        imported = 0
+        for cache_file in cache_dir.glob("*.json"):
+            try:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                self.logger.warning(f"Skipping legacy cache file {cache_file}: {e}")
+                continue
+            done.append(cache_file)
+            summary = data.get("summary") if isinstance(data, dict) else None
+            if summary:
+                now = time.time()
+                rows.append(
+                    (
+                        cache_file.stem,
+                        summary,
+                        len(summary.encode("utf-8")),
+                        data.get("timestamp") or now,
+                        now,
+                        cache_file.stem,
+                    )
+                )
+
+        if rows:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    # Keys already in the database keep their entry
+                    before = self._conn.total_changes
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO entries (key, summary, size, "
+                        "created, last_access, content_key) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        rows,
+                    )
+                    imported = self._conn.total_changes - before
+                    self._recount()
+                    self._evict()
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    self._recount()
+                    raise
+
+        for cache_file in done:
+            try:
+                cache_file.unlink()
+            except OSError as e:
+                self.logger.warning(f"Could not remove {cache_file}: {e}")
+
+        if imported:
+            self.logger.info(f"Migrated {imported} legacy cache entries")
+        return imported
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._entries = 0
+            self._bytes = 0
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
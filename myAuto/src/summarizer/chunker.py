@@ -0,0 +1,117 @@
+"""
+Text chunking module.
+Splits long transcripts into chunks at subtitle/sentence boundaries
+so they can be summarized in parallel (map) and merged (reduce).
+
+Chunk boundaries are content-defined: whether a chunk may end after a
+line depends only on that line's own hash, not on how many characters
+came before it. Editing one cue therefore only changes the chunk that
+contains it (and rarely a neighbour), so the other chunks keep their
+content hash and their cached partial summaries.
+"""
+
+import hashlib
+import re
+from typing import Callable, Iterator, List, Optional
+
+# Sentence terminators for both Chinese and Western punctuation
+_SENTENCE_END = re.compile(r"(?<=[。！？；.!?;])")
+
+
+def _split_long_line(line: str, chunk_size: int) -> Iterator[str]:
+    """Split a single over-long line at sentence ends, then hard-wrap."""
+    buf = ""
+    for sentence in _SENTENCE_END.split(line):
+        if not sentence:
+            continue
+        if len(buf) + len(sentence) <= chunk_size:
+            buf += sentence
+            continue
+        if buf:
+            yield buf
+        # A single sentence longer than a chunk: hard split
+        while len(sentence) > chunk_size:
+            yield sentence[:chunk_size]
+            sentence = sentence[chunk_size:]
+        buf = sentence
+    if buf:
+        yield buf
+
+
+def _is_boundary(line: str, span: int) -> bool:
+    """
+    Decide from the line's content alone whether a chunk may end after it.
+
+    Each line is a cut point with probability ``len(line) / span``, so once
+    a chunk passes its minimum size it ends after roughly ``span`` more
+    characters on average.
+    """
+    digest = hashlib.blake2b(line.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") < len(line) / span * 2**64
+
+
+def split_text(
+    text: str,
+    chunk_size: int,
+    token_limit: int = 0,
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> List[str]:
+    """
+    Split text into chunks of at most ``chunk_size`` characters.
+
+    Lines (one subtitle cue each after parsing) are never broken unless a
+    single line is itself longer than ``chunk_size``. Chunks end at
+    content-defined cut points between half and the full ``chunk_size``.
+
+    Args:
+        text: The transcript text
+        chunk_size: Maximum characters per chunk
+        token_limit: Optional maximum tokens per chunk (0 = no limit)
+        count_tokens: Token counter used with ``token_limit``
+
+    Returns:
+        List of chunk strings (a single element if the text fits)
+    """
+    if not (token_limit and count_tokens):
+        token_limit = 0
+    if chunk_size <= 0:
+        return [text]
+    if len(text) <= chunk_size and (
+        not token_limit or count_tokens(text) <= token_limit
+    ):
+        return [text]
+
+    min_size = chunk_size // 2
+    span = max(1, chunk_size // 4)
+
+    chunks = []
+    current: List[str] = []
+    current_len = 0
+    current_tokens = 0
+
+    for line in text.split("\n"):
+        if len(line) <= chunk_size:
+            pieces = [line]
+        else:
+            pieces = _split_long_line(line, chunk_size)
+        for piece in pieces:
+            piece_tokens = count_tokens(piece) + 1 if token_limit else 0
+            # +1 for the newline joining lines back together
+            if current and (
+                current_len + len(piece) + 1 > chunk_size
+                or current_tokens + piece_tokens > token_limit > 0
+            ):
+                chunks.append("\n".join(current))
+                current, current_len, current_tokens = [], 0, 0
+            current.append(piece)
+            current_len += len(piece) + 1
+            current_tokens += piece_tokens
+
+            if current_len >= min_size and _is_boundary(piece, span):
+                chunks.append("\n".join(current))
+                current, current_len, current_tokens = [], 0, 0
+
+    if current:
+        chunks.append("\n".join(current))
+
+    return chunks
@@ -0,0 +1,122 @@
+"""
+API client registry module.
+Shares one AsyncOpenAI client (and its HTTP connection pool) between all
+summarizers that use the same endpoint and key, so keep-alive connections
+and TLS sessions are reused across files, batches and connection tests.
+
+Clients are reference counted: a summarizer acquires the client for its
+current settings and releases it when the settings change or it closes;
+the last release closes the pool.
+"""
+
+import asyncio
+import importlib.util
+import weakref
+from typing import TYPE_CHECKING, Dict, Set, Tuple
+
+from src.utils import metrics
+from src.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# Idle keep-alive connections are dropped after this many seconds
+KEEPALIVE_EXPIRY = 60.0
+
+# HTTP/2 multiplexes concurrent requests over one connection; it needs the
+# optional ``h2`` package (pip install "httpx[http2]")
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+ClientKey = Tuple[str, str]
+
+
+class _Entry:
+    def __init__(self, client: "AsyncOpenAI"):
+        self.client = client
+        self.refs = 0
+
+
+# Keyed by event loop: an httpx pool cannot be shared across loops
+_registry: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_closing: Set[asyncio.Task] = set()
+
+
+def _entries() -> Dict[ClientKey, _Entry]:
+    return _registry.setdefault(asyncio.get_running_loop(), {})
+
+
+def acquire(base_url: str, api_key: str, max_connections: int) -> "AsyncOpenAI":
+    """
+    Get the shared client for (base_url, api_key), creating it on first use.
+
+    Args:
+        base_url: API base URL
+        api_key: API key
+        max_connections: Pool size (the expected number of concurrent
+            requests); only used when the client is created
+
+    Returns:
+        The shared AsyncOpenAI client; pair with ``release``
+    """
+    entries = _entries()
+    key = (base_url, api_key)
+    entry = entries.get(key)
+
+    if entry is None:
+        # Imported here: the openai SDK is slow to import
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        import httpx
+
+        http_client = DefaultAsyncHttpxClient(
+            http2=HTTP2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            event_hooks={"response": [_on_response]},
+        )
+        # Retries are scheduled by the shared rate limiter instead, so
+        # every 429 it sees feeds its concurrency control
+        entry = entries[key] = _Entry(
+            AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                max_retries=0,
+                http_client=http_client,
+            )
+        )
+        get_logger().debug(
+            f"Created API client for {base_url} "
+            f"(pool: {max_connections}, HTTP/2: {HTTP2})"
+        )
+
+    entry.refs += 1
+    return entry.client
+
+
+async def _on_response(response):
+    # Runs once the response headers are in, before the body is read
+    metrics.mark_first_byte()
+
+
+def release(client: "AsyncOpenAI"):
+    """Drop one reference to ``client``; the last one closes its pool."""
+    entries = _entries()
+    for key, entry in list(entries.items()):
+        if entry.client is client:
+            entry.refs -= 1
+            if entry.refs <= 0:
+                del entries[key]
+                task = asyncio.ensure_future(client.close())
+                _closing.add(task)
+                task.add_done_callback(_closing.discard)
+            return
+
+
+async def wait_closed():
+    """Wait until pools being closed by ``release`` have shut down."""
+    loop = asyncio.get_running_loop()
+    tasks = [task for task in _closing if task.get_loop() is loop]
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
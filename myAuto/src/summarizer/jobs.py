@@ -0,0 +1,475 @@
+"""
+Persistent job queue module.
+Journals summarization batches in SQLite so a batch interrupted by closing
+the app, Ctrl-C or a crash can be resumed where it stopped.
+
+Each file is a job (pending → running → done/failed) and each map/reduce
+request of a job is a step with the same states. A finished step keeps its
+note in the journal until the job is done, so resuming never repeats a
+request that already succeeded, even if the summary cache has evicted it.
+
+Jobs also record a digest of the file they summarized, so the batch runner
+can tell which files already have an up-to-date summary.
+
+The app and batch runs may use the journal at the same time. Every open
+queue registers as an owner and renews a heartbeat, and each unfinished job
+records its owner, so only jobs whose owner has exited (or stopped
+renewing its lease) are offered for resuming or discarded.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Dict, List, Iterable, Set
+
+from src.utils.logger import get_logger
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Bytes hashed per read by file_digest
+_DIGEST_CHUNK = 1024 * 1024
+
+# An owner that has not renewed its heartbeat for this long is gone
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 15
+
+
+def _pid_alive(pid: int) -> bool:
+    """Whether a local process exists (always assumed on Windows)."""
+    if os.name == "nt":
+        # Signal 0 is CTRL_C_EVENT there; the lease alone decides
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def file_digest(file_path: Path) -> str:
+    """SHA-256 of a file's content, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_DIGEST_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class Job:
+    """One journaled file of a batch."""
+
+    id: int
+    path: Path
+    output_dir: Optional[Path]
+    output_path: Optional[Path]
+    state: str
+    error: Optional[str] = None
+
+
+class JobQueue:
+    """SQLite-backed journal of summarization jobs and their steps."""
+
+    SCHEMA_VERSION = 3
+
+    def __init__(self, db_path: Path):
+        """
+        Open (or create) the journal and register this process as an owner.
+
+        Jobs left ``running`` by an owner that is gone are put back to
+        ``pending`` on open; those of live owners are left alone.
+        """
+        self.db_path = db_path
+        self.logger = get_logger()
+
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(db_path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._migrate()
+
+        self.owner = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO owners (token, pid, heartbeat) VALUES (?, ?, ?)",
+                (self.owner, os.getpid(), time.time()),
+            )
+            self._conn.execute("BEGIN")
+            orphaned = self._orphaned()
+            interrupted = self._conn.execute(
+                f"UPDATE jobs SET state = ? WHERE state = ? AND {orphaned}",
+                (PENDING, RUNNING),
+            ).rowcount
+            self._conn.execute(
+                "UPDATE steps SET state = ? WHERE state = ? AND job_id IN "
+                f"(SELECT id FROM jobs WHERE {orphaned})",
+                (PENDING, RUNNING),
+            )
+            self._conn.execute("COMMIT")
+        if interrupted:
+            self.logger.info(f"Found {interrupted} interrupted job(s)")
+
+        self._closed = threading.Event()
+        threading.Thread(
+            target=self._heartbeat, name="job-queue-heartbeat", daemon=True
+        ).start()
+
+    def _heartbeat(self):
+        """Renew this owner's lease until the queue is closed."""
+        while not self._closed.wait(HEARTBEAT_SECONDS):
+            try:
+                with self._lock:
+                    self._conn.execute(
+                        "UPDATE owners SET heartbeat = ? WHERE token = ?",
+                        (time.time(), self.owner),
+                    )
+            except sqlite3.Error as e:
+                self.logger.warning(f"Job queue heartbeat failed: {e}")
+
+    def _orphaned(self) -> str:
+        """
+        SQL condition matching jobs whose owner is gone (call with the lock).
+
+        Owners that stopped renewing their lease, or whose process no
+        longer exists, are removed first.
+        """
+        deadline = time.time() - LEASE_SECONDS
+        dead = [
+            token
+            for token, pid, heartbeat in self._conn.execute(
+                "SELECT token, pid, heartbeat FROM owners"
+            )
+            if token != self.owner and (heartbeat < deadline or not _pid_alive(pid))
+        ]
+        self._conn.executemany(
+            "DELETE FROM owners WHERE token = ?", ((token,) for token in dead)
+        )
+        return "(owner IS NULL OR owner NOT IN (SELECT token FROM owners))"
+
+    def _migrate(self):
+        """Create or upgrade the schema, tracked by PRAGMA user_version."""
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+
+        if version < 1:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    path TEXT NOT NULL,
+                    output_dir TEXT,
+                    output_path TEXT,
+                    state TEXT NOT NULL,
+                    error TEXT,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state)"
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS steps (
+                    job_id INTEGER NOT NULL
+                        REFERENCES jobs(id) ON DELETE CASCADE,
+                    key TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    note TEXT,
+                    PRIMARY KEY (job_id, key)
+                )
+                """
+            )
+
+        if version < 2:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN digest TEXT")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_path ON jobs(path)")
+
+        if version < 3:
+            self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS owners (
+                    token TEXT PRIMARY KEY,
+                    pid INTEGER NOT NULL,
+                    heartbeat REAL NOT NULL
+                )
+                """
+            )
+
+        if version < self.SCHEMA_VERSION:
+            self._conn.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+
+    def enqueue(self, file_paths: Iterable[Path], output_dir: Path = None) -> List[Job]:
+        """
+        Add files to the queue as pending jobs.
+
+        A file that already has a failed job, or an unfinished one that no
+        other live process owns, for the same output directory reuses that
+        job, keeping the steps it finished. The jobs are owned by this queue.
+
+        Args:
+            file_paths: Subtitle files of the batch
+            output_dir: Directory the summaries go to (None = configured)
+
+        Returns:
+            The jobs, in input order
+        """
+        now = time.time()
+        target = str(output_dir) if output_dir else None
+        jobs = []
+        with self._lock:
+            self._conn.execute("BEGIN")
+            orphaned = self._orphaned()
+            for file_path in file_paths:
+                row = self._conn.execute(
+                    "SELECT id, output_path FROM jobs WHERE path = ? "
+                    "AND output_dir IS ? AND state != ? "
+                    f"AND (state = ? OR owner = ? OR {orphaned}) "
+                    "ORDER BY id DESC LIMIT 1",
+                    (str(file_path), target, DONE, FAILED, self.owner),
+                ).fetchone()
+                if row:
+                    job_id, output_path = row
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, error = NULL, owner = ?, "
+                        "updated = ? WHERE id = ?",
+                        (PENDING, self.owner, now, job_id),
+                    )
+                else:
+                    job_id = self._conn.execute(
+                        "INSERT INTO jobs "
+                        "(path, output_dir, state, owner, created, updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (str(file_path), target, PENDING, self.owner, now, now),
+                    ).lastrowid
+                    output_path = None
+                jobs.append(
+                    Job(
+                        job_id,
+                        Path(file_path),
+                        output_dir,
+                        Path(output_path) if output_path else None,
+                        PENDING,
+                    )
+                )
+            self._conn.execute("COMMIT")
+        return jobs
+
+    def unfinished(self) -> List[Job]:
+        """
+        Unfinished jobs whose owner is gone (interrupted batches), oldest first.
+
+        Jobs of batches still running in another process are not included.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, path, output_dir, output_path, state, error FROM jobs "
+                f"WHERE state IN (?, ?) AND {self._orphaned()} ORDER BY id",
+                (PENDING, RUNNING),
+            ).fetchall()
+        return self._jobs(rows)
+
+    def adopt(self) -> List[Job]:
+        """
+        Take over the unfinished jobs whose owner is gone, to resume them.
+
+        Returns:
+            The adopted jobs (now pending and owned by this queue), oldest
+            first
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            rows = self._conn.execute(
+                "SELECT id, path, output_dir, output_path, state, error FROM jobs "
+                f"WHERE state IN (?, ?) AND {self._orphaned()} ORDER BY id",
+                (PENDING, RUNNING),
+            ).fetchall()
+            now = time.time()
+            for row in rows:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, owner = ?, updated = ? WHERE id = ?",
+                    (PENDING, self.owner, now, row[0]),
+                )
+                self._conn.execute(
+                    "UPDATE steps SET state = ? WHERE job_id = ? AND state = ?",
+                    (PENDING, row[0], RUNNING),
+                )
+            self._conn.execute("COMMIT")
+        return self._jobs([row[:4] + (PENDING,) + row[5:] for row in rows])
+
+    @staticmethod
+    def _jobs(rows) -> List[Job]:
+        return [
+            Job(
+                row[0],
+                Path(row[1]),
+                Path(row[2]) if row[2] else None,
+                Path(row[3]) if row[3] else None,
+                row[4],
+                row[5],
+            )
+            for row in rows
+        ]
+
+    def start(self, job_id: int, output_path: Path, digest: str = None):
+        """
+        Mark a job running and record the file its summary goes to.
+
+        Args:
+            job_id: Job to start
+            output_path: Summary file of the job
+            digest: ``file_digest`` of the input as it is being summarized
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, output_path = ?, digest = ?, "
+                "owner = ?, updated = ? WHERE id = ?",
+                (RUNNING, str(output_path), digest, self.owner, time.time(), job_id),
+            )
+
+    def finish(self, job_id: int, success: bool, error: str = None):
+        """
+        Mark a job done or failed.
+
+        A done job's step notes are dropped; a failed job keeps them, so
+        enqueueing the file again only pays for the steps that did not
+        finish.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = ?, updated = ? WHERE id = ?",
+                (DONE if success else FAILED, error, time.time(), job_id),
+            )
+            if success:
+                self._conn.execute("DELETE FROM steps WHERE job_id = ?", (job_id,))
+
+    def summarized(
+        self, file_paths: Iterable[Path], output_dir: Path
+    ) -> Dict[Path, Set[str]]:
+        """
+        Digests of the inputs already summarized into ``output_dir``.
+
+        Only done jobs whose summary file still exists count, so a file
+        whose job failed, or whose summary was deleted, is not reported.
+
+        Args:
+            file_paths: Input files to look up
+            output_dir: Directory the summaries should be in
+
+        Returns:
+            Input path → digests of its summarized versions (inputs with
+            none are left out)
+        """
+        target = Path(output_dir).resolve()
+        found: Dict[Path, Set[str]] = {}
+        with self._lock:
+            for file_path in file_paths:
+                rows = self._conn.execute(
+                    "SELECT output_path, digest FROM jobs WHERE path = ? "
+                    "AND state = ? AND digest IS NOT NULL",
+                    (str(file_path), DONE),
+                ).fetchall()
+                for output_path, digest in rows:
+                    output = Path(output_path)
+                    if output.parent.resolve() == target and output.is_file():
+                        found.setdefault(Path(file_path), set()).add(digest)
+        return found
+
+    def add_steps(self, job_id: int, kind: str, keys: Iterable[str]):
+        """Register the steps a job is about to run as pending."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO steps (job_id, key, kind, state) "
+                "VALUES (?, ?, ?, ?)",
+                ((job_id, key, kind, PENDING) for key in keys),
+            )
+
+    def step_note(self, job_id: int, key: str) -> Optional[str]:
+        """Note of a step that already finished in an earlier attempt."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT note FROM steps WHERE job_id = ? AND key = ? AND state = ?",
+                (job_id, key, DONE),
+            ).fetchone()
+        return row[0] if row else None
+
+    def step_started(self, job_id: int, key: str, kind: str):
+        """Mark a step's request as in flight."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO steps (job_id, key, kind, state) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (job_id, key) DO UPDATE SET state = excluded.state",
+                (job_id, key, kind, RUNNING),
+            )
+
+    def step_done(self, job_id: int, key: str, kind: str, note: str):
+        """Record a finished step and its note."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO steps (job_id, key, kind, state, note) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (job_id, key, kind, DONE, note),
+            )
+
+    def progress(self, job_id: int) -> Dict[str, int]:
+        """Step counts of a job by state."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM steps WHERE job_id = ? GROUP BY state",
+                (job_id,),
+            ).fetchall()
+        return dict(rows)
+
+    def discard(self):
+        """
+        Drop the interrupted jobs (the user chose not to resume them).
+
+        Jobs owned by live processes, including this one, are kept.
+        """
+        with self._lock:
+            self._conn.execute(
+                f"DELETE FROM jobs WHERE state IN (?, ?) AND {self._orphaned()}",
+                (PENDING, RUNNING),
+            )
+
+    def prune(self, max_age_seconds: float):
+        """
+        Delete finished jobs older than ``max_age_seconds``.
+
+        The latest done job of each file and output directory is kept as
+        the record that the file has been summarized (see ``summarized``).
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated < ? "
+                "AND id NOT IN (SELECT MAX(id) FROM jobs WHERE state = ? "
+                "GROUP BY path, output_dir)",
+                (DONE, FAILED, time.time() - max_age_seconds, DONE),
+            )
+
+    def close(self):
+        """
+        Give up ownership and close the database connection.
+
+        Jobs this queue left unfinished become resumable by others.
+        """
+        self._closed.set()
+        with self._lock:
+            self._conn.execute("DELETE FROM owners WHERE token = ?", (self.owner,))
+            self._conn.close()
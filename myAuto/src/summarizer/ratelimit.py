@@ -0,0 +1,306 @@
+"""
+Rate limiting module.
+Client-side scheduler for API requests: token buckets for requests/min
+and tokens/min, retries with exponential backoff and jitter (honoring
+Retry-After), and AIMD concurrency control driven by observed 429s.
+
+One limiter is shared by every summarizer talking to the same endpoint
+on the same event loop, so parallel files and chunks back off together
+instead of each hammering the provider on its own.
+"""
+
+import asyncio
+import random
+import time
+import weakref
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from src.utils.logger import get_logger
+
+# Backoff for retries without Retry-After: full jitter over base * 2^attempt
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# A burst of 429s from requests sent together counts as one signal
+DECREASE_INTERVAL = 2.0
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` per minute."""
+
+    def __init__(self, per_minute: float = 0):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self._stamp = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.per_minute:
+            self.level = min(
+                self.per_minute,
+                self.level + (now - self._stamp) * self.per_minute / 60,
+            )
+        self._stamp = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 = now or unlimited)."""
+        if not self.per_minute:
+            return 0.0
+        self._refill()
+        # A request larger than the whole bucket waits for a full bucket
+        amount = min(amount, self.per_minute)
+        missing = amount - self.level
+        return missing * 60 / self.per_minute if missing > 0 else 0.0
+
+    def take(self, amount: float):
+        if self.per_minute:
+            self._refill()
+            self.level -= min(amount, self.per_minute)
+
+    def give(self, amount: float):
+        """Return unused reservation to the bucket."""
+        if self.per_minute and amount > 0:
+            self._refill()
+            self.level = min(self.per_minute, self.level + amount)
+
+    def configure(self, per_minute: float):
+        if per_minute != self.per_minute:
+            self.per_minute = per_minute
+            self.level = min(self.level, per_minute) if per_minute else 0.0
+
+
+class RateLimiter:
+    """
+    Request scheduler for one API endpoint.
+
+    The concurrency limit starts at ``max_concurrency``; every 429 halves
+    it (multiplicative decrease, at most once per DECREASE_INTERVAL) and
+    every success raises it by ``1 / limit`` (additive increase of about
+    one slot per round of requests), so throughput settles just below the
+    provider's ceiling.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_retries: int = 5,
+    ):
+        self.logger = get_logger()
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.limit = float(max_concurrency)
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+        self.in_flight = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        # Set (and replaced) whenever a slot frees up
+        self._changed: Optional[asyncio.Event] = None
+
+    def configure(
+        self,
+        max_concurrency: int,
+        rpm: float = 0,
+        tpm: float = 0,
+        max_retries: int = 5,
+    ):
+        """Apply changed settings without losing the learned limit."""
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.limit = min(self.limit, float(max_concurrency))
+        self.requests.configure(rpm)
+        self.tokens.configure(tpm)
+
+    async def _acquire(self, tokens: int):
+        """Wait for a concurrency slot and room in both buckets."""
+        while True:
+            wait = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(tokens),
+            )
+            if wait <= 0 and self.in_flight < int(self.limit):
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                self.in_flight += 1
+                return
+
+            # Created lazily so it binds to the loop that actually runs it
+            if self._changed is None:
+                self._changed = asyncio.Event()
+            try:
+                await asyncio.wait_for(
+                    self._changed.wait(), timeout=wait if wait > 0 else None
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    def _release(self):
+        """Free a slot and wake waiters (sync, so it also runs on cancel)."""
+        self.in_flight -= 1
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    @asynccontextmanager
+    async def request(
+        self, send: Callable[[], Awaitable[Any]], tokens: int = 0
+    ) -> AsyncIterator[Any]:
+        """
+        Send a request through the scheduler, retrying transient failures.
+
+        ``send`` is called again for each attempt. The slot is held until
+        the ``async with`` body exits, so a streamed response keeps its
+        slot while it is being read. Failures inside the body (e.g. a
+        dropped stream) are not retried, since output may already have
+        been delivered.
+
+        Args:
+            send: Coroutine function performing one attempt
+            tokens: Tokens the request may use (prompt + max_tokens)
+
+        Yields:
+            The response of the first successful attempt
+        """
+        attempt = 0
+        while True:
+            await self._acquire(tokens)
+            try:
+                response = await send()
+                break
+            except BaseException as e:
+                self._release()
+                if not isinstance(e, Exception):
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                self.retries += 1
+                self.logger.warning(
+                    f"API request failed ({e.__class__.__name__}), "
+                    f"retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+        try:
+            yield response
+        finally:
+            self._release()
+        self._increase()
+
+    def settle(self, reserved: int, used: int):
+        """Return the unused part of a request's token reservation."""
+        if used:
+            self.tokens.give(reserved - used)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying ``error``, or None to give up."""
+        if attempt >= self.max_retries:
+            return None
+
+        status = getattr(error, "status_code", None)
+        if status is None:
+            # openai is imported by now: the error came from its client
+            import openai
+
+            if not isinstance(error, openai.APIConnectionError):
+                return None
+        elif status != 429 and status not in (408, 409) and status < 500:
+            return None
+
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+        if status == 429:
+            self.rate_limited += 1
+            self._decrease()
+            retry_after = _retry_after(getattr(error, "response", None))
+            if retry_after is not None:
+                delay = retry_after + random.uniform(0, 0.1 * retry_after + 0.1)
+            # Everyone waits: the provider is throttling the whole key
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_INTERVAL:
+            return
+        self._last_decrease = now
+        old = self.limit
+        self.limit = max(1.0, self.limit / 2)
+        if int(self.limit) != int(old):
+            self.logger.info(f"Rate limited: concurrency {int(old)} → {int(self.limit)}")
+
+    def _increase(self):
+        if self.limit < self.max_concurrency:
+            old = self.limit
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            if int(self.limit) != int(old):
+                self.logger.debug(f"Concurrency raised to {int(self.limit)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Get scheduler statistics."""
+        return {
+            "concurrency": int(self.limit),
+            "in_flight": self.in_flight,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+        }
+
+
+def _retry_after(response) -> Optional[float]:
+    """Parse ``retry-after-ms`` / ``retry-after`` (seconds or HTTP date)."""
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# Keyed by event loop: asyncio primitives cannot be shared across loops
+_limiters: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def shared_limiter(
+    endpoint: str,
+    max_concurrency: int,
+    rpm: float = 0,
+    tpm: float = 0,
+    max_retries: int = 5,
+) -> RateLimiter:
+    """
+    Get the limiter for ``endpoint`` on the running event loop, creating
+    it on first use and applying the current settings to it.
+    """
+    per_loop = _limiters.setdefault(asyncio.get_running_loop(), {})
+    limiter = per_loop.get(endpoint)
+    if limiter is None:
+        limiter = per_loop[endpoint] = RateLimiter(
+            max_concurrency, rpm, tpm, max_retries
+        )
+    else:
+        limiter.configure(max_concurrency, rpm, tpm, max_retries)
+    return limiter
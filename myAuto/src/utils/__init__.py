@@ -1,3 +1,12 @@
-from .logger import get_logger, setup_logger
+from .logger import get_logger, log_event, setup_logger
+from .metrics import get_metrics
+from .tokens import count_tokens, estimate_tokens
 
-__all__ = ["get_logger", "setup_logger"]
+__all__ = [
+    "count_tokens",
+    "estimate_tokens",
+    "get_logger",
+    "get_metrics",
+    "log_event",
+    "setup_logger",
+]
@@ -1,18 +1,128 @@
 """
 Simple logging utility.
+
+Besides the text log (``app.log``), structured events (see ``log_event``)
+are written one JSON object per line to ``events.jsonl`` in the log
+directory.
+
+Logging calls only put the record on a queue; a background listener
+thread does the formatting and I/O, flushing files once per burst of
+records rather than per record. Log files roll over when they reach
+``LOG_MAX_BYTES`` or when the day changes, keeping ``LOG_BACKUPS`` old
+files (``app.log.1`` is the most recent).
 """
 
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
 import sys
+from datetime import date
 from pathlib import Path
-from datetime import datetime
+from typing import Any, List, Optional
 
 _logger = None
+_listener: Optional["_BatchingQueueListener"] = None
+
+EVENTS_LOGGER = "SubtitleSummarizer.events"
+
+# Rotation limits per log file
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+
+class RotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """
+    Rotate by size and at the first record of a new day.
+
+    ``flush`` is deferred: the queue listener calls ``flush_batch`` when it
+    runs out of records, so a burst is written with one flush.
+    """
+
+    def __init__(self, filename: Path, max_bytes: int, backup_count: int):
+        super().__init__(
+            filename,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+            delay=True,
+        )
+        path = Path(self.baseFilename)
+        self._day = (
+            date.fromtimestamp(path.stat().st_mtime) if path.exists() else date.today()
+        )
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if date.fromtimestamp(record.created) != self._day:
+            return True
+        return bool(super().shouldRollover(record))
+
+    def doRollover(self):
+        super().doRollover()
+        self._day = date.today()
+
+    def flush(self):
+        # Called after every record by StreamHandler.emit; see flush_batch
+        pass
+
+    def flush_batch(self):
+        super().flush()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+
+class _BatchingQueueListener(logging.handlers.QueueListener):
+    """Queue listener that flushes file handlers whenever the queue drains."""
+
+    def dequeue(self, block: bool) -> logging.LogRecord:
+        if block and self.queue.empty():
+            self.flush()
+        return self.queue.get(block)
+
+    def flush(self):
+        for handler in self.handlers:
+            if isinstance(handler, RotatingFileHandler):
+                handler.flush_batch()
+
+    def stop(self):
+        super().stop()
+        self.flush()
 
 
-def setup_logger(log_dir: Path = None) -> logging.Logger:
+def _only(name: str, include: bool) -> logging.Filter:
+    """Filter records of logger ``name`` (and its children) in or out."""
+    prefix = name + "."
+
+    class _Filter(logging.Filter):
+        def filter(self, record: logging.LogRecord) -> bool:
+            matches = record.name == name or record.name.startswith(prefix)
+            return matches == include
+
+    return _Filter()
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format event records as one JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "event": record.getMessage(),
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+def setup_logger(
+    log_dir: Path = None,
+    max_bytes: int = LOG_MAX_BYTES,
+    backup_count: int = LOG_BACKUPS,
+) -> logging.Logger:
     """Setup and return the application logger."""
-    global _logger
+    global _logger, _listener
 
     if _logger is not None:
         return _logger
@@ -20,6 +130,8 @@ def setup_logger(log_dir: Path = None) -> logging.Logger:
     _logger = logging.getLogger("SubtitleSummarizer")
     _logger.setLevel(logging.DEBUG)
 
+    handlers: List[logging.Handler] = []
+
     # Console handler
     console = logging.StreamHandler(sys.stdout)
     console.setLevel(logging.INFO)
@@ -28,18 +140,46 @@ def setup_logger(log_dir: Path = None) -> logging.Logger:
             "%(asctime)s | %(levelname)-7s | %(message)s", datefmt="%H:%M:%S"
         )
     )
-    _logger.addHandler(console)
+    handlers.append(console)
 
     # File handler
     if log_dir:
         log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"app_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler = RotatingFileHandler(
+            log_dir / "app.log", max_bytes, backup_count
+        )
         file_handler.setLevel(logging.DEBUG)
         file_handler.setFormatter(
             logging.Formatter("%(asctime)s | %(levelname)-7s | %(name)s | %(message)s")
         )
-        _logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    # Structured events go to their own JSON lines file, not the text log
+    for handler in handlers:
+        handler.addFilter(_only(EVENTS_LOGGER, include=False))
+    events = logging.getLogger(EVENTS_LOGGER)
+    events.setLevel(logging.INFO)
+    events.propagate = False
+    if log_dir:
+        events_handler = RotatingFileHandler(
+            log_dir / "events.jsonl", max_bytes, backup_count
+        )
+        events_handler.setFormatter(JsonLinesFormatter())
+        events_handler.addFilter(_only(EVENTS_LOGGER, include=True))
+        handlers.append(events_handler)
+
+    # Callers only enqueue; the listener thread formats and writes
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    _logger.addHandler(queue_handler)
+    events.addHandler(queue_handler if log_dir else logging.NullHandler())
+
+    _listener = _BatchingQueueListener(
+        records, *handlers, respect_handler_level=True
+    )
+    _listener.start()
+    # Runs before logging's own shutdown hook, which closes the handlers
+    atexit.register(_listener.stop)
 
     return _logger
 
@@ -50,3 +190,14 @@ def get_logger() -> logging.Logger:
     if _logger is None:
         _logger = setup_logger()
     return _logger
+
+
+def log_event(event: str, **fields: Any):
+    """
+    Emit a structured event (e.g. ``file_summarized`` with its metrics).
+
+    Events are written to the JSON lines event log when the logger was set
+    up with a log directory, and dropped otherwise.
+    """
+    get_logger()
+    logging.getLogger(EVENTS_LOGGER).info(event, extra={"fields": fields})
@@ -0,0 +1,325 @@
+"""
+Performance metrics module.
+Per-file stage timings and token/cache/byte counters for the summarizer,
+aggregated process-wide and exportable as JSON lines or Prometheus text.
+
+Stages:
+    read       reading the subtitle file from disk
+    parse      turning lines into cues
+    normalize  rolling-caption/filler/duplicate cleanup
+    cache      summary cache lookups
+    ttfb       request sent → first byte of the answer (first streamed
+               chunk, or the response headers of a non-streamed request)
+    generate   first byte → complete answer
+    write      writing the Markdown note
+
+Requests for the chunks of one file run concurrently, so a file's stage
+totals add up parallel work and can exceed its wall time.
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+STAGES = ("read", "parse", "normalize", "cache", "ttfb", "generate", "write")
+
+
+class FileMetrics:
+    """Measurements of one summarization (one file or one text)."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def add_time(self, stage: str, seconds: float):
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Time the ``with`` body as stage ``name``."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def cache_lookup(self, hit: bool):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def to_dict(self) -> Dict[str, Any]:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            "elapsed": round(self.elapsed, 4),
+            "timings": {k: round(v, 4) for k, v in self.timings.items()},
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_ratio": round(self.cache_hits / lookups, 4) if lookups else 0.0,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+        }
+
+
+class StageClock:
+    """
+    Exclusive timing of nested synchronous generators.
+
+    ``wrap`` each layer of a pipeline (e.g. file lines → parser →
+    normalizer); time spent pulling from an inner layer is charged to that
+    layer only, not to the layers wrapping it.
+    """
+
+    def __init__(self, record: Callable[[str, float], None]):
+        self._record = record
+        self._totals: Dict[str, float] = {}
+        # Time spent in inner layers, per active frame
+        self._children: List[float] = [0.0]
+
+    def wrap(self, iterable: Iterable, stage: str) -> Iterator:
+        iterator = iter(iterable)
+        while True:
+            self._children.append(0.0)
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._pop(stage, start)
+                return
+            self._pop(stage, start)
+            yield item
+
+    def _pop(self, stage: str, start: float):
+        elapsed = time.perf_counter() - start
+        children = self._children.pop()
+        self._children[-1] += elapsed
+        self._totals[stage] = self._totals.get(stage, 0.0) + elapsed - children
+
+    def flush(self):
+        """Pass the accumulated stage totals to ``record``."""
+        for stage, seconds in self._totals.items():
+            self._record(stage, seconds)
+        self._totals.clear()
+
+
+# Metrics of the summarization the current task works for; asyncio copies
+# it into the chunk tasks it spawns
+_current: ContextVar[Optional[FileMetrics]] = ContextVar("metrics", default=None)
+# Send/first-byte times of the request the current task is making
+_request: ContextVar[Optional[Dict[str, float]]] = ContextVar("request", default=None)
+
+
+def current() -> Optional[FileMetrics]:
+    """Metrics of the summarization in progress, if any."""
+    return _current.get()
+
+
+@contextmanager
+def collecting(file_metrics: FileMetrics) -> Iterator[FileMetrics]:
+    """Make ``file_metrics`` current for the ``with`` body."""
+    token = _current.set(file_metrics)
+    try:
+        yield file_metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the ``with`` body as stage ``name`` of the current metrics."""
+    file_metrics = _current.get()
+    if file_metrics is None:
+        yield
+        return
+    with file_metrics.stage(name):
+        yield
+
+
+@contextmanager
+def request_clock() -> Iterator[Dict[str, float]]:
+    """
+    Track one HTTP attempt: ``sent`` is set on entry and ``first_byte``
+    by ``mark_first_byte`` (the HTTP client's response hook).
+    """
+    clock = {"sent": time.perf_counter()}
+    token = _request.set(clock)
+    try:
+        yield clock
+    finally:
+        _request.reset(token)
+
+
+def mark_first_byte():
+    """Record that the current request's response has started arriving."""
+    clock = _request.get()
+    if clock is not None and "first_byte" not in clock:
+        clock["first_byte"] = time.perf_counter()
+
+
+# Metric name → (type, help)
+_FAMILIES = {
+    "summarizer_files_total": ("counter", "Summarized files (or texts), by status"),
+    "summarizer_file_seconds": ("summary", "Wall time per file (or text)"),
+    "summarizer_stage_seconds": ("summary", "Time spent per pipeline stage"),
+    "summarizer_requests_total": ("counter", "API requests sent"),
+    "summarizer_tokens_total": ("counter", "Tokens used, by kind"),
+    "summarizer_cache_lookups_total": ("counter", "Cache lookups, by result"),
+    "summarizer_bytes_total": ("counter", "Bytes read and written"),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Metrics:
+    """Process-wide aggregate of FileMetrics (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) → [count, sum]
+        self._summaries: Dict[Tuple[str, Labels], List[float]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            summary = self._summaries.setdefault(key, [0, 0.0])
+            summary[0] += 1
+            summary[1] += value
+
+    def record_file(self, file_metrics: FileMetrics, success: bool):
+        """Add one finished summarization to the aggregate."""
+        self.inc("summarizer_files_total", status="success" if success else "failed")
+        self.observe("summarizer_file_seconds", file_metrics.elapsed)
+        for name, seconds in file_metrics.timings.items():
+            self.observe("summarizer_stage_seconds", seconds, stage=name)
+        self.inc("summarizer_requests_total", file_metrics.requests)
+        self.inc("summarizer_tokens_total", file_metrics.prompt_tokens, kind="prompt")
+        self.inc(
+            "summarizer_tokens_total", file_metrics.completion_tokens, kind="completion"
+        )
+        self.inc(
+            "summarizer_cache_lookups_total", file_metrics.cache_hits, result="hit"
+        )
+        self.inc(
+            "summarizer_cache_lookups_total", file_metrics.cache_misses, result="miss"
+        )
+        self.inc("summarizer_bytes_total", file_metrics.bytes_in, direction="in")
+        self.inc("summarizer_bytes_total", file_metrics.bytes_out, direction="out")
+
+    def stage_seconds(
+        self, since: Optional[Dict[str, float]] = None
+    ) -> Dict[str, float]:
+        """
+        Total seconds per stage, in pipeline order.
+
+        Args:
+            since: An earlier result; if given, only the time added after
+                it is reported (e.g. for one batch of a long-lived process)
+        """
+        since = since or {}
+        with self._lock:
+            totals = {
+                dict(labels)["stage"]: total
+                for (name, labels), (_, total) in self._summaries.items()
+                if name == "summarizer_stage_seconds"
+            }
+        return {
+            stage: totals[stage] - since.get(stage, 0.0)
+            for stage in STAGES
+            if totals.get(stage, 0.0) > since.get(stage, 0.0)
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain data (for JSON export)."""
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = {k: list(v) for k, v in self._summaries.items()}
+
+        def name_of(name: str, labels: Labels) -> str:
+            return ",".join([name] + [f"{k}={v}" for k, v in labels])
+
+        data: Dict[str, Any] = {"timestamp": time.time()}
+        for (name, labels), value in sorted(counters.items()):
+            data[name_of(name, labels)] = value
+        for (name, labels), (count, total) in sorted(summaries.items()):
+            data[name_of(name, labels)] = {"count": count, "sum": round(total, 4)}
+        return data
+
+    def to_prometheus(self) -> str:
+        """Current values in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self._counters)
+            summaries = {k: list(v) for k, v in self._summaries.items()}
+
+        def labelled(name: str, labels: Labels) -> str:
+            if not labels:
+                return name
+            pairs = ",".join(f'{k}="{v}"' for k, v in labels)
+            return f"{name}{{{pairs}}}"
+
+        lines = []
+        for family, (kind, help_text) in _FAMILIES.items():
+            lines.append(f"# HELP {family} {help_text}")
+            lines.append(f"# TYPE {family} {kind}")
+            for (name, labels), value in sorted(counters.items()):
+                if name == family:
+                    lines.append(f"{labelled(name, labels)} {value:g}")
+            for (name, labels), (count, total) in sorted(summaries.items()):
+                if name == family:
+                    lines.append(f"{labelled(name + '_count', labels)} {count:g}")
+                    lines.append(f"{labelled(name + '_sum', labels)} {total:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: Path):
+        """
+        Export to ``path``: Prometheus text for ``.prom``/``.txt`` files
+        (overwritten), otherwise one JSON line appended per call.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix in (".prom", ".txt"):
+            path.write_text(self.to_prometheus(), encoding="utf-8")
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._summaries.clear()
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Get the process-wide metrics aggregate."""
+    return _metrics
+
+
+def format_stages(seconds: Dict[str, float]) -> str:
+    """One-line stage breakdown, e.g. ``read 0.1s · ttfb 3.2s · ...``."""
+    return " · ".join(f"{stage} {value:.1f}s" for stage, value in seconds.items())
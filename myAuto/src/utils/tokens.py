@@ -0,0 +1,97 @@
+"""
+Token counting utility.
+Counts prompt tokens with the model's real tokenizer when one is
+available (tiktoken, optional) and falls back to a fast, offline,
+CJK-aware estimator otherwise.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional
+
+# Context window sizes (tokens) by model-name prefix; longest prefix wins
+MODEL_CONTEXT_WINDOWS = {
+    "deepseek-chat": 65536,
+    "deepseek-reasoner": 65536,
+    "deepseek": 65536,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "qwen": 32768,
+}
+DEFAULT_CONTEXT_WINDOW = 32768
+
+# Per-message framing tokens added by the chat format
+MESSAGE_OVERHEAD = 4
+
+_CJK = re.compile(r"[\u3000-\u9fff\uf900-\ufaff\uff00-\uffef]")
+_WORD = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate tokens without a tokenizer.
+
+    Counts one token per CJK character and per punctuation mark, and about
+    one token per 4 letters of Latin words and per 3 digits. This tends to
+    overestimate slightly, which is the safe direction for budgeting.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    tokens = cjk
+    for word in _WORD.findall(_CJK.sub(" ", text)):
+        if word[0].isdigit():
+            tokens += (len(word) + 2) // 3
+        elif word[0].isalpha():
+            tokens += (len(word) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
+
+@lru_cache(maxsize=8)
+def get_encoding(model: str):
+    """
+    Get a cached tiktoken encoding for an OpenAI model.
+
+    Returns None when tiktoken is not installed, the model is not an
+    OpenAI model, or the encoding cannot be loaded (e.g. offline).
+    """
+    if not model.startswith(("gpt-", "o1", "o3", "o4")):
+        return None
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Unknown (newer) model: the BPE file may still need downloading
+        pass
+    except Exception:
+        return None
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = "") -> int:
+    """Count tokens in text for the given model."""
+    encoding = get_encoding(model) if model else None
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def context_window(model: str, override: Optional[int] = None) -> int:
+    """Get the context window for a model (``override`` wins if set)."""
+    if override:
+        return int(override)
+    matches = [p for p in MODEL_CONTEXT_WINDOWS if model.startswith(p)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return MODEL_CONTEXT_WINDOWS[max(matches, key=len)]
@@ -0,0 +1,164 @@
+"""Tests for the SQLite summary cache."""
+
+import asyncio
+import json
+import sqlite3
+import threading
+
+import pytest
+
+from src.config.settings import Settings
+from src.summarizer import async_summarizer
+from src.summarizer.async_summarizer import AsyncAISummarizer
+from src.summarizer.cache import SummaryCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SummaryCache(tmp_path / "cache.db")
+    yield cache
+    cache.close()
+
+
+def test_put_get_and_stats(cache):
+    assert cache.get("k") is None
+    cache.put("k", "摘要", content_key="c", prompt_hash="p", model="m1")
+    assert cache.get("k") == "摘要"
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["bytes"] == len("摘要".encode("utf-8"))
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_cross_model_lookup_requires_same_prompt(cache):
+    cache.put("k1", "note", content_key="c", prompt_hash="p", model="m1")
+    assert cache.get("k2", content_key="c", prompt_hash="p") == "note"
+    assert cache.get("k2", content_key="c", prompt_hash="other") is None
+
+
+def test_lru_eviction_by_entries(tmp_path):
+    cache = SummaryCache(tmp_path / "cache.db", max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["evictions"] == 1
+    cache.close()
+
+
+def test_ttl_expiry(cache):
+    cache.ttl_seconds = 60
+    cache.put("old", "x", created=1.0)
+    assert cache.get("old") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_totals_survive_reopen(tmp_path):
+    cache = SummaryCache(tmp_path / "cache.db")
+    cache.put("a", "12345")
+    cache.close()
+    cache = SummaryCache(tmp_path / "cache.db")
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["bytes"] == 5
+    cache.close()
+
+
+def write_legacy(cache_dir, count):
+    for i in range(count):
+        data = {"summary": f"note {i}", "timestamp": 1000.0 + i}
+        (cache_dir / f"{i:032x}.json").write_text(json.dumps(data), encoding="utf-8")
+
+
+def test_import_legacy_single_transaction(tmp_path, cache):
+    write_legacy(tmp_path, 50)
+    (tmp_path / "broken.json").write_text("{", encoding="utf-8")
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    assert cache.import_legacy(tmp_path) == 50
+    assert statements.count("BEGIN") == 1
+    assert statements.count("COMMIT") == 1
+    assert cache.stats()["entries"] == 50
+    assert cache.get("0" * 32, content_key="0" * 32) == "note 0"
+    # Imported files are removed, unreadable ones left for inspection
+    assert [p.name for p in tmp_path.glob("*.json")] == ["broken.json"]
+
+
+def test_import_legacy_keeps_existing_entries(tmp_path, cache):
+    write_legacy(tmp_path, 1)
+    cache.put("0" * 32, "newer")
+    assert cache.import_legacy(tmp_path) == 0
+    assert cache.get("0" * 32) == "newer"
+    assert cache.stats()["entries"] == 1
+
+
+def test_cache_opens_off_the_event_loop(tmp_path, monkeypatch):
+    settings = Settings()
+    settings.data_dir = tmp_path
+    summarizer = AsyncAISummarizer(settings)
+    threads = []
+    opened = SummaryCache.import_legacy
+
+    def import_legacy(cache, cache_dir):
+        threads.append(threading.current_thread())
+        return opened(cache, cache_dir)
+
+    monkeypatch.setattr(async_summarizer.SummaryCache, "import_legacy", import_legacy)
+
+    async def main():
+        await summarizer._open_cache()
+        return threading.current_thread()
+
+    loop_thread = asyncio.run(main())
+    assert threads and threads[0] is not loop_thread
+    summarizer.cache.close()
+
+
+def test_v1_database_migrates_to_content_only_entries(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "cache.db"))
+    conn.execute(
+        "CREATE TABLE entries (key TEXT PRIMARY KEY, summary TEXT NOT NULL, "
+        "size INTEGER NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO entries VALUES ('md5', 'old', 3, 1.0, 1.0)")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    cache = SummaryCache(tmp_path / "cache.db")
+    assert cache.get("new-key", content_key="md5", prompt_hash="p") == "old"
+    cache.close()
+
+
+@pytest.fixture
+def summarizer(tmp_path):
+    settings = Settings()
+    settings.data_dir = tmp_path
+    return AsyncAISummarizer(settings)
+
+
+def test_cache_key_covers_every_request_input(summarizer):
+    base = summarizer._get_cache_key("text", "title")
+    assert summarizer._get_cache_key("text", "title") == base
+    assert summarizer._get_cache_key("text", "other")["key"] != base["key"]
+    assert summarizer._get_cache_key("more", "title")["key"] != base["key"]
+
+    summarizer.settings.set("model", "another-model")
+    changed = summarizer._get_cache_key("text", "title")
+    assert changed["key"] != base["key"]
+    # Same text and prompt setup: still found by a cross-model lookup
+    assert changed["content_key"] == base["content_key"]
+    assert changed["prompt_hash"] == base["prompt_hash"]
+
+    summarizer.settings.set("temperature", 0.9)
+    assert summarizer._get_cache_key("text", "title")["key"] != changed["key"]
+
+
+def test_cache_key_changes_with_prompt_template(summarizer, monkeypatch):
+    base = summarizer._get_cache_key("text")
+    monkeypatch.setattr(summarizer.settings, "get_summary_prompt", lambda: "{text}")
+    changed = summarizer._get_cache_key("text")
+    assert changed["key"] != base["key"]
+    assert changed["prompt_hash"] != base["prompt_hash"]
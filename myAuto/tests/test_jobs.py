@@ -0,0 +1,178 @@
+"""Tests for the persistent job queue."""
+
+import sqlite3
+import subprocess
+import sys
+import time
+
+import pytest
+
+from src.summarizer import jobs as jobs_module
+from src.summarizer.jobs import DONE, FAILED, PENDING, RUNNING, JobQueue, file_digest
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "jobs.db"
+
+
+@pytest.fixture
+def queue(db_path):
+    queue = JobQueue(db_path)
+    yield queue
+    queue.close()
+
+
+def test_job_lifecycle_and_steps(queue, tmp_path):
+    source = tmp_path / "lec01.srt"
+    source.write_text("hello")
+    output = tmp_path / "out" / "lec01_summary.md"
+
+    (job,) = queue.enqueue([source], tmp_path / "out")
+    assert job.state == PENDING
+    queue.start(job.id, output, file_digest(source))
+    queue.add_steps(job.id, "map", ["a", "b"])
+    queue.step_started(job.id, "a", "map")
+    queue.step_done(job.id, "a", "map", "note a")
+    assert queue.step_note(job.id, "a") == "note a"
+    assert queue.step_note(job.id, "b") is None
+    assert queue.progress(job.id) == {DONE: 1, PENDING: 1}
+
+    queue.finish(job.id, False, "boom")
+    # A failed job is reused with its finished steps
+    (again,) = queue.enqueue([source], tmp_path / "out")
+    assert again.id == job.id and again.output_path == output
+    assert queue.step_note(job.id, "a") == "note a"
+
+    queue.finish(job.id, True)
+    assert queue.progress(job.id) == {}
+
+
+def test_summarized_needs_done_job_with_existing_output(queue, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    a, b = tmp_path / "a" / "lec01.srt", tmp_path / "b" / "lec01.srt"
+    for path in (a, b):
+        path.parent.mkdir()
+        path.write_text(str(path))
+
+    job_a, job_b = queue.enqueue([a, b], out)
+    queue.start(job_a.id, out / "a.md", file_digest(a))
+    queue.start(job_b.id, out / "b.md", file_digest(b))
+    (out / "a.md").write_text("summary")
+    queue.finish(job_a.id, True)
+    queue.finish(job_b.id, False, "failed")
+
+    assert queue.summarized([a, b], out) == {a: {file_digest(a)}}
+    (out / "a.md").unlink()
+    assert queue.summarized([a, b], out) == {}
+
+
+def test_live_owner_jobs_are_not_recovered_or_discarded(db_path, tmp_path):
+    runner = JobQueue(db_path)
+    job, pending = runner.enqueue([tmp_path / "x.srt", tmp_path / "y.srt"])
+    runner.start(job.id, tmp_path / "x.md")
+
+    app = JobQueue(db_path)
+    try:
+        assert app.unfinished() == []
+        app.discard()
+        assert app.adopt() == []
+        # The running batch can keep journaling its steps
+        runner.step_done(job.id, "k", "map", "note")
+
+        runner.close()
+        assert [j.id for j in app.unfinished()] == [job.id, pending.id]
+        adopted = app.adopt()
+        assert [(j.id, j.state) for j in adopted] == [
+            (job.id, PENDING),
+            (pending.id, PENDING),
+        ]
+        assert app.unfinished() == []
+    finally:
+        app.close()
+
+
+def test_expired_lease_or_dead_process_orphans_jobs(db_path, tmp_path):
+    other = JobQueue(db_path)
+    (job,) = other.enqueue([tmp_path / "x.srt"])
+    other.start(job.id, tmp_path / "x.md")
+    # Simulate a crash: the heartbeat stops and the owner row stays
+    other._closed.set()
+
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.execute(
+            "UPDATE owners SET heartbeat = ? WHERE token = ?",
+            (time.time() - jobs_module.LEASE_SECONDS - 1, other.owner),
+        )
+    queue = JobQueue(db_path)
+    try:
+        (recovered,) = queue.unfinished()
+        assert (recovered.id, recovered.state) == (job.id, PENDING)
+    finally:
+        queue.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="pid probing is POSIX only")
+def test_owner_with_dead_pid_is_gone(db_path, tmp_path):
+    dead = subprocess.Popen([sys.executable, "-c", "pass"])
+    dead.wait()
+    queue = JobQueue(db_path)
+    try:
+        with sqlite3.connect(str(db_path)) as conn:
+            conn.execute(
+                "INSERT INTO owners (token, pid, heartbeat) VALUES ('x', ?, ?)",
+                (dead.pid, time.time()),
+            )
+            conn.execute(
+                "INSERT INTO jobs (path, state, owner, created, updated) "
+                "VALUES ('a.srt', ?, 'x', 0, 0)",
+                (RUNNING,),
+            )
+        assert [j.path.name for j in queue.unfinished()] == ["a.srt"]
+    finally:
+        queue.close()
+
+
+def test_prune_keeps_latest_done_job_per_file(queue, tmp_path):
+    source = tmp_path / "x.srt"
+    ids = []
+    for success in (True, True, False):
+        (job,) = queue.enqueue([source])
+        queue.start(job.id, tmp_path / f"{job.id}.md")
+        queue.finish(job.id, success, None if success else "boom")
+        ids.append(job.id)
+    queue.prune(-1)
+    rows = queue._conn.execute("SELECT id, state FROM jobs").fetchall()
+    assert rows == [(ids[1], DONE)]
+    assert FAILED not in dict(rows).values()
+
+
+def test_migrates_v1_journal(db_path):
+    with sqlite3.connect(str(db_path)) as conn:
+        conn.executescript(
+            """
+            CREATE TABLE jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, path TEXT NOT NULL,
+                output_dir TEXT, output_path TEXT, state TEXT NOT NULL,
+                error TEXT, created REAL NOT NULL, updated REAL NOT NULL
+            );
+            CREATE TABLE steps (
+                job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+                key TEXT NOT NULL, kind TEXT NOT NULL, state TEXT NOT NULL,
+                note TEXT, PRIMARY KEY (job_id, key)
+            );
+            INSERT INTO jobs (path, state, created, updated)
+                VALUES ('old.srt', 'running', 0, 0);
+            PRAGMA user_version = 1;
+            """
+        )
+    queue = JobQueue(db_path)
+    try:
+        version = queue._conn.execute("PRAGMA user_version").fetchone()[0]
+        assert version == JobQueue.SCHEMA_VERSION
+        assert [(j.path.name, j.state) for j in queue.unfinished()] == [
+            ("old.srt", PENDING)
+        ]
+    finally:
+        queue.close()
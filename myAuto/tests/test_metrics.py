@@ -0,0 +1,26 @@
+"""Tests for the metrics aggregate."""
+
+import pytest
+
+from src.utils.metrics import Metrics
+
+
+def test_stage_seconds_in_pipeline_order():
+    metrics = Metrics()
+    metrics.observe("summarizer_stage_seconds", 2.0, stage="write")
+    metrics.observe("summarizer_stage_seconds", 1.0, stage="read")
+    assert list(metrics.stage_seconds()) == ["read", "write"]
+
+
+def test_stage_seconds_since_reports_only_new_time():
+    metrics = Metrics()
+    metrics.observe("summarizer_stage_seconds", 1.0, stage="read")
+    metrics.observe("summarizer_stage_seconds", 3.0, stage="ttfb")
+    before = metrics.stage_seconds()
+
+    metrics.observe("summarizer_stage_seconds", 0.5, stage="ttfb")
+    metrics.observe("summarizer_stage_seconds", 0.25, stage="write")
+    assert metrics.stage_seconds(since=before) == {
+        "ttfb": pytest.approx(0.5),
+        "write": pytest.approx(0.25),
+    }
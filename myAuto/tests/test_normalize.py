@@ -0,0 +1,100 @@
+"""Tests for subtitle normalization."""
+
+import pytest
+
+from src.subtitles.normalize import NormalizeStats, clean_line, normalize_cues
+from src.subtitles.parser import Cue
+
+
+def normalize(lines):
+    return [cue.text for cue in normalize_cues(Cue(None, None, t) for t in lines)]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        "定义函数 f(x) 返回 a[0] 的值",
+        "调用 print(hello) 即可",
+        "数组 [1, 2, 3] 和 (a + b) 的和",
+        "面积是 (r^2) 乘以 π",
+    ],
+)
+def test_clean_line_keeps_code_and_math_in_brackets(line):
+    assert clean_line(line) == line
+
+
+@pytest.mark.parametrize(
+    "line, expected",
+    [
+        ("[Music] hello", "hello"),
+        ("[music playing] ok", "ok"),
+        ("(掌声) 谢谢大家", "谢谢大家"),
+        ("（笑）好的", "好的"),
+        ("【背景音乐】", ""),
+        ("♪ la la ♪", "la la"),
+        ("um, so we start", "so we start"),
+    ],
+)
+def test_clean_line_strips_sound_annotations_and_fillers(line, expected):
+    assert clean_line(line) == expected
+
+
+def test_rolling_captions_are_trimmed_against_the_untrimmed_previous_line():
+    lines = [
+        "we are going to talk about",
+        "going to talk about neural networks",
+        "talk about neural networks and deep",
+        "neural networks and deep learning today",
+    ]
+    assert normalize(lines) == [
+        "we are going to talk about",
+        "neural networks",
+        "and deep",
+        "learning today",
+    ]
+
+
+def test_rolling_cjk_caption_repeats_whole_previous_line():
+    assert normalize(["我们今天讨论数据库索引", "我们今天讨论数据库索引的实现方式"]) == [
+        "我们今天讨论数据库索引",
+        "的实现方式",
+    ]
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["So", "Sorry about that"],
+        ["It", "Item two is next"],
+        ["我们", "我们今天讲数据库"],
+        ["Hello there", "Hello thereafter we go"],
+        ["今天讨论数据库的索引", "数据库的索引怎么实现"],
+    ],
+)
+def test_short_or_mid_word_prefixes_are_not_trimmed(lines):
+    assert normalize(lines) == lines
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["We use Python every day in class", "Python"],
+        ["这个概念非常重要因为它", "重要"],
+    ],
+)
+def test_substrings_of_recent_lines_are_not_duplicates(lines):
+    assert normalize(lines) == lines
+
+
+def test_exact_and_near_duplicates_are_dropped():
+    stats = NormalizeStats()
+    cues = [
+        Cue(0.0, 1.0, "This is a long line repeated!"),
+        Cue(1.0, 2.0, "this is a long line repeated"),
+        Cue(2.0, 3.0, "This is a long line repeatd."),
+    ]
+    assert [c.text for c in normalize_cues(cues, stats)] == [
+        "This is a long line repeated!"
+    ]
+    assert (stats.cues_in, stats.cues_out) == (3, 1)
+    assert stats.chars_saved > 0
@@ -0,0 +1,85 @@
+"""Tests for the subtitle parsers."""
+
+from src.subtitles.parser import Cue, parse_ass, parse_srt, parse_timestamp, parse_vtt
+
+
+def lines(text):
+    return text.splitlines(keepends=True)
+
+
+def test_parse_timestamp_formats():
+    assert parse_timestamp("00:00:01,500") == 1.5
+    assert parse_timestamp("01:02.250") == 62.25
+    assert parse_timestamp("0:00:03.10") == 3.1
+    assert parse_timestamp("nonsense") is None
+
+
+def test_srt_cues():
+    srt = (
+        "1\n00:00:01,000 --> 00:00:02,000\nHello\nworld\n\n"
+        "2\n00:00:02,000 --> 00:00:03,500\n<i>Second</i>\n"
+    )
+    assert list(parse_srt(lines(srt))) == [
+        Cue(1.0, 2.0, "Hello\nworld"),
+        Cue(2.0, 3.5, "Second"),
+    ]
+
+
+def test_srt_without_blank_separators_splits_per_cue():
+    srt = (
+        "1\n00:00:01,000 --> 00:00:02,000\nHello\n"
+        "2\n00:00:02,000 --> 00:00:03,000\nWorld\n"
+    )
+    assert list(parse_srt(lines(srt))) == [
+        Cue(1.0, 2.0, "Hello"),
+        Cue(2.0, 3.0, "World"),
+    ]
+
+
+def test_srt_numbers_in_text_are_kept():
+    srt = (
+        "1\n00:00:01,000 --> 00:00:02,000\nThe answer is\n42\n\n"
+        "2\n00:00:02,000 --> 00:00:03,000\n7\nnext\n"
+    )
+    assert [c.text for c in parse_srt(lines(srt))] == ["The answer is\n42", "7\nnext"]
+
+
+def test_srt_crlf_and_bom():
+    srt = "﻿1\r\n00:00:01,000 --> 00:00:02,000\r\nHi\r\n\r\n"
+    assert list(parse_srt(lines(srt))) == [Cue(1.0, 2.0, "Hi")]
+
+
+def test_vtt_skips_header_notes_and_identifiers():
+    vtt = (
+        "WEBVTT\n\nNOTE a comment\nspanning lines\n\n"
+        "intro\n00:01.000 --> 00:02.000 align:start\n"
+        "<v Alice>Hi <c.yellow>there</c>\n\n"
+        "00:02.000 --> 00:03.000\nBye\n"
+    )
+    assert list(parse_vtt(lines(vtt))) == [
+        Cue(1.0, 2.0, "Hi there"),
+        Cue(2.0, 3.0, "Bye"),
+    ]
+
+
+def test_ass_dialogue():
+    ass = (
+        "[Script Info]\nTitle: x\n\n[Events]\n"
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, "
+        "Effect, Text\n"
+        "Dialogue: 0,0:00:01.00,0:00:02.50,Default,,0,0,0,,"
+        "{\\an8}Hello, world\\Nline two\n"
+        "Comment: 0,0:00:03.00,0:00:04.00,Default,,0,0,0,,ignored\n"
+    )
+    assert list(parse_ass(lines(ass))) == [Cue(1.0, 2.5, "Hello, world\nline two")]
+
+
+def test_markup_is_stripped_but_comparisons_and_braces_survive():
+    srt = (
+        "1\n00:00:01,000 --> 00:00:02,000\n"
+        '<font color="#ff0000">if a < b > c</font> {\\an8}<B>then</B>\n'
+        "dict {key: value} <00:00:01.500>and <u>x<y</u>\n"
+    )
+    assert [c.text for c in parse_srt(lines(srt))] == [
+        "if a < b > c then\ndict {key: value} and x<y"
+    ]
@@ -0,0 +1,49 @@
+"""Tests for streaming subtitle file decoding."""
+
+import codecs
+
+from src.subtitles import reader
+from src.subtitles.reader import detect_encoding, iter_lines
+
+
+def test_detect_encoding_prefers_bom():
+    assert detect_encoding(codecs.BOM_UTF8 + b"abc") == "utf-8-sig"
+    assert detect_encoding(codecs.BOM_UTF16_LE + "字".encode("utf-16-le")) == (
+        "utf-16"
+    )
+
+
+def test_detect_encoding_gbk():
+    assert detect_encoding("你好，世界\n".encode("gbk")) == "gb18030"
+
+
+def test_iter_lines_translates_newlines(tmp_path):
+    path = tmp_path / "a.srt"
+    path.write_bytes("一\r\n二\r三\n".encode("utf-8"))
+    assert list(iter_lines(path)) == ["一\n", "二\n", "三\n"]
+
+
+def test_iter_lines_utf16(tmp_path):
+    path = tmp_path / "a.srt"
+    path.write_bytes("甲\n乙\n".encode("utf-16"))
+    assert list(iter_lines(path)) == ["甲\n", "乙\n"]
+
+
+def test_iter_lines_falls_back_when_gbk_follows_ascii_prefix(tmp_path, monkeypatch):
+    monkeypatch.setattr(reader, "CHUNK_BYTES", 4096)
+    ascii_lines = [f"line {i} of plain english text\n" for i in range(4000)]
+    path = tmp_path / "a.srt"
+    path.write_bytes("".join(ascii_lines).encode("ascii") + "中文字幕\n".encode("gbk"))
+    assert path.stat().st_size > reader.SNIFF_BYTES
+
+    lines = list(iter_lines(path))
+    assert lines[:-1] == ascii_lines
+    assert lines[-1] == "中文字幕\n"
+
+
+def test_iter_lines_replaces_when_no_candidate_fits(tmp_path):
+    path = tmp_path / "a.srt"
+    path.write_bytes(b"ok\n\xff\xff\xff\n")
+    lines = list(iter_lines(path))
+    assert lines[0] == "ok\n"
+    assert "�" in lines[1]
@@ -0,0 +1,38 @@
+"""Tests for token counting."""
+
+import sys
+import types
+
+import pytest
+
+from src.utils import tokens
+
+
+@pytest.fixture
+def offline_tiktoken(monkeypatch):
+    """A tiktoken whose encodings cannot be downloaded."""
+    module = types.ModuleType("tiktoken")
+
+    def encoding_for_model(model):
+        raise KeyError(model)
+
+    def get_encoding(name):
+        raise ConnectionError("offline")
+
+    module.encoding_for_model = encoding_for_model
+    module.get_encoding = get_encoding
+    monkeypatch.setitem(sys.modules, "tiktoken", module)
+    tokens.get_encoding.cache_clear()
+    yield
+    tokens.get_encoding.cache_clear()
+
+
+def test_unknown_model_offline_falls_back_to_estimate(offline_tiktoken):
+    assert tokens.get_encoding("gpt-9-preview") is None
+    text = "hello world 你好"
+    assert tokens.count_tokens(text, "gpt-9-preview") == tokens.estimate_tokens(text)
+
+
+def test_non_openai_models_use_the_estimate():
+    assert tokens.get_encoding("deepseek-chat") is None
+    assert tokens.count_tokens("abc", "deepseek-chat") == tokens.estimate_tokens("abc")